@@ -0,0 +1,140 @@
+# API-routes zonder webframework: invoer controleren en JSON-body + status opbouwen
+# Gedeeld door de Flask-app (app.py) en de async ASGI-app (asgi.py), zodat beide precies hetzelfde
+# JSON-contract hebben. Ophalen en analyseren doet de aanroeper (sync of async).
+
+from __future__ import annotations
+from typing import Optional
+
+import metrics
+import timing
+from config import BATCH_CONCURRENCY, BATCH_MAX_URLS, JOBS_MAX_URLS, JOBS_WORKER
+from http_session import session_stats
+from jobs import get_job_store, start_job_runner, wake_job_runner
+from page_cache import get_page_cache
+from report_cache import get_report_cache
+from vision_cache import get_vision_cache
+from vision_jobs import get_vision_jobs
+
+# Sta aanroepen vanaf andere domeinen toe (voor frontend op eigen hosting, API hier)
+CORS_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type",
+    "Timing-Allow-Origin": "*",  # Server-Timing ook zichtbaar voor een frontend op een ander domein
+}
+
+
+def analyze_input(data: dict) -> tuple[str, Optional[dict]]:
+    """(url, None), of ("", foutbody) als er geen URL is."""
+    url = data.get("url")
+    url = url.strip() if isinstance(url, str) else ""
+    if not url:
+        metrics.ANALYZE_REQUESTS.inc(endpoint="analyze", outcome="invalid")
+        return "", {"ok": False, "error": "Geen URL opgegeven."}
+    return url, None
+
+
+def analyze_result(report: Optional[dict], err: Optional[str], timings: timing.Timings,
+                   with_timings: bool) -> tuple[dict, int]:
+    """Body en status voor de uitkomst van analyze_url / async_analyze_url."""
+    metrics.ANALYZE_REQUESTS.inc(endpoint="analyze", outcome="failed" if err else "ok")
+    if err:
+        return {"ok": False, "error": err}, 400
+    if with_timings:
+        # Kopie: het rapport kan uit report_cache komen; "json" zit er nog niet in
+        return {**report, "timings": timings.as_dict()}, 200
+    return report, 200
+
+
+def batch_input(data: dict) -> tuple[list[str], int, Optional[dict]]:
+    """(urls, concurrency, None), of ([], 0, foutbody) bij ongeldige invoer."""
+    urls = data.get("urls")
+    error = None
+    concurrency = 0
+    if not isinstance(urls, list) or not any(isinstance(u, str) and u.strip() for u in urls):
+        error = "Geen URL's opgegeven."
+    else:
+        urls = [u for u in urls if isinstance(u, str)]
+        if len(urls) > BATCH_MAX_URLS:
+            error = f"Te veel URL's: maximaal {BATCH_MAX_URLS} per verzoek."
+        else:
+            try:
+                concurrency = max(1, min(int(data.get("concurrency") or BATCH_CONCURRENCY), BATCH_CONCURRENCY))
+            except (TypeError, ValueError):
+                error = "Ongeldige waarde voor concurrency."
+    if error:
+        metrics.ANALYZE_REQUESTS.inc(endpoint="batch", outcome="invalid")
+        return [], 0, {"ok": False, "error": error}
+    return urls, concurrency, None
+
+
+def batch_result(result: dict, seconds: float) -> dict:
+    metrics.ANALYZE_SECONDS.observe(seconds, endpoint="batch")
+    # Per URL in de batch één uitkomst, zodat de tellers optellen met die van /api/analyze
+    metrics.ANALYZE_REQUESTS.inc(result["totals"]["ok"], endpoint="batch", outcome="ok")
+    metrics.ANALYZE_REQUESTS.inc(result["totals"]["failed"], endpoint="batch", outcome="failed")
+    return {"ok": True, **result}
+
+
+def _ensure_job_runner() -> None:
+    """
+    Met LQM_JOBS_WORKER start het eerste /api/jobs-verzoek in dit proces de achtergrondthread (niet bij
+    import: dan zou elk proces dat app importeert hem starten, en met gunicorn --preload geen enkele worker).
+    """
+    if JOBS_WORKER:
+        start_job_runner()
+
+
+def job_create(data: dict) -> tuple[dict, int]:
+    """Nieuwe taak in de rij (jobs.py); 202 met het id, de URL's worden op de achtergrond verwerkt."""
+    urls = data.get("urls")
+    if not isinstance(urls, list) or not any(isinstance(u, str) and u.strip() for u in urls):
+        return {"ok": False, "error": "Geen URL's opgegeven."}, 400
+    urls = [u.strip() for u in urls if isinstance(u, str) and u.strip()]
+    if len(urls) > JOBS_MAX_URLS:
+        return {"ok": False, "error": f"Te veel URL's: maximaal {JOBS_MAX_URLS} per taak."}, 400
+    job_id = get_job_store().create(urls)
+    _ensure_job_runner()
+    wake_job_runner()
+    return {"ok": True, "id": job_id, "status": "queued", "count": len(urls)}, 202
+
+
+def job_status(job_id: str, after: Optional[str]) -> tuple[dict, int]:
+    """Voortgang van een taak plus de resultaten na cursor `after` (?after=<cursor> uit de vorige response)."""
+    try:
+        cursor = max(0, int(after or 0))
+    except ValueError:
+        return {"ok": False, "error": "Ongeldige waarde voor after."}, 400
+    _ensure_job_runner()
+    job = get_job_store().get(job_id, after=cursor)
+    if job is None:
+        return {"ok": False, "error": "Onbekende of verlopen taak."}, 404
+    return {"ok": True, **job}, 200
+
+
+def vision_job(job_id: str) -> tuple[dict, int]:
+    """Status van een AI-foto-analyse uit /api/analyze; bij "done" het bijgewerkte rapport."""
+    job = get_vision_jobs().get(job_id)
+    if job is None:
+        return {"ok": False, "error": "Onbekende of verlopen taak."}, 404
+    out = {"ok": True, "id": job["id"], "status": job["status"]}
+    if job["status"] == "done":
+        out["report"] = job["result"]
+    elif job["status"] == "failed":
+        out["error"] = job["error"]
+    return out, 200
+
+
+def stats() -> dict:
+    """Tellers van dit proces: HTTP-verbindingen (hergebruik via keep-alive), pagina- en rapportcache."""
+    cache = get_page_cache()
+    vision_cache = get_vision_cache()
+    return {
+        "ok": True,
+        "http": session_stats(),
+        "page_cache": cache.stats() if cache else None,
+        "report_cache": get_report_cache().stats(),
+        "vision_jobs": get_vision_jobs().stats(),
+        "vision_cache": vision_cache.stats() if vision_cache else None,
+        "jobs": get_job_store().stats(),
+    }
@@ -1,16 +1,17 @@
 # LQM Advertentie Agent - Flask API en web-UI
+# De afhandeling van de routes staat in api.py (gedeeld met de async ASGI-app in asgi.py).
 
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory
+import logging
 import os
+import time
 
-from extractor import extract_from_url
-from lqm_scorer import (
-    ExtractedData,
-    score_all,
-    total_lqm_score,
-    summary_by_category,
-    LQMScoreItem,
-)
+import api
+import metrics
+import timing
+from batch import analyze_batch
+from config import SERVER_TIMING, TIMING_LOG
+from report import analyze_url
 
 app = Flask(__name__, static_folder="static", template_folder="static")
 
@@ -18,9 +19,16 @@ app = Flask(__name__, static_folder="static", template_folder="static")
 @app.after_request
 def add_cors(response):
     """Sta aanroepen vanaf andere domeinen toe (voor frontend op eigen hosting, API hier)."""
-    response.headers["Access-Control-Allow-Origin"] = "*"
-    response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
-    response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    response.headers.update(api.CORS_HEADERS)
+    return response
+
+
+def _with_timings(response, timings: timing.Timings, url: str):
+    """Server-Timing-header en logregel voor een gemeten verzoek."""
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = timings.header()
+    if TIMING_LOG:
+        timings.log(path=request.path, url=url, status=response.status_code)
     return response
 
 
@@ -31,57 +39,83 @@ def index():
 
 @app.route("/api/analyze", methods=["POST", "OPTIONS"])
 def analyze():
-    """Accepteert JSON: { "url": "https://..." } en retourneert LQM-rapport."""
+    """
+    Accepteert JSON: { "url": "https://..." } en retourneert LQM-rapport. Met "timings": true (of
+    ?timings=1) staat de duur per stap ook in het rapport; de header Server-Timing heeft die altijd.
+    """
     if request.method == "OPTIONS":
         return "", 204
     data = request.get_json(silent=True) or {}
-    url = (data.get("url") or "").strip()
-    if not url:
-        return jsonify({"ok": False, "error": "Geen URL opgegeven."}), 400
-
-    extracted, err = extract_from_url(url)
-    if err:
-        return jsonify({"ok": False, "error": err}), 400
-
-    items = score_all(extracted)
-    total = total_lqm_score(items)
-    by_category = summary_by_category(items)
-
-    # Serialiseer voor JSON
-    def item_to_dict(i: LQMScoreItem) -> dict:
-        d = {
-            "attribute": i.attribute,
-            "category": i.category,
-            "score": i.score,
-            "type": i.type_,
-            "reason": i.reason,
-            "not_applicable": i.not_applicable,
-        }
-        if i.passed is not None:
-            d["passed"] = i.passed
-        if i.recommendation is not None:
-            d["recommendation"] = i.recommendation
-        return d
-
-    return jsonify({
-        "ok": True,
-        "url": url,
-        "total_lqm_score": total,
-        "items": [item_to_dict(i) for i in items],
-        "by_category": {
-            cat: {
-                "bonus": info["bonus"],
-                "malus": info["malus"],
-                "items": [item_to_dict(i) for i in info["items"]],
-                "advisory": info.get("advisory", False),
-                "all_passed": info.get("all_passed"),
-            }
-            for cat, info in by_category.items()
-        },
-    })
+    url, error = api.analyze_input(data)
+    if error:
+        return jsonify(error), 400
+
+    with timing.collect() as timings, metrics.ANALYZE_SECONDS.time(endpoint="analyze"):
+        try:
+            report, err = analyze_url(url)
+        except Exception:
+            metrics.ANALYZE_REQUESTS.inc(endpoint="analyze", outcome="error")
+            raise
+        with_timings = data.get("timings") is True or request.args.get("timings") == "1"
+        body, status = api.analyze_result(report, err, timings, with_timings)
+        with timing.stage("json"):
+            response = jsonify(body)
+    response.status_code = status
+    return _with_timings(response, timings, url)
+
+
+@app.route("/api/analyze/batch", methods=["POST", "OPTIONS"])
+def analyze_batch_route():
+    """Accepteert JSON: { "urls": ["https://...", ...], "concurrency": 8 } en retourneert per URL een rapport plus totalen."""
+    if request.method == "OPTIONS":
+        return "", 204
+    data = request.get_json(silent=True) or {}
+    urls, concurrency, error = api.batch_input(data)
+    if error:
+        return jsonify(error), 400
+
+    t0 = time.perf_counter()
+    result = analyze_batch(urls, concurrency=concurrency)
+    return jsonify(api.batch_result(result, time.perf_counter() - t0))
+
+
+@app.route("/api/jobs", methods=["POST", "OPTIONS"])
+def create_job():
+    """Accepteert JSON: { "urls": ["https://...", ...] }; de analyse loopt op de achtergrond (GET /api/jobs/<id>)."""
+    if request.method == "OPTIONS":
+        return "", 204
+    body, status = api.job_create(request.get_json(silent=True) or {})
+    return jsonify(body), status
+
+
+@app.route("/api/jobs/<job_id>")
+def job_status(job_id):
+    """Voortgang en de resultaten die klaar zijn sinds ?after=<cursor>; bij "done" ook de totalen."""
+    body, status = api.job_status(job_id, request.args.get("after"))
+    return jsonify(body), status
+
+
+@app.route("/api/vision/<job_id>")
+def vision_job(job_id):
+    """Status van een AI-foto-analyse uit /api/analyze; bij "done" het bijgewerkte rapport."""
+    body, status = api.vision_job(job_id)
+    return jsonify(body), status
+
+
+@app.route("/metrics")
+def metrics_route():
+    """Prometheus-metrics (tekstformaat); met LQM_METRICS_DIR van alle workers samen."""
+    return Response(metrics.render(), mimetype=None, content_type=metrics.CONTENT_TYPE)
+
+
+@app.route("/api/stats")
+def stats():
+    """Tellers van dit proces: HTTP-verbindingen (hergebruik via keep-alive), pagina- en rapportcache."""
+    return jsonify(api.stats())
 
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     debug = os.environ.get("FLASK_DEBUG", "false").lower() == "true"
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     app.run(host="0.0.0.0", port=port, debug=debug)
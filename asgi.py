@@ -0,0 +1,193 @@
+# Async API (ASGI) met hetzelfde JSON-contract als de Flask-app, voor veel gelijktijdige analyses
+# Start: uvicorn asgi:app --host 0.0.0.0 --port $PORT   (of gunicorn -k uvicorn.workers.UvicornWorker asgi:app)
+# Eén proces handelt honderden verzoeken tegelijk af: ophalen gaat via httpx op de event loop
+# (async_fetch), parsen in threads en de AI-foto-analyse zoals in app.py (LQM_VISION_DEFERRED).
+# Geen webframework nodig; de routes zelf staan in api.py, gedeeld met app.py.
+
+from __future__ import annotations
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import Awaitable, Callable, Optional
+from urllib.parse import parse_qs
+
+import api
+import metrics
+import timing
+from async_fetch import close_async_client
+from batch import async_batch_result
+from config import JOBS_WORKER, SERVER_TIMING, TIMING_LOG, VISION_DEFERRED
+from jobs import start_job_runner, stop_job_runner
+from report import async_analyze_url
+
+logger = logging.getLogger("lqm.asgi")
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+# Groter is geen geldige analyse-aanvraag (ook een batch van 500 URL's past ruim)
+MAX_BODY_BYTES = 1024 * 1024
+
+_VISION_PATH = re.compile(r"^/api/vision/([^/]+)$")
+_JOB_PATH = re.compile(r"^/api/jobs/([^/]+)$")
+_STATIC_TYPES = {".html": "text/html; charset=utf-8", ".js": "text/javascript; charset=utf-8",
+                 ".css": "text/css; charset=utf-8", ".svg": "image/svg+xml", ".png": "image/png", ".ico": "image/x-icon"}
+
+Send = Callable[[dict], Awaitable[None]]
+Receive = Callable[[], Awaitable[dict]]
+
+
+class _Response:
+    __slots__ = ("status", "body", "headers")
+
+    def __init__(self, status: int, body: bytes = b"", content_type: Optional[str] = None):
+        self.status = status
+        self.body = body
+        self.headers: dict[str, str] = dict(api.CORS_HEADERS)
+        if content_type:
+            self.headers["Content-Type"] = content_type
+
+
+def _json_response(body: dict, status: int = 200) -> _Response:
+    # Zelfde serialisatie als Flask (jsonify): compact, gesorteerde keys, ASCII, eindigend op een newline
+    payload = json.dumps(body, separators=(",", ":"), sort_keys=True).encode("ascii") + b"\n"
+    return _Response(status, payload, "application/json")
+
+
+def _read_json(body: bytes) -> dict:
+    """Als request.get_json(silent=True) or {}: ongeldige JSON of geen object geeft {}."""
+    try:
+        data = json.loads(body) if body else {}
+    except (ValueError, UnicodeDecodeError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+async def _analyze(body: bytes, query: dict) -> _Response:
+    data = _read_json(body)
+    url, error = api.analyze_input(data)
+    if error:
+        return _json_response(error, 400)
+    with timing.collect() as timings, metrics.ANALYZE_SECONDS.time(endpoint="analyze"):
+        try:
+            report, err = await async_analyze_url(url, defer_vision=VISION_DEFERRED)
+        except Exception:
+            metrics.ANALYZE_REQUESTS.inc(endpoint="analyze", outcome="error")
+            raise
+        with_timings = data.get("timings") is True or query.get("timings") == ["1"]
+        out, status = api.analyze_result(report, err, timings, with_timings)
+        with timing.stage("json"):
+            response = _json_response(out, status)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = timings.header()
+    if TIMING_LOG:
+        timings.log(path="/api/analyze", url=url, status=status)
+    return response
+
+
+async def _analyze_batch(body: bytes) -> _Response:
+    urls, concurrency, error = api.batch_input(_read_json(body))
+    if error:
+        return _json_response(error, 400)
+    t0 = time.perf_counter()
+    result = await async_batch_result(urls, concurrency=concurrency)
+    return _json_response(api.batch_result(result, time.perf_counter() - t0))
+
+
+def _static(name: str) -> _Response:
+    path = os.path.realpath(os.path.join(STATIC_DIR, name))
+    if not path.startswith(STATIC_DIR + os.sep) or not os.path.isfile(path):
+        return _Response(404, b"Not Found", "text/plain; charset=utf-8")
+    with open(path, "rb") as f:
+        content = f.read()
+    return _Response(200, content, _STATIC_TYPES.get(os.path.splitext(path)[1], "application/octet-stream"))
+
+
+async def _route(method: str, path: str, query: dict, receive: Receive) -> _Response:
+    if method == "OPTIONS" and path in ("/api/analyze", "/api/analyze/batch", "/api/jobs"):
+        return _Response(204)
+    if path == "/api/analyze" and method == "POST":
+        return await _analyze(await _read_body(receive), query)
+    if path == "/api/analyze/batch" and method == "POST":
+        return await _analyze_batch(await _read_body(receive))
+    if path == "/api/jobs" and method == "POST":
+        return _json_response(*api.job_create(_read_json(await _read_body(receive))))
+    if method not in ("GET", "HEAD"):
+        return _Response(405, b"Method Not Allowed", "text/plain; charset=utf-8")
+    m = _VISION_PATH.match(path)
+    if m:
+        return _json_response(*api.vision_job(m.group(1)))
+    m = _JOB_PATH.match(path)
+    if m:
+        return _json_response(*api.job_status(m.group(1), (query.get("after") or [None])[0]))
+    if path == "/api/stats":
+        return _json_response(api.stats())
+    if path == "/metrics":
+        return _Response(200, metrics.render().encode("utf-8"), metrics.CONTENT_TYPE)
+    if path == "/":
+        return _static("index.html")
+    if path.startswith("/static/"):
+        return _static(path[len("/static/"):])
+    return _Response(404, b"Not Found", "text/plain; charset=utf-8")
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise _BodyTooLarge()
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+async def _send(send: Send, response: _Response, head: bool = False) -> None:
+    headers = [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in response.headers.items()]
+    headers.append((b"content-length", str(len(response.body)).encode("ascii")))
+    await send({"type": "http.response.start", "status": response.status, "headers": headers})
+    await send({"type": "http.response.body", "body": b"" if head else response.body})
+
+
+async def _lifespan(receive: Receive, send: Send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            if JOBS_WORKER:
+                start_job_runner()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_async_client()
+            await asyncio.to_thread(stop_job_runner)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope: dict, receive: Receive, send: Send) -> None:
+    """ASGI 3-applicatie."""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return
+    method = scope["method"]
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    try:
+        response = await _route(method, scope["path"], query, receive)
+    except _BodyTooLarge:
+        response = _json_response({"ok": False, "error": "Verzoek te groot."}, 413)
+    except Exception:
+        logger.exception("Fout bij %s %s", method, scope["path"])
+        response = _json_response({"ok": False, "error": "Interne fout."}, 500)
+    await _send(send, response, head=method == "HEAD")
@@ -0,0 +1,186 @@
+# Async ophaallaag: pagina's en afbeeldingen via één event loop
+# Gebruikt httpx (keep-alive, HTTP/2 als de host dat aanbiedt). Zonder httpx valt het
+# terug op de synchrone fetch_page in een thread, zodat de aanroepers hetzelfde blijven.
+
+from __future__ import annotations
+import asyncio
+import time
+import weakref
+from dataclasses import asdict
+from typing import Optional
+
+import page_cache
+from config import ASYNC_MAX_CONNECTIONS, ASYNC_MAX_KEEPALIVE, ASYNC_KEEPALIVE_EXPIRY
+from extractor import (
+    USER_AGENT, TIMEOUT, apply_photo_analysis, decode_html, extract_from_html, extracted_from_dict,
+    fetch_page_entry, prepare_url,
+)
+from image_prep import ImageBuffer
+from lqm_scorer import ExtractedData
+from metrics import FETCH_BYTES, FETCH_FAILURES, FETCH_SECONDS, host_label
+from page_cache import CacheEntry
+from timing import stage
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # noqa: F401  (alleen nodig voor HTTP/2 in httpx)
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+
+# Eén client per event loop: een httpx-client is gebonden aan de loop waarin hij verbindingen opent
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, object]" = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """Gedeelde httpx.AsyncClient voor de huidige event loop (None als httpx ontbreekt)."""
+    if httpx is None:
+        return None
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            timeout=TIMEOUT,
+            follow_redirects=True,
+            http2=_HTTP2,
+            limits=httpx.Limits(
+                max_connections=ASYNC_MAX_CONNECTIONS,
+                max_keepalive_connections=ASYNC_MAX_KEEPALIVE,
+                keepalive_expiry=ASYNC_KEEPALIVE_EXPIRY,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_async_client() -> None:
+    """Sluit de client van de huidige event loop (aanroepen voordat de loop stopt)."""
+    if httpx is None:
+        return
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def async_fetch_page(url: str) -> tuple[str | None, str | None]:
+    """Async variant van extractor.fetch_page. Retourneert (html, error_message)."""
+    entry, err = await async_fetch_page_entry(url)
+    return (entry.html if entry else None), err
+
+
+async def async_fetch_page_entry(url: str, user_agent: str | None = None) -> tuple[CacheEntry | None, str | None]:
+    """Async variant van extractor.fetch_page_entry (zelfde paginacache en revalidatie)."""
+    client = get_async_client()
+    if client is None:
+        return await asyncio.to_thread(fetch_page_entry, url, user_agent or USER_AGENT)
+    cached, fresh = page_cache.lookup(url)
+    if fresh:
+        return cached, None
+    headers = cached.conditional_headers() if cached is not None else {}
+    if user_agent:
+        headers["User-Agent"] = user_agent
+    host = host_label(url)
+    t0 = time.perf_counter()
+    try:
+        with stage("fetch"):
+            resp = await client.get(url, headers=headers)
+        if cached is not None and resp.status_code == 304:
+            return page_cache.revalidated(url, cached), None
+        resp.raise_for_status()
+        FETCH_SECONDS.observe(time.perf_counter() - t0, host=host)
+        FETCH_BYTES.inc(len(resp.content), host=host)
+        with stage("decode"):
+            html = decode_html(resp.content)
+    except httpx.HTTPError as e:
+        FETCH_FAILURES.inc(host=host)
+        # httpx voegt een regel met een MDN-link toe; alleen de eerste regel is de melding
+        return None, (str(e).splitlines() or [type(e).__name__])[0]
+    entry = page_cache.store(url, html, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), replaced=cached is not None)
+    return entry, None
+
+
+async def async_fetch_image(url: str, max_bytes: int) -> Optional[bytes]:
+    """Haal een afbeelding op (max. max_bytes). None bij fout of als het geen afbeelding is."""
+    client = get_async_client()
+    if client is None:
+        return None
+    try:
+        with stage("image"):
+            async with client.stream("GET", url) as resp:
+                resp.raise_for_status()
+                content_type = (resp.headers.get("content-type") or "").lower()
+                if "image/" not in content_type and not content_type.startswith("image"):
+                    return None
+                buf = ImageBuffer.for_headers(resp.headers, max_bytes)
+                async for chunk in resp.aiter_bytes():
+                    if not buf.write(chunk):
+                        break
+                return buf.getvalue()
+    except Exception:
+        return None
+
+
+async def async_extract_from_url(url: str, analyze_photo: bool = True) -> tuple[ExtractedData | None, str | None]:
+    """
+    Async variant van extractor.extract_from_url: ophalen op de event loop, parsen in een
+    thread (CPU-werk) en de AI-foto-analyse weer async. Retourneert (ExtractedData, None) of (None, fout).
+    """
+    url = prepare_url(url)
+    if not url:
+        return None, "Geen URL opgegeven."
+
+    entry, err = await async_fetch_page_entry(url)
+    if err:
+        return None, f"Pagina ophalen mislukt: {err}"
+    data, _ = await async_extract_from_entry(entry, url, analyze_photo)
+    return data, None
+
+
+async def async_extract_from_entry(
+    entry: CacheEntry, url: str, analyze_photo: bool = True
+) -> tuple[ExtractedData, bool]:
+    """Async variant van extractor.extract_from_entry; retourneert (data, cachebaar)."""
+    # Ongewijzigde pagina (cache-hit of 304): eerdere extractie hergebruiken
+    if entry.extracted is not None:
+        return extracted_from_dict(entry.extracted), True
+
+    data = await asyncio.to_thread(extract_from_html, entry.html, url, False)
+    if not analyze_photo:
+        return data, False
+    cacheable = await _async_analyze_cover_photo(data, url)
+    if cacheable:
+        # Alleen een volledige extractie (incl. AI-foto) bewaren voor hergebruik
+        page_cache.remember_extracted(url, entry, asdict(data))
+    return data, cacheable
+
+
+async def _async_analyze_cover_photo(data: ExtractedData, url: str) -> bool:
+    """Async variant van extractor.analyze_cover_photo."""
+    if not data.first_photo_src:
+        return True
+    try:
+        from vision_analyzer import async_analyze_first_photo, vision_enabled
+        if not vision_enabled():
+            return True
+        ai = await async_analyze_first_photo(data.first_photo_src, url)
+        apply_photo_analysis(data, ai)
+    except Exception:
+        return False
+    return any(v is not None for v in ai.values())
+
+
+async def async_extract_many(urls: list[str], concurrency: int, analyze_photo: bool = True) -> list[tuple[ExtractedData | None, str | None]]:
+    """Extraheer veel URL's op één event loop, met maximaal `concurrency` tegelijk in behandeling."""
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(u: str):
+        async with sem:
+            return await async_extract_from_url(u, analyze_photo)
+
+    return await asyncio.gather(*(one(u) for u in urls))
@@ -0,0 +1,98 @@
+# Batch-analyse: meerdere advertentie-URL's tegelijk ophalen, extraheren en scoren
+# Alle URL's draaien op één event loop (async_fetch); parsen gebeurt in threads.
+
+from __future__ import annotations
+import asyncio
+import time
+
+from async_fetch import close_async_client
+from config import BATCH_CONCURRENCY, BATCH_URL_TIMEOUT
+from report import async_analyze_url
+
+
+def _aggregate(results: list[dict], elapsed: float) -> dict:
+    """Totalen over alle geslaagde rapporten: aantallen, score-statistiek en bonus/malus per categorie."""
+    ok = [r for r in results if r.get("ok")]
+    scores = [r["total_lqm_score"] for r in ok]
+    by_category: dict[str, dict] = {}
+    for r in ok:
+        for cat, info in r["by_category"].items():
+            agg = by_category.setdefault(cat, {"bonus": 0, "malus": 0, "advisory": info.get("advisory", False)})
+            agg["bonus"] += info["bonus"]
+            agg["malus"] += info["malus"]
+    return {
+        "count": len(results),
+        "ok": len(ok),
+        "failed": len(results) - len(ok),
+        "total_lqm_score_sum": sum(scores),
+        "average_lqm_score": round(sum(scores) / len(scores), 2) if scores else None,
+        "min_lqm_score": min(scores) if scores else None,
+        "max_lqm_score": max(scores) if scores else None,
+        "by_category": by_category,
+        "elapsed_seconds": round(elapsed, 3),
+    }
+
+
+async def analyze_one(url: str, url_timeout: float, user_agent: str | None = None) -> dict:
+    """
+    Rapport of {"ok": False, "url": ..., "error": ...}; fouten en tijdslimiet raken alleen deze URL.
+    user_agent vervangt de browser-User-Agent bij het ophalen van de pagina (crawler).
+    """
+    try:
+        report, err = await asyncio.wait_for(async_analyze_url(url, user_agent=user_agent), url_timeout)
+    except asyncio.TimeoutError:
+        report, err = None, f"Tijdslimiet van {url_timeout:g} s overschreden."
+    except Exception as e:  # onverwachte fout in extractor/scorer
+        report, err = None, f"Analyse mislukt: {e}"
+    return report if report else {"ok": False, "url": url, "error": err}
+
+
+async def async_analyze_batch(urls: list[str], concurrency: int, url_timeout: float) -> dict[str, dict]:
+    """Analyseer unieke URL's op de huidige event loop. Retourneert {url: rapport of fout}."""
+    sem = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(u: str) -> dict:
+        async with sem:
+            # Tijdslimiet per URL, gestart zodra de URL een plek heeft (niet bij het inplannen)
+            return await analyze_one(u, url_timeout)
+
+    unique = list(dict.fromkeys(urls))
+    results = await asyncio.gather(*(one(u) for u in unique))
+    return dict(zip(unique, results))
+
+
+def analyze_batch(
+    urls: list[str],
+    concurrency: int | None = None,
+    url_timeout: float | None = None,
+) -> dict:
+    """
+    Analyseer een lijst URL's parallel (max. `concurrency` tegelijk). Elke URL krijgt
+    maximaal `url_timeout` seconden; een trage host wordt dan als fout gemeld en
+    houdt de rest van de batch niet op. Retourneert {"results": [...], "totals": {...}}
+    met de resultaten in dezelfde volgorde als de invoer.
+    """
+    async def run() -> dict:
+        try:
+            return await async_batch_result(urls, concurrency, url_timeout)
+        finally:
+            await close_async_client()
+
+    return asyncio.run(run())
+
+
+async def async_batch_result(
+    urls: list[str],
+    concurrency: int | None = None,
+    url_timeout: float | None = None,
+) -> dict:
+    """Als analyze_batch, maar op de lopende event loop (asgi.py); de async client blijft open."""
+    concurrency = max(1, concurrency or BATCH_CONCURRENCY)
+    url_timeout = url_timeout or BATCH_URL_TIMEOUT
+    t0 = time.monotonic()
+
+    # Dubbele URL's maar één keer analyseren
+    cleaned = [u.strip() for u in urls if u and u.strip()]
+    outcome = await async_analyze_batch(cleaned, concurrency, url_timeout)
+    results = [outcome[u] for u in cleaned]
+    return {"results": results, "totals": _aggregate(results, time.monotonic() - t0)}
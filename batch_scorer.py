@@ -0,0 +1,261 @@
+# Gevectoriseerd scoren van veel ExtractedData-records tegelijk (NumPy, optioneel)
+# Voor offline runs over de hele portefeuille: alleen punten, geen LQMScoreItems of teksten.
+# De records worden per gebruikt veld in kolommen gezet (waarde, null-masker, truthy) en elke
+# regel uit lqm_rules.RULES wordt als array-bewerking uitgevoerd: de voorwaarden van de gevallen
+# worden maskers en np.select kiest per record het eerste geval dat klopt, net als de if/elif-keten.
+# Voorwaarden zijn dezelfde Python-expressies als in de tabel (met dezelfde gewichten). Delen die
+# niet als array-bewerking te schrijven zijn (stringhelpers zoals _validate_postcode) worden per
+# record in Python uitgerekend en daarna als kolom gebruikt.
+
+from __future__ import annotations
+import ast
+import typing
+from dataclasses import dataclass
+from operator import attrgetter
+from typing import Iterable, NamedTuple
+
+from lqm_rules import ADVISORY_CATEGORIES, CATEGORIES, CATEGORY_LET, RULE_NAMESPACE, Rule, inline_weights
+from lqm_scorer import ExtractedData
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_NUMBER_TYPES = (int, float, bool)
+_PLAIN_TYPES = {int, float, bool, type(None)}
+# Velden die volgens ExtractedData een getal (of bool) of None zijn; een string daarin is een fout
+_NUMERIC_FIELDS = frozenset(
+    name for name, hint in typing.get_type_hints(ExtractedData).items()
+    if set(typing.get_args(hint) or (hint,)) <= {int, float, bool, type(None)}
+)
+# Groter is in float64 niet meer exact (score_all rekent met Python-ints)
+_MAX_EXACT_POINTS = 2 ** 53
+
+
+class _Col(NamedTuple):
+    """Kolom (of scalar) met Python-semantiek: waarde (0 bij None, NaN bij geen getal), None-masker en bool(x)."""
+    value: object
+    null: object
+    truthy: object
+
+
+def _bool_col(mask) -> _Col:
+    mask = np.asarray(mask)
+    return _Col(mask.astype(np.float64), np.False_, mask)
+
+
+def _column(raw: list, field: str | None = None) -> _Col:
+    """Kolom van ruwe waarden; voor een getalveld (field in _NUMERIC_FIELDS) alleen getallen of None, anders TypeError."""
+    values = np.fromiter(raw, dtype=object, count=len(raw))
+    null = np.equal(values, None)
+    truthy = values.astype(bool)
+    # Eerst de types controleren: astype(np.float64) zou ook "2" stilletjes omzetten naar 2.0
+    if set(map(type, raw)) <= _PLAIN_TYPES:
+        return _Col(np.where(null, 0, values).astype(np.float64), null, truthy)
+    number = np.fromiter((isinstance(v, _NUMBER_TYPES) for v in raw), dtype=bool, count=len(raw))
+    other = ~(number | null)
+    if not other.any():
+        return _Col(np.where(null, 0, values).astype(np.float64), null, truthy)
+    if field in _NUMERIC_FIELDS:
+        i = int(np.argmax(other))
+        raise TypeError(f"score_batch: {field} moet een getal of None zijn, record {i} heeft {raw[i]!r}")
+    # Geen getal: NaN, zodat == onwaar en != waar is zoals in Python (None staat in null, waarde 0)
+    value = np.where(other, np.nan, np.where(null, 0, values)).astype(np.float64)
+    return _Col(value, null, truthy)
+
+
+@dataclass
+class BatchScores:
+    """Punten per record (rij) en attribuut (kolom, in de volgorde van score_points) en het totaal per record."""
+    attributes: list[str]
+    points: "np.ndarray"  # int64, (records, attributen)
+    totals: "np.ndarray"  # int64, gelijk aan total_lqm_score(score_all(record))
+
+    def column(self, attribute: str) -> "np.ndarray":
+        return self.points[:, self.attributes.index(attribute)]
+
+
+_CMP = {
+    ast.Eq: lambda a, b: a == b, ast.NotEq: lambda a, b: a != b,
+    ast.Lt: lambda a, b: a < b, ast.LtE: lambda a, b: a <= b,
+    ast.Gt: lambda a, b: a > b, ast.GtE: lambda a, b: a >= b,
+}
+_BINOP = {ast.Add: lambda a, b: a + b, ast.Sub: lambda a, b: a - b, ast.Mult: lambda a, b: a * b}
+
+
+class _RuleBatch:
+    """Evalueert de expressies van één regel over alle records; lets en velden worden één keer als kolom gemaakt."""
+
+    def __init__(self, records: list, rule: Rule, columns: dict):
+        self.records = records
+        self.columns = columns  # gedeeld tussen regels: veldnaam of broncode -> _Col
+        self.lets = dict(CATEGORY_LET.get(rule.category, {}))
+        self.lets.update(rule.let)
+        self._let_cols: dict[str, _Col] = {}
+
+    # ---------- Per record in Python ----------
+
+    def _python_column(self, node: ast.expr) -> _Col:
+        """Expressie die NumPy niet kan uitdrukken: per record uitrekenen (met de lets die ze gebruikt)."""
+        needed = {n.id for n in ast.walk(node) if isinstance(n, ast.Name)} & set(self.lets)
+        for name, expr in reversed(list(self.lets.items())):
+            if name in needed:
+                needed |= {n.id for n in ast.walk(ast.parse(expr, mode="eval")) if isinstance(n, ast.Name)}
+        lines = ["def _f(d):"]
+        lines += [f"    {name} = {expr}" for name, expr in self.lets.items() if name in needed]
+        lines.append(f"    return {ast.unparse(node)}")
+        source = "\n".join(lines)
+        # Zelfde broncode (bijv. een categorie-let in meerdere regels): kolom hergebruiken
+        col = self.columns.get(source)
+        if col is None:
+            namespace = dict(RULE_NAMESPACE)
+            exec(source, namespace)
+            col = self.columns[source] = _column(list(map(namespace["_f"], self.records)))
+        return col
+
+    # ---------- Als array-bewerking ----------
+
+    def _vectorizable(self, node: ast.expr) -> bool:
+        if isinstance(node, ast.Constant):
+            return node.value is None or type(node.value) in _NUMBER_TYPES
+        if isinstance(node, ast.Attribute):
+            return isinstance(node.value, ast.Name) and node.value.id == "d"
+        if isinstance(node, ast.Name):
+            return node.id in self.lets
+        if isinstance(node, ast.Compare):
+            for op, right in zip(node.ops, node.comparators):
+                if isinstance(op, (ast.Is, ast.IsNot)):
+                    if not (isinstance(right, ast.Constant) and right.value is None):
+                        return False
+                elif type(op) not in _CMP:
+                    return False
+            return all(self._vectorizable(n) for n in [node.left, *node.comparators])
+        if isinstance(node, ast.BoolOp):
+            return all(self._vectorizable(n) for n in node.values)
+        if isinstance(node, ast.UnaryOp):
+            return isinstance(node.op, (ast.Not, ast.USub)) and self._vectorizable(node.operand)
+        if isinstance(node, ast.BinOp):
+            return type(node.op) in _BINOP and self._vectorizable(node.left) and self._vectorizable(node.right)
+        if isinstance(node, ast.IfExp):
+            return all(self._vectorizable(n) for n in (node.test, node.body, node.orelse))
+        if isinstance(node, ast.Call):
+            return (isinstance(node.func, ast.Name) and node.func.id in ("min", "max", "bool")
+                    and not node.keywords and all(self._vectorizable(a) for a in node.args))
+        return False
+
+    def evaluate(self, node: ast.expr) -> _Col:
+        if not self._vectorizable(node):
+            return self._python_column(node)
+        if isinstance(node, ast.Constant):
+            v = node.value
+            if v is None:
+                return _Col(np.float64(0), np.True_, np.False_)
+            return _Col(np.float64(v), np.False_, np.bool_(v))
+        if isinstance(node, ast.Attribute):
+            col = self.columns.get(node.attr)
+            if col is None:
+                col = self.columns[node.attr] = _column(list(map(attrgetter(node.attr), self.records)), node.attr)
+            return col
+        if isinstance(node, ast.Name):
+            col = self._let_cols.get(node.id)
+            if col is None:
+                col = self._let_cols[node.id] = self.evaluate(ast.parse(self.lets[node.id], mode="eval").body)
+            return col
+        if isinstance(node, ast.Compare):
+            result = np.True_
+            left = self.evaluate(node.left)
+            for op, right_node in zip(node.ops, node.comparators):
+                if isinstance(op, ast.Is):
+                    result = result & left.null
+                    left = _bool_col(left.null)
+                    continue
+                if isinstance(op, ast.IsNot):
+                    result = result & ~left.null
+                    left = _bool_col(~left.null)
+                    continue
+                right = self.evaluate(right_node)
+                both = ~(left.null | right.null)
+                mask = _CMP[type(op)](left.value, right.value) & both
+                if isinstance(op, ast.Eq):
+                    mask = mask | (left.null & right.null)
+                elif isinstance(op, ast.NotEq):
+                    mask = mask | (left.null ^ right.null)
+                # Zonder None-controle ervoor zou Python hier een TypeError geven; zulke records
+                # vallen altijd al in een eerder geval, dus False is dan veilig.
+                result = result & mask
+                left = right
+            return _bool_col(result)
+        if isinstance(node, ast.BoolOp):
+            # a and b: a als a onwaar is, anders b; a or b: a als a waar is, anders b
+            out = self.evaluate(node.values[0])
+            for value_node in node.values[1:]:
+                other = self.evaluate(value_node)
+                pick_other = out.truthy if isinstance(node.op, ast.And) else ~out.truthy
+                out = _Col(np.where(pick_other, other.value, out.value),
+                           np.where(pick_other, other.null, out.null),
+                           np.where(pick_other, other.truthy, out.truthy))
+            return out
+        if isinstance(node, ast.UnaryOp):
+            operand = self.evaluate(node.operand)
+            if isinstance(node.op, ast.Not):
+                return _bool_col(~operand.truthy)
+            return _Col(-operand.value, operand.null, operand.truthy)
+        if isinstance(node, ast.BinOp):
+            a, b = self.evaluate(node.left), self.evaluate(node.right)
+            value = _BINOP[type(node.op)](a.value, b.value)
+            return _Col(value, a.null | b.null, value != 0)
+        if isinstance(node, ast.IfExp):
+            test, body, orelse = (self.evaluate(n) for n in (node.test, node.body, node.orelse))
+            pick = test.truthy
+            return _Col(np.where(pick, body.value, orelse.value), np.where(pick, body.null, orelse.null),
+                        np.where(pick, body.truthy, orelse.truthy))
+        # min / max / bool
+        args = [self.evaluate(a) for a in node.args]
+        if node.func.id == "bool":
+            return _bool_col(args[0].truthy)
+        value = args[0].value
+        for a in args[1:]:
+            value = (np.minimum if node.func.id == "min" else np.maximum)(value, a.value)
+        return _Col(value, np.False_, value != 0)
+
+
+def _rule_points(records: list, rule: Rule, columns: dict) -> "np.ndarray":
+    n = len(records)
+    if all(case.points == 0 for case in rule.cases):
+        return np.zeros(n, dtype=np.int64)
+    batch = _RuleBatch(records, rule, columns)
+
+    def expr(source) -> _Col:
+        return batch.evaluate(ast.parse(inline_weights(source, rule.weights), mode="eval").body)
+
+    conditions = [np.broadcast_to(expr(case.when).truthy, n) for case in rule.cases[:-1]]
+    choices = [np.broadcast_to(expr(case.points).value, n) for case in rule.cases]
+    points = np.select(conditions, choices[:-1], default=choices[-1])
+    if not np.all(np.abs(points) <= _MAX_EXACT_POINTS):  # ook NaN
+        raise OverflowError(f"score_batch: punten voor {rule.attribute} buiten bereik (gebruik score_all)")
+    return points.astype(np.int64)
+
+
+def score_batch(records: Iterable) -> BatchScores:
+    """
+    Punten van alle regels voor veel records tegelijk (ExtractedData of objecten met dezelfde velden).
+    Rijen in de volgorde van records, kolommen zoals lqm_scorer.score_points; totals = total_lqm_score.
+    """
+    if np is None:
+        raise RuntimeError("score_batch vereist NumPy (pip install numpy)")
+    records = list(records)
+    rules = [rule for compiled in CATEGORIES for rule in compiled.rules]
+    columns: dict[str, _Col] = {}
+    points = np.zeros((len(records), len(rules)), dtype=np.int64)
+    scored = np.array([rule.category not in ADVISORY_CATEGORIES for rule in rules], dtype=bool)
+    if records:
+        # Alle getalvelden vooraf (ook die alleen in adviesregels staan): een string geeft een TypeError,
+        # zoals score_points. De kolommen worden daarna door de regels hergebruikt.
+        for name in _NUMERIC_FIELDS:
+            if hasattr(records[0], name):
+                columns[name] = _column(list(map(attrgetter(name), records)), name)
+        for j, rule in enumerate(rules):
+            points[:, j] = _rule_points(records, rule, columns)
+    totals = points[:, scored].sum(axis=1, dtype=np.int64)
+    return BatchScores([rule.attribute for rule in rules], points, totals)
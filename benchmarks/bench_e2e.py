@@ -0,0 +1,191 @@
+# End-to-end benchmark zonder internet: corpus-pagina's via een lokale server, AI-foto-analyse via een nep-OpenAI
+# Meet per pagina (small, typical, huge) de doorvoer en p50/p95/p99-latency van extract_from_url en
+# POST /api/analyze (Flask test client, dus zonder WSGI-server ertussen). Alle caches staan uit, zodat
+# elk verzoek echt ophaalt, parst, de foto analyseert en scoort. De uitkomst gaat als JSON naar
+# benchmarks/results/<commit>.json; met --compare zie je het verschil met een eerdere meting.
+# Gebruik: python benchmarks/bench_e2e.py [--requests 50] [--concurrency 4] [--latency 20] [--openai-latency 300]
+#          python benchmarks/bench_e2e.py --compare benchmarks/results/<oude commit>.json
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+RESULTS_DIR = os.path.join(HERE, "results")
+PAGES = ("small", "typical", "huge")
+TARGETS = ("extract_from_url", "api_analyze")
+METRICS = ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+
+
+def _start_server(latency: float, openai_latency: float) -> tuple[subprocess.Popen, int]:
+    """Fixture-server als apart proces, zodat hij niet met de metingen om de GIL concurreert."""
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(HERE, "fixture_server.py"), "--port", "0",
+         "--latency", str(latency), "--openai-latency", str(openai_latency)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    line = proc.stdout.readline().split()
+    if len(line) != 2 or line[0] != "port":
+        proc.kill()
+        raise RuntimeError("Fixture-server is niet gestart")
+    return proc, int(line[1])
+
+
+def _configure(port: int, vision: bool) -> None:
+    """Omgeving vóór het importeren van de app: config.py leest alles bij import."""
+    os.environ.update({
+        "LQM_PAGE_CACHE": "off",
+        "LQM_REPORT_CACHE_MAX_ENTRIES": "0",
+        "LQM_VISION_CACHE_MAX_ENTRIES": "0",
+        "LQM_VISION_DEFERRED": "false",  # /api/analyze wacht op de foto-analyse, zoals extract_from_url
+        "LQM_VISION_MODE": "openai",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{port}/v1",
+    })
+    if vision:
+        os.environ["OPENAI_API_KEY"] = "bench"
+    else:
+        os.environ.pop("OPENAI_API_KEY", None)
+    sys.path.insert(0, ROOT)
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Lineair geïnterpoleerd percentiel (p tussen 0 en 100) van een gesorteerde lijst."""
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _run(call, requests: int, concurrency: int, warmup: int) -> dict:
+    """call() -> True bij succes. Eerst warmup keer los, daarna requests keer met concurrency threads."""
+    for _ in range(warmup):
+        call()
+
+    def timed(_):
+        t = time.perf_counter()
+        ok = call()
+        return time.perf_counter() - t, ok
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(timed, range(requests)))
+    wall = time.perf_counter() - t0
+    latencies = sorted(s * 1000 for s, _ in samples)
+    return {
+        "requests": requests,
+        "errors": sum(1 for _, ok in samples if not ok),
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(requests / wall, 2),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                             check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(baseline: dict, current: dict) -> None:
+    """Tabel met de verandering per meting; doorvoer omhoog en latency omlaag is beter."""
+    print(f"\nVergelijking met {baseline.get('commit')} ({baseline.get('timestamp')})")
+    print(f"{'meting':<28}{'metric':<16}{'was':>10}{'nu':>10}{'verschil':>10}")
+    for key, now in current["results"].items():
+        before = baseline.get("results", {}).get(key)
+        if before is None:
+            continue
+        for metric in METRICS:
+            old, new = before.get(metric), now.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old * 100
+            print(f"{key:<28}{metric:<16}{old:>10.1f}{new:>10.1f}{change:>+9.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end benchmark van extract_from_url en /api/analyze")
+    parser.add_argument("--requests", type=int, default=50, help="verzoeken per pagina en meting")
+    parser.add_argument("--concurrency", type=int, default=4, help="verzoeken tegelijk")
+    parser.add_argument("--warmup", type=int, default=3, help="verzoeken vooraf die niet meetellen")
+    parser.add_argument("--latency", type=float, default=20, help="ms vertraging van de server per pagina/foto")
+    parser.add_argument("--openai-latency", type=float, default=300, help="ms vertraging van de nep-OpenAI")
+    parser.add_argument("--pages", default=",".join(PAGES), help="komma-gescheiden, uit " + ", ".join(PAGES))
+    parser.add_argument("--no-vision", action="store_true", help="zonder AI-foto-analyse (geen OPENAI_API_KEY)")
+    parser.add_argument("--output", help="JSON-uitvoer (standaard benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="eerdere uitvoer om mee te vergelijken")
+    args = parser.parse_args()
+    pages = [p.strip() for p in args.pages.split(",") if p.strip()]
+
+    server, port = _start_server(args.latency, args.openai_latency)
+    try:
+        _configure(port, vision=not args.no_vision)
+        from app import app
+        from extractor import extract_from_url
+
+        client = app.test_client()
+        base = f"http://127.0.0.1:{port}"
+        results = {}
+        for page in pages:
+            url = f"{base}/{page}.html"
+
+            def via_extractor(url=url) -> bool:
+                data, err = extract_from_url(url)
+                return err is None and data is not None
+
+            def via_api(url=url) -> bool:
+                resp = client.post("/api/analyze", json={"url": url})
+                return resp.status_code == 200 and bool(resp.get_json().get("ok"))
+
+            for target, call in zip(TARGETS, (via_extractor, via_api)):
+                key = f"{target}/{page}"
+                results[key] = _run(call, args.requests, max(1, args.concurrency), args.warmup)
+                r = results[key]
+                print(f"{key:<28}{r['throughput_rps']:>8.1f} req/s  p50 {r['p50_ms']:>8.1f} ms  "
+                      f"p95 {r['p95_ms']:>8.1f} ms  p99 {r['p99_ms']:>8.1f} ms  fouten {r['errors']}")
+    finally:
+        server.terminate()
+        server.wait()
+
+    commit = _git_commit()
+    out = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {
+            "requests": args.requests, "concurrency": args.concurrency, "warmup": args.warmup,
+            "latency_ms": args.latency, "openai_latency_ms": args.openai_latency, "vision": not args.no_vision,
+        },
+        "results": results,
+    }
+    path = args.output or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2)
+    print(f"Resultaat: {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), out)
+
+
+if __name__ == "__main__":
+    main()
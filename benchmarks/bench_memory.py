@@ -0,0 +1,62 @@
+# Geheugen per listing: ExtractedData + de LQMScoreItems van score_all, vastgehouden in een batch
+# Vergelijkt de huidige klassen (slots) met dezelfde dataclasses mét __dict__ per object.
+# Gebruik: python benchmarks/bench_memory.py [--listings 20000]
+
+from __future__ import annotations
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from dataclasses import astuple, fields, make_dataclass
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lqm_scorer import ExtractedData, LQMScoreItem, score_all  # noqa: E402
+from synthetic import listings as synthetic_listings  # noqa: E402
+
+
+def _plain(cls):
+    """Zelfde velden en defaults, maar een gewone dataclass (met __dict__)."""
+    return make_dataclass(f"Plain{cls.__name__}", [(f.name, f.type, f.default) for f in fields(cls)])
+
+
+def _measure(make) -> float:
+    """Bytes per listing die het resultaat van make() (een lijst per listing) vasthoudt."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = make()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(s.size_diff for s in after.compare_to(before, "filename"))
+    return size / len(kept)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Geheugen per listing van ExtractedData en score_all")
+    parser.add_argument("--listings", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    listings = synthetic_listings(args.listings, args.seed)
+    plain_data, plain_item = _plain(ExtractedData), _plain(LQMScoreItem)
+    # Beschrijvingen e.d. bestaan al; gemeten wordt alleen wat de objecten zelf en de items extra kosten
+    results = {
+        "ExtractedData (slots)": lambda: [ExtractedData(*astuple(d)) for d in listings],
+        "ExtractedData (__dict__)": lambda: [plain_data(*astuple(d)) for d in listings],
+        "score_all (slots)": lambda: [score_all(d) for d in listings],
+        "score_all (__dict__)": lambda: [[plain_item(*astuple(i)) for i in score_all(d)] for d in listings],
+    }
+    print(f"{args.listings} listings, {len(score_all(listings[0]))} items per listing")
+    for name, make in results.items():
+        per_listing = _measure(make)
+        print(f"  {name:<26} {per_listing / 1024:8.1f} KiB per listing")
+
+    items = [i for d in listings[:1000] for i in score_all(d)]
+    texts = [i.reason for i in items] + [i.recommendation for i in items if i.recommendation]
+    print(f"  teksten: {len(texts)} in 1000 listings, {len({id(t) for t in texts})} verschillende objecten")
+
+
+if __name__ == "__main__":
+    main()
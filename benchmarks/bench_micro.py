@@ -0,0 +1,201 @@
+# Micro-benchmarks van de scorer en de extractiehulpen, per functie
+# Loopt over de corpus-pagina's (benchmarks/corpus) en synthetische listings (synthetic.py). Per meting:
+# warmup, dan --repeat herhalingen van een blok aanroepen (blokgrootte zoals timeit.autorange, minstens
+# --min-time seconden); gerapporteerd wordt de tijd per aanroep (min, mediaan, spreiding). Daarna één
+# keer met tracemalloc: piekgeheugen en aantal geheugenblokken per aanroep die na afloop nog bestaan.
+# Gebruik: python benchmarks/bench_micro.py [--filter score_] [--repeat 7]
+#          python benchmarks/bench_micro.py --compare benchmarks/results/micro-<commit>.json [--max-regression 10]
+
+from __future__ import annotations
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+from bench_e2e import RESULTS_DIR, _git_commit  # noqa: E402
+from extractor import _apply_reviews, _extract_from_json_ld, _find_json_ld, _listing_images, extract_from_html  # noqa: E402
+from lqm_scorer import (  # noqa: E402
+    score_all, score_availability, score_description, score_filters, score_guest_opinion, score_impact,
+    score_location, score_photos, score_time_settings, summary_by_category, ExtractedData,
+)
+from page_index import build_index  # noqa: E402
+from synthetic import listings as synthetic_listings  # noqa: E402
+
+PAGES = ("small", "typical", "huge")
+CATEGORY_FUNCTIONS = (score_description, score_impact, score_location, score_availability, score_photos,
+                      score_guest_opinion, score_filters, score_time_settings)
+
+
+def _read_page(name: str) -> str:
+    with open(os.path.join(HERE, "corpus", f"{name}.html"), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _cycle(values: list) -> Callable[[], object]:
+    """Elke aanroep het volgende element, zodat één record niet steeds warm in de cache zit."""
+    return itertools.cycle(values).__next__
+
+
+def build_cases(n_synthetic: int, seed: int) -> dict[str, Callable[[], object]]:
+    """Naam -> functie zonder argumenten die precies de te meten aanroep doet."""
+    cases: dict[str, Callable[[], object]] = {}
+    records = synthetic_listings(n_synthetic, seed)
+    next_record = _cycle(records)
+    cases["score_all[synthetic]"] = lambda: score_all(next_record())
+    for fn in CATEGORY_FUNCTIONS:
+        cases[f"{fn.__name__}[synthetic]"] = lambda fn=fn: fn(next_record())
+    next_items = _cycle([score_all(r) for r in records])
+    cases["summary_by_category[synthetic]"] = lambda: summary_by_category(next_items())
+
+    for page in PAGES:
+        html = _read_page(page)
+        url = f"http://127.0.0.1/{page}.html"
+        index = build_index(html)
+        data = extract_from_html(html, url, analyze_photo=False)
+        json_data = _extract_from_json_ld(_find_json_ld(index))
+
+        def listing_images(index=index):
+            index.listing_images = None  # anders geeft de functie de eerder berekende lijst terug
+            return _listing_images(index)
+
+        cases[f"score_all[{page}]"] = lambda data=data: score_all(data)
+        cases[f"_listing_images[{page}]"] = listing_images
+        cases[f"_find_json_ld[{page}]"] = lambda index=index: _find_json_ld(index)
+        cases[f"_apply_reviews[{page}]"] = lambda index=index, json_data=json_data: _apply_reviews(index, json_data, ExtractedData())
+        cases[f"extract_from_html[{page}]"] = lambda html=html, url=url: extract_from_html(html, url, analyze_photo=False)
+    return cases
+
+
+def _block_size(fn: Callable[[], object], min_time: float) -> int:
+    """Aantal aanroepen per herhaling: 1, 2, 5, 10, 20, ... tot één blok minstens min_time duurt."""
+    for n in itertools.chain.from_iterable((b, 2 * b, 5 * b) for b in (10 ** i for i in itertools.count())):
+        t = time.perf_counter()
+        for _ in range(n):
+            fn()
+        if time.perf_counter() - t >= min_time:
+            return n
+    raise AssertionError("unreachable")
+
+
+def _allocations(fn: Callable[[], object], calls: int = 20) -> tuple[float, float]:
+    """(piekgeheugen in bytes, nog levende geheugenblokken) per aanroep, gemiddeld over calls aanroepen."""
+    kept = []
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        peaks = []
+        for _ in range(calls):
+            current, _peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            kept.append(fn())
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(s.count_diff for s in stats if not s.traceback[0].filename.endswith("tracemalloc.py"))
+    return statistics.median(peaks), blocks / calls
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int, min_time: float) -> dict:
+    for _ in range(warmup):
+        fn()
+    number = _block_size(fn, min_time)
+    per_call = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - t) / number * 1e6)
+    peak, blocks = _allocations(fn)
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min_us": round(min(per_call), 3),
+        "median_us": round(statistics.median(per_call), 3),
+        "stdev_us": round(statistics.stdev(per_call), 3) if len(per_call) > 1 else 0.0,
+        "peak_bytes": int(peak),
+        "blocks": round(blocks, 1),
+    }
+
+
+def compare(baseline: dict, current: dict, max_regression: float | None) -> int:
+    """Tabel met de mediaan per aanroep tegen de baseline; 1 als iets meer dan max_regression % trager is."""
+    print(f"\nVergelijking met {baseline.get('commit')} ({baseline.get('timestamp')})")
+    print(f"{'meting':<40}{'was µs':>12}{'nu µs':>12}{'verschil':>10}{'blokken':>14}")
+    regressions = []
+    for name, now in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None or not before.get("median_us"):
+            continue
+        change = (now["median_us"] - before["median_us"]) / before["median_us"] * 100
+        # Binnen de spreiding van beide metingen is een verschil geen verschil
+        noise = (now["stdev_us"] + before["stdev_us"]) / before["median_us"] * 100
+        flag = ""
+        if max_regression is not None and change > max(max_regression, noise):
+            regressions.append(name)
+            flag = "  TRAGER"
+        blocks = f"{before['blocks']:g} -> {now['blocks']:g}"
+        print(f"{name:<40}{before['median_us']:>12.2f}{now['median_us']:>12.2f}{change:>+9.1f}%{blocks:>14}{flag}")
+    if regressions:
+        print(f"\n{len(regressions)} meting(en) meer dan {max_regression:g}% trager: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks van scorer en extractiehulpen")
+    parser.add_argument("--filter", default="", help="alleen metingen waarvan de naam dit bevat")
+    parser.add_argument("--repeat", type=int, default=7, help="herhalingen per meting")
+    parser.add_argument("--warmup", type=int, default=50, help="aanroepen vooraf die niet meetellen")
+    parser.add_argument("--min-time", type=float, default=0.05, help="minimale duur van één herhaling (s)")
+    parser.add_argument("--synthetic", type=int, default=500, help="aantal synthetische listings")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="JSON-uitvoer (standaard benchmarks/results/micro-<commit>.json)")
+    parser.add_argument("--compare", help="eerdere uitvoer (baseline) om mee te vergelijken")
+    parser.add_argument("--max-regression", type=float, help="met --compare: exitcode 1 als iets zoveel %% trager is")
+    args = parser.parse_args()
+
+    cases = {name: fn for name, fn in build_cases(args.synthetic, args.seed).items() if args.filter in name}
+    results = {}
+    for name, fn in cases.items():
+        r = results[name] = measure(fn, max(1, args.repeat), args.warmup, args.min_time)
+        print(f"{name:<40}{r['median_us']:>12.2f} µs  (min {r['min_us']:.2f}, ±{r['stdev_us']:.2f})  "
+              f"piek {r['peak_bytes'] / 1024:8.1f} KiB  {r['blocks']:g} blokken")
+
+    commit = _git_commit()
+    out = {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {"repeat": args.repeat, "warmup": args.warmup, "min_time": args.min_time,
+                     "synthetic": args.synthetic, "seed": args.seed},
+        "results": results,
+    }
+    path = args.output or os.path.join(RESULTS_DIR, f"micro-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2)
+    print(f"Resultaat: {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            return compare(json.load(f), out, args.max_regression)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,159 @@
+# Lokale HTTP-server voor de end-to-end benchmark: listingpagina's uit benchmarks/corpus en een nep-OpenAI
+#   GET  /<naam>.html              pagina uit de corpus (small, typical, huge)
+#   GET  /photos/<iets>.jpg        altijd corpus/photos/cover.jpg (alle foto's in de corpus wijzen hierheen)
+#   POST /v1/chat/completions      vast antwoord in het formaat van de OpenAI Chat Completions API
+# Plus een kleine site voor de crawler (python -m lqm crawl http://127.0.0.1:<port>/overzicht ...):
+#   GET  /robots.txt               Disallow: /prive/ en de sitemap-index
+#   GET  /sitemap.xml              index met /sitemap-1.xml en /sitemap-2.xml.gz (gzip)
+#   GET  /overzicht?pagina=N       overzichtspagina's 1-3, elk met 10 advertenties en een link naar de volgende
+#   GET  /vakantiehuis/<n>         advertentie 1-144 (de typical-pagina); /prive/<n> idem, maar verboden in robots.txt
+# Met --latency/--openai-latency wacht elk verzoek eerst zoveel milliseconden (netwerk, model).
+# Gebruik: python benchmarks/fixture_server.py [--port 0] [--latency 50] [--openai-latency 800]
+# De server schrijft "port <nummer>" op stdout zodra hij luistert (bench_e2e.py start hem als apart proces).
+
+from __future__ import annotations
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+VISION_ANSWER = {"is_exterior": True, "has_watermark": False, "is_collage": False}
+
+
+def _load_corpus() -> dict[str, tuple[bytes, str]]:
+    files = {}
+    for name in os.listdir(CORPUS_DIR):
+        if name.endswith(".html"):
+            with open(os.path.join(CORPUS_DIR, name), "rb") as f:
+                files["/" + name] = (f.read(), "text/html; charset=utf-8")
+    with open(os.path.join(CORPUS_DIR, "photos", "cover.jpg"), "rb") as f:
+        files["/photos/"] = (f.read(), "image/jpeg")
+    return files
+
+
+def _chat_completion() -> bytes:
+    return json.dumps({
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "gpt-4o-mini",
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": json.dumps(VISION_ANSWER)},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+    }).encode("utf-8")
+
+
+SITE_LISTINGS = 144  # /vakantiehuis/1 t/m 144: 1-60 in sitemap 1, 61-120 in sitemap 2, 115-144 op de overzichtspagina's
+SITE_PAGES = 3
+
+
+def _urlset(origin: str, paths: list[str]) -> bytes:
+    urls = "".join(f"<url><loc>{origin}{p}</loc></url>" for p in paths)
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>'.encode()
+
+
+def _site(path: str, query: str, origin: str, listing: bytes) -> tuple[int, bytes, str] | None:
+    """Antwoord voor de crawler-site, of None als het pad er niet bij hoort."""
+    if path == "/robots.txt":
+        body = f"User-agent: *\nDisallow: /prive/\n\nSitemap: {origin}/sitemap.xml\n"
+        return 200, body.encode(), "text/plain"
+    if path == "/sitemap.xml":
+        maps = "".join(f"<sitemap><loc>{origin}{m}</loc></sitemap>" for m in ("/sitemap-1.xml", "/sitemap-2.xml.gz"))
+        body = f'<?xml version="1.0" encoding="UTF-8"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{maps}</sitemapindex>'
+        return 200, body.encode(), "application/xml"
+    if path == "/sitemap-1.xml":
+        # Met een dubbele (tracking-parameter) en een verboden URL
+        paths = [f"/vakantiehuis/{n}" for n in range(1, 61)] + ["/vakantiehuis/1?utm_source=sitemap", "/prive/1"]
+        return 200, _urlset(origin, paths), "application/xml"
+    if path == "/sitemap-2.xml.gz":
+        return 200, gzip.compress(_urlset(origin, [f"/vakantiehuis/{n}" for n in range(61, 121)])), "application/gzip"
+    if path == "/overzicht":
+        page = int(dict(p.split("=", 1) for p in query.split("&") if "=" in p).get("pagina", 1))
+        if not 1 <= page <= SITE_PAGES:
+            return 404, b"Not found", "text/plain"
+        first = 115 + (page - 1) * 10
+        links = "".join(f'<li><a href="/vakantiehuis/{n}#boeken">Huisje {n}</a></li>' for n in range(first, first + 10))
+        links += '<li><a href="/prive/2">Prive</a></li><li><a href="https://elders.example/vakantiehuis/1">Elders</a></li>'
+        if page < SITE_PAGES:
+            links += f'<li><a href="?pagina={page + 1}">Volgende</a></li>'
+        return 200, f"<html><body><ul>{links}</ul></body></html>".encode(), "text/html; charset=utf-8"
+    if path.startswith(("/vakantiehuis/", "/prive/")):
+        n = path.rsplit("/", 1)[1]
+        if n.isdigit() and 1 <= int(n) <= SITE_LISTINGS:
+            return 200, listing, "text/html; charset=utf-8"
+        return 404, b"Not found", "text/plain"
+    return None
+
+
+def make_handler(files: dict[str, tuple[bytes, str]], latency: float, openai_latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, net als een echte site
+
+        def _send(self, status: int, body: bytes, content_type: str) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            time.sleep(latency)
+            path, _, query = self.path.partition("?")
+            site = _site(path, query, f"http://{self.headers.get('Host')}", files["/typical.html"][0])
+            if site is not None:
+                self._send(site[0], site[1], site[2])
+                return
+            if path.startswith("/photos/"):
+                path = "/photos/"
+            found = files.get(path)
+            if found is None:
+                self._send(404, b"Not found", "text/plain")
+            else:
+                self._send(200, *found)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            self.rfile.read(length)
+            time.sleep(openai_latency)
+            if self.path.split("?", 1)[0].endswith("/chat/completions"):
+                self._send(200, _chat_completion(), "application/json")
+            else:
+                self._send(404, b'{"error": {"message": "not found"}}', "application/json")
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Corpus en nep-OpenAI voor de end-to-end benchmark")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="0 = vrije poort")
+    parser.add_argument("--latency", type=float, default=0, help="ms vertraging per pagina/foto")
+    parser.add_argument("--openai-latency", type=float, default=0, help="ms vertraging per OpenAI-aanroep")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port),
+                                 make_handler(_load_corpus(), args.latency / 1000, args.openai_latency / 1000))
+    server.daemon_threads = True
+    print(f"port {server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
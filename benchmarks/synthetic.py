@@ -0,0 +1,31 @@
+# Synthetische listings (ExtractedData) voor de benchmarks: willekeurig maar reproduceerbaar met een seed
+
+from __future__ import annotations
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lqm_scorer import ExtractedData  # noqa: E402
+
+_WORDS = ("huisje", "bos", "rust", "tuin", "terras", "natuur", "wandelen", "fietsen", "haard", "uitzicht", "heide", "meer")
+
+
+def listing(rng: random.Random) -> ExtractedData:
+    text = lambda n: " ".join(rng.choice(_WORDS) for _ in range(n))  # noqa: E731
+    return ExtractedData(
+        general_description=text(rng.randint(40, 160)),
+        nature_description=text(rng.randint(20, 80)) if rng.random() < 0.7 else None,
+        postcode=f"{rng.randint(1000, 9999)} AB", place=rng.choice(("Ede", "Otterlo", "Epe", "Ommen")), country="NL",
+        photo_count=rng.randint(3, 60), first_photo_width=rng.choice((480, 800, 1200)), first_photo_height=rng.choice((320, 600, 800)),
+        first_photo_src=f"https://example.org/img/{rng.randint(0, 10**9)}.jpg",
+        nr_reviews=rng.randint(0, 40), average_rating=round(rng.uniform(6, 10), 1), rating_scale_max=10,
+        sustainability_impact_level_leaves=rng.choice((None, 0, 1, 2, 3)), allow_instant_booking=rng.choice((None, 0, 1)),
+        accommodation_type_string=rng.choice(("villa", "bungalow, chalet", None)),
+    )
+
+
+def listings(n: int, seed: int = 1) -> list[ExtractedData]:
+    rng = random.Random(seed)
+    return [listing(rng) for _ in range(n)]
@@ -0,0 +1,264 @@
+# Bulk-analyse van grote JSONL-bestanden (python -m lqm batch in.jsonl out.jsonl)
+# Invoer: per regel een URL ("https://..." of {"url": "..."}) of een al geëxtraheerd record
+# ({"record": {...velden van ExtractedData...}}), eventueel met een eigen "id". Ophalen gebeurt
+# async op één event loop, parsen en scoren in een procespool. Elk rapport gaat als één JSON-regel
+# naar de uitvoer zodra het klaar is, dus niet in invoervolgorde; "line" verwijst naar de invoerregel.
+# Er zijn nooit meer dan `window` regels tegelijk in behandeling: het geheugen blijft vlak, ook bij
+# miljoenen regels. Het checkpoint (positie in de uitvoer + afgeronde regels) maakt hervatten mogelijk.
+
+from __future__ import annotations
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Optional
+
+from async_fetch import async_fetch_page_entry, close_async_client
+from config import BATCH_CONCURRENCY, BATCH_URL_TIMEOUT, BULK_CHECKPOINT_EVERY, BULK_WINDOW, BULK_WORKERS
+from extractor import apply_photo_analysis, extract_from_html, extracted_from_dict, prepare_url
+from report import build_report
+
+# Records (zonder ophalen/parsen) gaan in groepjes naar de pool; per stuk kost het versturen meer dan het scoren
+RECORD_CHUNK = 200
+
+
+class CheckpointError(ValueError):
+    """Checkpoint en uitvoer passen niet bij deze run (andere invoer, uitvoer weg of ingekort); --fresh begint opnieuw."""
+
+
+@dataclass
+class Checkpoint:
+    """Voortgang van één run: alle regels vóór next_line zijn klaar, plus de losse regels in done."""
+    input: str
+    output_offset: int = 0  # bytes in de uitvoer die bij deze voortgang horen
+    next_line: int = 1
+    done: set[int] = field(default_factory=set)
+
+    def is_done(self, line: int) -> bool:
+        return line < self.next_line or line in self.done
+
+    def mark(self, line: int) -> None:
+        self.done.add(line)
+        while self.next_line in self.done:
+            self.done.remove(self.next_line)
+            self.next_line += 1
+
+    @classmethod
+    def load(cls, path: str, input_path: str) -> Optional["Checkpoint"]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            raise CheckpointError(f"Checkpoint {path} is onleesbaar: {e}") from None
+        if not isinstance(raw, dict) or raw.get("input") != input_path:
+            found = raw.get("input") if isinstance(raw, dict) else None
+            raise CheckpointError(f"Checkpoint {path} hoort bij {found!r}, niet bij {input_path!r}")
+        try:
+            return cls(raw["input"], int(raw["output_offset"]), int(raw["next_line"]), set(raw["done"]))
+        except (KeyError, TypeError, ValueError) as e:
+            raise CheckpointError(f"Checkpoint {path} is onleesbaar: {e!r}") from None
+
+    def save(self, path: str) -> None:
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"input": self.input, "output_offset": self.output_offset,
+                       "next_line": self.next_line, "done": sorted(self.done)}, f)
+        os.replace(tmp, path)  # atomair: een onderbroken run laat nooit een half checkpoint achter
+
+
+def parse_line(text: str) -> Optional[dict]:
+    """{"url": ...} of {"record": {...}} uit één invoerregel; None voor een lege regel, ValueError als de regel ongeldig is."""
+    text = text.strip()
+    if not text:
+        return None
+    if text[0] not in "{\"":
+        return {"url": text}
+    try:
+        item = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Geen geldige JSON: {e}") from None
+    if isinstance(item, str):
+        return {"url": item}
+    if isinstance(item, dict) and (isinstance(item.get("url"), str) or isinstance(item.get("record"), dict)):
+        return item
+    raise ValueError('Verwacht een URL, {"url": ...} of {"record": {...}}.')
+
+
+# ---------- In de procespool ----------
+
+def _report_from_html(html: str, full_url: str, url: str, photos: bool) -> tuple[Optional[dict], Optional[dict]]:
+    """(rapport, None), of (None, geëxtraheerde velden) als de AI-foto-analyse nog in het hoofdproces moet."""
+    data = extract_from_html(html, full_url, analyze_photo=False)
+    if photos and data.first_photo_src:
+        return None, asdict(data)
+    return build_report(url, data), None
+
+
+def _reports_from_records(records: list[dict]) -> list[tuple[Optional[dict], Optional[str]]]:
+    """(rapport, None) of (None, fout) per record: een fout record laat de rest van het groepje heel."""
+    out = []
+    for r in records:
+        try:
+            out.append((build_report(r.get("url") or "", extracted_from_dict(r["record"])), None))
+        except Exception as e:
+            out.append((None, f"Scoren mislukt: {e}"))
+    return out
+
+
+# ---------- Hoofdproces ----------
+
+def _result(report: Optional[dict], item: dict, line: int, error: Optional[str] = None) -> dict:
+    out = report if report is not None else {"ok": False, "url": item.get("url"), "error": error}
+    out["line"] = line
+    if "id" in item:
+        out["id"] = item["id"]
+    return out
+
+
+async def run_bulk(
+    input_path: str,
+    output_path: str,
+    window: int = BULK_WINDOW,
+    concurrency: int = BATCH_CONCURRENCY,
+    workers: int = BULK_WORKERS,
+    url_timeout: float = BATCH_URL_TIMEOUT,
+    checkpoint_path: Optional[str] = None,
+    checkpoint_every: int = BULK_CHECKPOINT_EVERY,
+    photos: bool = False,
+    fresh: bool = False,
+    progress: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    Verwerk input_path naar output_path (JSONL). Met een bestaand checkpoint (standaard output_path +
+    ".checkpoint") gaat de run verder waar hij was: de uitvoer wordt teruggezet naar de stand van het
+    checkpoint en afgeronde regels worden overgeslagen; CheckpointError als dat niet kan. fresh=True begint opnieuw. photos=True doet ook
+    de AI-foto-analyse (vision_analyzer). Retourneert tellers; progress(tellers) na elk checkpoint.
+    """
+    input_path = os.path.abspath(input_path)
+    checkpoint_path = checkpoint_path or output_path + ".checkpoint"
+    window = max(1, window)
+    cp = None if fresh else Checkpoint.load(checkpoint_path, input_path)
+    if cp is None:
+        cp = Checkpoint(input_path)
+        out = open(output_path, "wb")
+    else:
+        try:
+            out = open(output_path, "r+b")
+        except FileNotFoundError:
+            raise CheckpointError(f"Uitvoer {output_path} ontbreekt, maar checkpoint {checkpoint_path} bestaat") from None
+        if os.fstat(out.fileno()).st_size < cp.output_offset:
+            out.close()
+            raise CheckpointError(f"Uitvoer {output_path} is korter dan checkpoint {checkpoint_path} aangeeft")
+        out.truncate(cp.output_offset)
+        out.seek(cp.output_offset)
+
+    stats = {"ok": 0, "failed": 0, "skipped": cp.next_line - 1 + len(cp.done), "elapsed_seconds": 0.0}
+    t0 = time.monotonic()
+    slots = asyncio.Semaphore(window)
+    fetch_slots = asyncio.Semaphore(max(1, concurrency))
+    loop = asyncio.get_running_loop()
+    pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=multiprocessing.get_context("spawn"))
+    tasks: set[asyncio.Task] = set()
+    since_checkpoint = 0
+
+    def checkpoint() -> None:
+        out.flush()
+        cp.output_offset = out.tell()
+        cp.save(checkpoint_path)
+        stats["elapsed_seconds"] = round(time.monotonic() - t0, 3)
+        if progress:
+            progress(dict(stats))
+
+    def write(results: list[dict]) -> None:
+        nonlocal since_checkpoint
+        for r in results:
+            out.write(json.dumps(r, ensure_ascii=False).encode("utf-8") + b"\n")
+            stats["ok" if r.get("ok") else "failed"] += 1
+            cp.mark(r["line"])
+        since_checkpoint += len(results)
+        if since_checkpoint >= checkpoint_every:
+            since_checkpoint = 0
+            checkpoint()
+
+    async def analyze(item: dict, line: int) -> dict:
+        url = item["url"]
+        full_url = prepare_url(url)
+        if not full_url:
+            return _result(None, item, line, "Geen URL opgegeven.")
+        async with fetch_slots:
+            entry, err = await async_fetch_page_entry(full_url)
+        if err:
+            return _result(None, item, line, f"Pagina ophalen mislukt: {err}")
+        report, extracted = await loop.run_in_executor(pool, _report_from_html, entry.html, full_url, url, photos)
+        if report is None:
+            from vision_analyzer import async_analyze_first_photo
+            data = extracted_from_dict(extracted)
+            apply_photo_analysis(data, await async_analyze_first_photo(data.first_photo_src, full_url))
+            report = build_report(url, data)
+        return _result(report, item, line)
+
+    async def one_url(item: dict, line: int) -> None:
+        try:
+            result = await asyncio.wait_for(analyze(item, line), url_timeout)
+        except asyncio.TimeoutError:
+            result = _result(None, item, line, f"Tijdslimiet van {url_timeout:g} s overschreden.")
+        except Exception as e:  # onverwachte fout in extractor/scorer: alleen deze regel faalt
+            result = _result(None, item, line, f"Analyse mislukt: {e}")
+        write([result])
+        slots.release()
+
+    async def records_chunk(chunk: list[tuple[int, dict]]) -> None:
+        try:
+            reports = await loop.run_in_executor(pool, _reports_from_records, [item for _, item in chunk])
+            results = [_result(r, item, line, err) for (r, err), (line, item) in zip(reports, chunk)]
+        except Exception as e:
+            results = [_result(None, item, line, f"Scoren mislukt: {e}") for line, item in chunk]
+        write(results)
+        for _ in chunk:
+            slots.release()
+
+    def start(coro) -> None:
+        task = asyncio.create_task(coro)
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    chunk_size = min(RECORD_CHUNK, window)
+    records: list[tuple[int, dict]] = []
+    try:
+        with open(input_path, "r", encoding="utf-8") as f:
+            for line, text in enumerate(f, 1):
+                if cp.is_done(line):
+                    continue
+                try:
+                    item = parse_line(text)
+                except ValueError as e:
+                    write([_result(None, {}, line, str(e))])
+                    continue
+                if item is None:
+                    cp.mark(line)
+                    continue
+                await slots.acquire()  # wacht tot er binnen het venster plek is
+                if "record" in item:
+                    records.append((line, item))
+                    if len(records) >= chunk_size:
+                        start(records_chunk(records))
+                        records = []
+                else:
+                    start(one_url(item, line))
+        if records:
+            start(records_chunk(records))
+        while tasks:
+            await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
+        await close_async_client()
+        checkpoint()
+        out.close()
+    return stats
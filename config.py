@@ -1,4 +1,5 @@
 # LQM Advertentie Agent - configuratie
+import os
 import re
 
 # Postcode regex per land (NL, BE, DE, FR)
@@ -12,6 +13,104 @@ POSTCODE_PATTERNS = {
 # COVID-gerelateerde zoekwoorden
 COVID_KEYWORDS = ["corona", "covid", "pandemie", "lockdown", "1,5 meter", "anderhalve meter"]
 
+# Gewichten van de LQM-regels (lqm_rules.py) overschrijven met een JSON-bestand,
+# bijv. {"bonus_allow_instant_booking": 20, "bonus_icals_working": {"cap": 10}}
+WEIGHTS_FILE = os.environ.get("LQM_WEIGHTS_FILE", "")
+
 # Min. lengte postcode (fallback andere landen)
 POSTCODE_MIN_LEN = 4
 POSTCODE_MAX_LEN = 10
+
+# Batch-analyse (/api/analyze/batch)
+BATCH_MAX_URLS = int(os.environ.get("LQM_BATCH_MAX_URLS", "500"))          # max. aantal URL's per verzoek
+BATCH_CONCURRENCY = int(os.environ.get("LQM_BATCH_CONCURRENCY", "8"))      # aantal URL's tegelijk
+BATCH_URL_TIMEOUT = float(os.environ.get("LQM_BATCH_URL_TIMEOUT", "45"))   # seconden per URL voordat we opgeven
+
+# Bulk-analyse vanaf de command line (python -m lqm batch, bulk.py)
+BULK_WINDOW = int(os.environ.get("LQM_BULK_WINDOW", "256"))                  # max. invoerregels tegelijk in behandeling
+BULK_WORKERS = int(os.environ.get("LQM_BULK_WORKERS", "0"))                  # processen voor parsen/scoren; 0 = aantal CPU's
+BULK_CHECKPOINT_EVERY = int(os.environ.get("LQM_BULK_CHECKPOINT_EVERY", "1000"))  # checkpoint na zoveel afgeronde regels
+
+# Async ophaallaag (async_fetch.py): verbindingen per event loop
+ASYNC_MAX_CONNECTIONS = int(os.environ.get("LQM_ASYNC_MAX_CONNECTIONS", "200"))   # totaal open verbindingen
+ASYNC_MAX_KEEPALIVE = int(os.environ.get("LQM_ASYNC_MAX_KEEPALIVE", "50"))        # idle verbindingen bewaren
+ASYNC_KEEPALIVE_EXPIRY = float(os.environ.get("LQM_ASYNC_KEEPALIVE_EXPIRY", "30")) # seconden
+
+# Gedeelde HTTP-sessie (http_session.py): keep-alive pools per host
+HTTP_POOL_CONNECTIONS = int(os.environ.get("LQM_HTTP_POOL_CONNECTIONS", "32"))   # aantal hosts met een eigen pool
+HTTP_POOL_MAXSIZE = int(os.environ.get("LQM_HTTP_POOL_MAXSIZE", "16"))           # verbindingen per host
+HTTP_POOL_BLOCK = os.environ.get("LQM_HTTP_POOL_BLOCK", "false").lower() == "true"  # wachten als de pool vol is
+
+# Paginacache voor fetch_page (page_cache.py)
+PAGE_CACHE_BACKEND = os.environ.get("LQM_PAGE_CACHE", "memory").lower()          # memory | disk | off
+PAGE_CACHE_TTL = float(os.environ.get("LQM_PAGE_CACHE_TTL", "600"))              # seconden zonder revalidatie
+PAGE_CACHE_MAX_ENTRIES = int(os.environ.get("LQM_PAGE_CACHE_MAX_ENTRIES", "2000"))
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("LQM_PAGE_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))  # HTML per proces (memory)
+PAGE_CACHE_DIR = os.environ.get("LQM_PAGE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "pages"))
+
+# Rapportcache (report_cache.py): rapporten per hash van de pagina-inhoud
+REPORT_CACHE_MAX_ENTRIES = int(os.environ.get("LQM_REPORT_CACHE_MAX_ENTRIES", "1000"))  # 0 = uit
+
+# HTML-parser voor extract_from_html (page_index.py): "lxml" (XPath, snel), "partial" (lxml zonder
+# script-/style-inhoud, JSON-LD uit de bron; minder geheugen) of "bs4" (BeautifulSoup)
+HTML_PARSER_BACKEND = os.environ.get("LQM_HTML_PARSER", "lxml").lower()
+
+# AI-foto-analyse op de achtergrond (vision_jobs.py): /api/analyze wacht niet op OpenAI
+VISION_DEFERRED = os.environ.get("LQM_VISION_DEFERRED", "true").lower() == "true"
+VISION_WORKERS = int(os.environ.get("LQM_VISION_WORKERS", "4"))           # gelijktijdige analyses per proces
+VISION_JOB_TTL = float(os.environ.get("LQM_VISION_JOB_TTL", "600"))        # seconden dat een uitkomst op te halen is
+VISION_JOBS_PATH = os.environ.get("LQM_VISION_JOBS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "vision_jobs.sqlite"))
+
+# Cache van AI-foto-analyses (vision_cache.py): SQLite, op sha256 en dHash van de afbeelding
+VISION_CACHE_MAX_ENTRIES = int(os.environ.get("LQM_VISION_CACHE_MAX_ENTRIES", "20000"))  # 0 = uit
+VISION_CACHE_MAX_DISTANCE = int(os.environ.get("LQM_VISION_CACHE_MAX_DISTANCE", "4"))    # max. verschillende dHash-bits; 0 = alleen exact
+VISION_CACHE_PATH = os.environ.get("LQM_VISION_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "vision.sqlite"))
+
+# Coverfoto voor de Vision-upload (image_prep.py): verkleind tot deze langste zijde (vereist Pillow)
+VISION_MAX_EDGE = int(os.environ.get("LQM_VISION_MAX_EDGE", "512"))
+VISION_DETAIL = os.environ.get("LQM_VISION_DETAIL", "low").lower()           # low | high | auto (OpenAI image detail)
+
+# Foto-analyse (vision_analyzer.py): "openai" (alleen met OPENAI_API_KEY), "local" (photo_heuristics,
+# NumPy + Pillow, zonder API) of "hybrid" (eerst lokaal; OpenAI alleen als lokaal iets onbeslist blijft)
+VISION_MODE = os.environ.get("LQM_VISION_MODE", "openai").lower()
+
+# Tijdmeting per verzoek (timing.py): Server-Timing-header op /api/analyze en één JSON-logregel per
+# verzoek (logger lqm.timing). "timings" in het rapport alleen op verzoek ({"timings": true} of ?timings=1).
+SERVER_TIMING = os.environ.get("LQM_SERVER_TIMING", "true").lower() == "true"
+TIMING_LOG = os.environ.get("LQM_TIMING_LOG", "true").lower() == "true"
+
+# Prometheus-metrics (metrics.py, GET /metrics). Met meerdere gunicorn-workers: een gedeelde, per
+# deploy lege map waarin elk proces zijn tellers schrijft; leeg = alleen het proces dat /metrics beantwoordt.
+METRICS_DIR = os.environ.get("LQM_METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.environ.get("LQM_METRICS_FLUSH_INTERVAL", "5"))  # seconden tussen schrijven per proces
+METRICS_MAX_HOSTS = int(os.environ.get("LQM_METRICS_MAX_HOSTS", "50"))            # verschillende host-labels; daarna "other"
+
+# Taken voor lange analyses (jobs.py, /api/jobs): een SQLite-wachtrij die alle processen delen en die
+# een herstart overleeft. Met LQM_JOBS_WORKER=true pakt een webproces vanaf zijn eerste /api/jobs-verzoek
+# steeds een paar URL's uit de rij (asgi.py al bij het opstarten).
+JOBS_PATH = os.environ.get("LQM_JOBS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "jobs.sqlite"))
+JOBS_WORKER = os.environ.get("LQM_JOBS_WORKER", "true").lower() == "true"  # false = dit proces neemt alleen taken aan
+JOBS_MAX_URLS = int(os.environ.get("LQM_JOBS_MAX_URLS", "10000"))          # max. aantal URL's per taak
+JOBS_CONCURRENCY = int(os.environ.get("LQM_JOBS_CONCURRENCY", "8"))        # URL's tegelijk per proces
+JOBS_CLAIM_TIMEOUT = float(os.environ.get("LQM_JOBS_CLAIM_TIMEOUT", "300"))  # seconden; daarna is een URL van een gestopt proces weer vrij
+JOBS_MAX_ATTEMPTS = int(os.environ.get("LQM_JOBS_MAX_ATTEMPTS", "3"))      # zo vaak opnieuw na een gestopt proces
+JOBS_TTL = float(os.environ.get("LQM_JOBS_TTL", str(7 * 86400)))           # seconden dat een afgeronde taak bewaard blijft
+JOBS_POLL_INTERVAL = float(os.environ.get("LQM_JOBS_POLL_INTERVAL", "1"))  # seconden tussen kijken in een lege rij
+
+# Gedeelde werkrij voor workers op meerdere machines (work_queue.py, python -m lqm worker):
+# een SQLite-bestand (pad of sqlite:///pad; één machine of tests) of redis://host:6379/0 (vereist redis)
+WORK_QUEUE = os.environ.get("LQM_WORK_QUEUE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "work_queue.sqlite"))
+WORK_BATCH_SIZE = int(os.environ.get("LQM_WORK_BATCH_SIZE", "50"))            # URL's per batch (één lease)
+WORK_CONCURRENCY = int(os.environ.get("LQM_WORK_CONCURRENCY", "8"))          # URL's tegelijk per worker
+WORK_LEASE_SECONDS = float(os.environ.get("LQM_WORK_LEASE_SECONDS", "120"))  # lease; verlengd elke derde hiervan
+WORK_MAX_ATTEMPTS = int(os.environ.get("LQM_WORK_MAX_ATTEMPTS", "3"))        # zo vaak opnieuw na een verlopen lease
+WORK_POLL_INTERVAL = float(os.environ.get("LQM_WORK_POLL_INTERVAL", "2"))    # seconden tussen kijken in een lege rij
+
+# Crawler (crawler.py, python -m lqm crawl): beleefd per host, geheugen begrensd
+CRAWL_USER_AGENT = os.environ.get("LQM_CRAWL_USER_AGENT", "lqm-crawler")           # naam voor robots.txt en de eigen verzoeken
+CRAWL_HOST_CONCURRENCY = int(os.environ.get("LQM_CRAWL_HOST_CONCURRENCY", "2"))    # verzoeken tegelijk per host
+CRAWL_RATE = float(os.environ.get("LQM_CRAWL_RATE", "2"))                          # verzoeken per seconde per host; 0 = onbeperkt
+CRAWL_BURST = int(os.environ.get("LQM_CRAWL_BURST", "4"))                          # max. verzoeken direct achter elkaar
+CRAWL_MAX_FRONTIER = int(os.environ.get("LQM_CRAWL_MAX_FRONTIER", "10000"))        # max. URL's in de rij (alle hosts samen)
+CRAWL_MAX_DEPTH = int(os.environ.get("LQM_CRAWL_MAX_DEPTH", "3"))                  # max. overzichtspagina's diep via --follow
+CRAWL_MAX_BYTES = int(os.environ.get("LQM_CRAWL_MAX_BYTES", str(50 * 1024 * 1024)))  # max. grootte van sitemap/pagina (uitgepakt)
@@ -0,0 +1,443 @@
+# Crawler: advertentie-URL's van een site vinden en door de analyse halen (python -m lqm crawl)
+# Bronnen per host: de sitemaps (uit robots.txt, anders /sitemap.xml; sitemap-indexen en .gz worden
+# gevolgd) en optioneel overzichtspagina's waarvan de links gelezen worden. Welke URL's advertenties
+# zijn bepaalt een regex (--include); welke links naar verdere overzichtspagina's leiden --follow.
+# Beleefd per host: robots.txt (ook Crawl-delay), max. verzoeken tegelijk en een token bucket
+# (gemiddeld `rate` per seconde, pieken tot `burst`). Alle verzoeken aan de host tellen mee.
+# Geheugen blijft begrensd: sitemaps worden pas gelezen als er plek is in de frontier (max_frontier
+# URL's in totaal) en van geziene URL's bewaren we alleen een hash van 8 bytes. Een overzichtspagina
+# wordt pas gelezen als er plek is; passen haar links niet meer, dan gaat ze terug in de rij.
+
+from __future__ import annotations
+import asyncio
+import gzip
+import hashlib
+import io
+import logging
+import re
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Callable, Iterator, Optional
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+from async_fetch import close_async_client, get_async_client
+from batch import analyze_one
+from config import (
+    BATCH_URL_TIMEOUT, CRAWL_BURST, CRAWL_HOST_CONCURRENCY, CRAWL_MAX_BYTES, CRAWL_MAX_DEPTH, CRAWL_MAX_FRONTIER,
+    CRAWL_RATE, CRAWL_USER_AGENT,
+)
+from extractor import TIMEOUT
+from http_session import get_session
+from url_utils import normalize_url
+
+logger = logging.getLogger("lqm.crawler")
+
+# URL's per keer uit een sitemap naar de frontier (per host)
+REFILL_BATCH = 100
+
+
+class TokenBucket:
+    """Max. `rate` verzoeken per seconde gemiddeld, met pieken tot `burst`; rate <= 0 = onbeperkt."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+@dataclass
+class _Item:
+    url: str
+    kind: str  # "listing" (analyseren) of "index" (links lezen)
+    depth: int = 0
+
+
+class Frontier:
+    """
+    Te bezoeken URL's per host, in totaal max. max_size, plus een hash van elke ooit toegevoegde URL.
+    Overzichtspagina's komen pas aan de beurt als er plek is voor hun links en houden hun plek vast
+    tot ze gelezen zijn (release) of terug in de rij gaan (requeue). Ze vullen hooguit de helft van
+    de frontier, zodat er altijd plek overblijft en advertenties voorgaan.
+    """
+
+    def __init__(self, max_size: int = CRAWL_MAX_FRONTIER):
+        self.max_size = max(2, max_size)
+        self._queues: dict[str, deque[_Item]] = {}
+        self._index: dict[str, deque[_Item]] = {}
+        self._size = 0
+        self._index_size = 0
+        self._seen: set[bytes] = set()
+        self.duplicates = 0
+        self.dropped = 0
+        self.requeued = 0
+
+    @staticmethod
+    def _key(url: str) -> bytes:
+        return hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+
+    def has_room(self) -> bool:
+        return self._size < self.max_size
+
+    def seen(self, url: str) -> bool:
+        return self._key(url) in self._seen
+
+    def add(self, host: str, item: _Item) -> bool:
+        """False als de URL al gezien is, of als er geen plek is (dan telt hij als dropped)."""
+        key = self._key(item.url)
+        if key in self._seen:
+            self.duplicates += 1
+            return False
+        index = item.kind == "index"
+        if not self.has_room() or (index and self._index_size >= self.max_size // 2):
+            self.dropped += 1
+            return False
+        self._seen.add(key)
+        (self._index if index else self._queues).setdefault(host, deque()).append(item)
+        self._size += 1
+        self._index_size += index
+        return True
+
+    def pop(self, host: str) -> Optional[_Item]:
+        """Eerst advertenties; een overzichtspagina alleen als er plek is (zij houdt haar plek tot release)."""
+        queue = self._queues.get(host)
+        if queue:
+            self._size -= 1
+            return queue.popleft()
+        index = self._index.get(host)
+        if index and self.has_room():
+            return index.popleft()
+        return None
+
+    def release(self) -> None:
+        """De overzichtspagina van pop is gelezen: haar plek komt vrij."""
+        self._size -= 1
+        self._index_size -= 1
+
+    def requeue(self, host: str, item: _Item) -> None:
+        """De overzichtspagina van pop terug in de rij (op haar eigen plek); ze wordt later opnieuw gelezen."""
+        self._index.setdefault(host, deque()).append(item)
+        self.requeued += 1
+
+    def ready(self, host: str) -> bool:
+        """pop(host) levert iets op."""
+        return bool(self._queues.get(host)) or (bool(self._index.get(host)) and self.has_room())
+
+    def pending(self, host: str) -> int:
+        return len(self._queues.get(host) or ()) + len(self._index.get(host) or ())
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class _LinkParser(HTMLParser):
+    """Alle <a href> van een pagina, rekening houdend met <base href>."""
+
+    def __init__(self, base: str):
+        super().__init__(convert_charrefs=True)
+        self.base = base
+        self.links: list[str] = []
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag == "base":
+            href = dict(attrs).get("href")
+            if href:
+                self.base = urljoin(self.base, href)
+        elif tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(urljoin(self.base, href.strip()))
+
+
+def page_links(html: str, base: str) -> list[str]:
+    parser = _LinkParser(base)
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:  # kapotte HTML: de links tot daar zijn bruikbaar
+        pass
+    return parser.links
+
+
+def sitemap_entries(data: bytes) -> Iterator[tuple[str, str]]:
+    """("url" | "sitemap", loc) uit een urlset of sitemapindex; .gz-inhoud wordt eerst uitgepakt."""
+    if data[:2] == b"\x1f\x8b":
+        with gzip.GzipFile(fileobj=io.BytesIO(data)) as f:
+            data = f.read(CRAWL_MAX_BYTES + 1)[:CRAWL_MAX_BYTES]
+    kind = "url"
+    try:
+        for event, elem in ET.iterparse(io.BytesIO(data), events=("start", "end")):
+            tag = elem.tag.rsplit("}", 1)[-1]
+            if event == "start":
+                if tag == "sitemapindex":
+                    kind = "sitemap"
+                continue
+            if tag == "loc" and elem.text:
+                yield kind, elem.text.strip()
+            elif tag in ("url", "sitemap"):
+                elem.clear()  # geheugen: verwerkte elementen weggooien
+    except ET.ParseError as e:
+        logger.warning("Sitemap niet volledig te lezen: %s", e)
+
+
+@dataclass
+class _Host:
+    """Toestand per host: robots.txt, token bucket, nog te lezen sitemaps en de lopende sitemap."""
+    origin: str
+    bucket: TokenBucket
+    robots: Optional[RobotFileParser] = None
+    sitemaps: deque[str] = field(default_factory=deque)
+    locs: Optional[Iterator[tuple[str, str]]] = None
+    sitemaps_seen: set[str] = field(default_factory=set)
+    busy: int = 0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class Crawler:
+    """
+    Crawlt de hosts van de start-URL's. Elke gevonden advertentie-URL gaat (na robots.txt) door
+    batch.analyze_one, of met discover_only alleen als {"url": ...} naar on_result.
+    """
+
+    def __init__(
+        self,
+        seeds: list[str],
+        on_result: Callable[[dict], None],
+        include: Optional[str] = None,
+        follow: Optional[str] = None,
+        sitemaps: Optional[list[str]] = None,
+        max_pages: int = 0,
+        max_depth: int = CRAWL_MAX_DEPTH,
+        host_concurrency: int = CRAWL_HOST_CONCURRENCY,
+        rate: float = CRAWL_RATE,
+        burst: int = CRAWL_BURST,
+        max_frontier: int = CRAWL_MAX_FRONTIER,
+        discover_only: bool = False,
+        url_timeout: float = BATCH_URL_TIMEOUT,
+        user_agent: str = CRAWL_USER_AGENT,
+    ):
+        self.seeds = [normalize_url(s) for s in seeds if s and s.strip()]
+        self.extra_sitemaps = [normalize_url(s) for s in sitemaps or []]
+        self.on_result = on_result
+        self.include = re.compile(include) if include else None
+        self.follow = re.compile(follow) if follow else None
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.host_concurrency = max(1, host_concurrency)
+        self.rate = rate
+        self.burst = burst
+        self.discover_only = discover_only
+        self.url_timeout = url_timeout
+        self.user_agent = user_agent
+        self.frontier = Frontier(max_frontier)
+        self.hosts: dict[str, _Host] = {}
+        self.counts = {"sitemaps": 0, "index_pages": 0, "listings": 0, "ok": 0, "failed": 0,
+                       "robots_blocked": 0, "fetch_errors": 0}
+
+    async def run(self) -> dict:
+        """Crawlen tot alle bronnen op zijn (of max_pages bereikt); retourneert de tellers."""
+        t0 = time.monotonic()
+        try:
+            for seed in self.seeds:
+                await self._add_host(seed)
+            for sitemap in self.extra_sitemaps:
+                host = await self._add_host(sitemap, seed=False)
+                if sitemap not in host.sitemaps_seen:
+                    host.sitemaps_seen.add(sitemap)
+                    host.sitemaps.append(sitemap)
+            workers = [self._worker(name) for name in self.hosts for _ in range(self.host_concurrency)]
+            await asyncio.gather(*workers)
+        finally:
+            await close_async_client()
+        return {**self.counts, "duplicates": self.frontier.duplicates, "frontier_dropped": self.frontier.dropped,
+                "index_requeued": self.frontier.requeued, "hosts": len(self.hosts), "elapsed_seconds": round(time.monotonic() - t0, 3)}
+
+    # ---------- hosts, robots.txt en sitemaps ----------
+
+    async def _add_host(self, url: str, seed: bool = True) -> _Host:
+        parts = urlsplit(url)
+        name = parts.netloc
+        host = self.hosts.get(name)
+        if host is None:
+            host = _Host(origin=f"{parts.scheme}://{name}", bucket=TokenBucket(self.rate, self.burst))
+            self.hosts[name] = host
+            await self._load_robots(host)
+        if seed and self.include is not None:
+            # Start-URL als overzichtspagina: zijn links naar advertenties (--include) tellen mee
+            self.frontier.add(name, _Item(url, "index"))
+        return host
+
+    async def _load_robots(self, host: _Host) -> None:
+        """robots.txt lezen (RFC 9309): 4xx = alles toegestaan; 5xx of geen verbinding = niets toegestaan."""
+        robots = RobotFileParser()
+        status, body = await self._fetch(host, host.origin + "/robots.txt")
+        if status is None or status >= 500:
+            logger.warning("robots.txt van %s niet bereikbaar; deze host wordt overgeslagen", host.origin)
+            robots.disallow_all = True
+        elif status >= 400:
+            robots.allow_all = True
+        else:
+            robots.parse(body.decode("utf-8", "replace").splitlines())
+            delay = robots.crawl_delay(self.user_agent)
+            if delay:
+                host.bucket = TokenBucket(min(self.rate, 1 / float(delay)) if self.rate > 0 else 1 / float(delay), 1)
+        host.robots = robots
+        sitemaps = robots.site_maps() or [host.origin + "/sitemap.xml"]
+        for sitemap in sitemaps:
+            sitemap = normalize_url(sitemap)
+            if sitemap not in host.sitemaps_seen:
+                host.sitemaps_seen.add(sitemap)
+                host.sitemaps.append(sitemap)
+
+    def _allowed(self, host: _Host, url: str) -> bool:
+        return host.robots is None or host.robots.can_fetch(self.user_agent, url)
+
+    async def _refill(self, name: str, host: _Host) -> bool:
+        """Frontier van deze host aanvullen uit de sitemaps; False als er geen sitemaps meer te lezen zijn."""
+        async with host.lock:
+            while self.frontier.pending(name) < REFILL_BATCH and self.frontier.has_room():
+                if host.locs is None:
+                    if not host.sitemaps:
+                        return False
+                    sitemap = host.sitemaps.popleft()
+                    host.locs = await self._read_sitemap(host, sitemap)
+                    continue
+                entry = next(host.locs, None)
+                if entry is None:
+                    host.locs = None
+                    continue
+                kind, loc = entry
+                url = normalize_url(urljoin(host.origin, loc))
+                if urlsplit(url).netloc != name:
+                    continue
+                if kind == "sitemap":
+                    if url not in host.sitemaps_seen:
+                        host.sitemaps_seen.add(url)
+                        host.sitemaps.append(url)
+                elif self.include is None or self.include.search(url):
+                    self.frontier.add(name, _Item(url, "listing"))
+            return True
+
+    async def _read_sitemap(self, host: _Host, url: str) -> Optional[Iterator[tuple[str, str]]]:
+        if not self._allowed(host, url):
+            self.counts["robots_blocked"] += 1
+            return None
+        status, body = await self._fetch(host, url)
+        if status != 200:
+            return None
+        self.counts["sitemaps"] += 1
+        return sitemap_entries(body)
+
+    # ---------- bezoeken ----------
+
+    async def _worker(self, name: str) -> None:
+        host = self.hosts[name]
+        while not self._done():
+            item = self.frontier.pop(name)
+            if item is None:
+                more = await self._refill(name, host)
+                if self.frontier.ready(name):
+                    continue
+                if not more and host.busy == 0 and not self.frontier.pending(name):
+                    return  # niets meer in de rij, geen sitemaps en geen pagina in behandeling die links toevoegt
+                await asyncio.sleep(0.05)  # frontier vol of een overzichtspagina wordt nog gelezen
+                continue
+            host.busy += 1
+            try:
+                await self._visit(name, host, item)
+            except Exception:
+                logger.exception("Fout bij %s", item.url)
+            finally:
+                host.busy -= 1
+
+    def _done(self) -> bool:
+        return 0 < self.max_pages <= self.counts["listings"]
+
+    async def _visit(self, name: str, host: _Host, item: _Item) -> None:
+        if item.kind == "index":
+            complete = True
+            try:
+                complete = await self._read_index(name, host, item)
+            finally:
+                if complete:
+                    self.frontier.release()
+                else:
+                    self.frontier.requeue(name, item)
+            return
+        if not self._allowed(host, item.url):
+            self.counts["robots_blocked"] += 1
+            return
+        if self._done():
+            return
+        self.counts["listings"] += 1
+        if self.discover_only:
+            result = {"ok": True, "url": item.url}
+        else:
+            await host.bucket.acquire()
+            result = await analyze_one(item.url, self.url_timeout, user_agent=self.user_agent)
+        self.counts["ok" if result.get("ok") else "failed"] += 1
+        self.on_result(result)
+
+    async def _read_index(self, name: str, host: _Host, item: _Item) -> bool:
+        """Links van een overzichtspagina in de frontier; False als ze niet allemaal pasten."""
+        if not self._allowed(host, item.url):
+            self.counts["robots_blocked"] += 1
+            return True
+        status, body = await self._fetch(host, item.url)
+        if status != 200:
+            return True
+        self.counts["index_pages"] += 1
+        for link in page_links(body.decode("utf-8", "replace"), item.url):
+            url = normalize_url(link)
+            if not url.startswith(("http://", "https://")) or urlsplit(url).netloc != name:
+                continue
+            if self.include is not None and self.include.search(url):
+                kind = "listing"
+            elif self.follow is not None and item.depth < self.max_depth and self.follow.search(url):
+                kind = "index"
+            else:
+                continue
+            if not self.frontier.has_room() and not self.frontier.seen(url):
+                return False  # de rest bij een volgende lezing; wat al in de frontier staat telt dan als duplicaat
+            self.frontier.add(name, _Item(url, kind, item.depth + (kind == "index")))
+        return True
+
+    async def _fetch(self, host: _Host, url: str) -> tuple[Optional[int], bytes]:
+        """(status, body) met de token bucket van de host; (None, b"") bij een netwerkfout of te grote body."""
+        await host.bucket.acquire()
+        headers = {"User-Agent": self.user_agent}
+        try:
+            client = get_async_client()
+            if client is None:
+                resp = await asyncio.to_thread(get_session().get, url, headers=headers, timeout=TIMEOUT)
+                if len(resp.content) > CRAWL_MAX_BYTES:
+                    raise ValueError(f"meer dan {CRAWL_MAX_BYTES} bytes")
+                return resp.status_code, resp.content
+            async with client.stream("GET", url, headers=headers) as resp:
+                chunks, size = [], 0
+                async for chunk in resp.aiter_bytes():
+                    size += len(chunk)
+                    if size > CRAWL_MAX_BYTES:
+                        raise ValueError(f"meer dan {CRAWL_MAX_BYTES} bytes")
+                    chunks.append(chunk)
+                return resp.status_code, b"".join(chunks)
+        except Exception as e:  # httpx/requests-fouten, time-outs, te groot
+            self.counts["fetch_errors"] += 1
+            logger.warning("Ophalen van %s mislukt: %s", url, e)
+            return None, b""
@@ -3,12 +3,24 @@
 from __future__ import annotations
 import json
 import re
+import time
+from dataclasses import asdict, fields
 from typing import Optional
 from urllib.parse import urlparse
 import requests
-from bs4 import BeautifulSoup
+from requests.compat import chardet
 
+import page_cache
+from config import HTML_PARSER_BACKEND
+from http_session import get_session
+from metrics import FETCH_BYTES, FETCH_FAILURES, FETCH_SECONDS, PARSE_SECONDS, host_label
+from keywords import PHOTO_MATCHER, SUSTAINABILITY_MATCHER
 from lqm_scorer import ExtractedData
+from page_cache import CacheEntry
+from page_index import (
+    PageIndex, build_index, GENERAL_SELECTORS, NATURE_SELECTORS, PLACE_SELECTORS, FALLBACK_SELECTORS,
+)
+from timing import Laps, stage
 
 
 USER_AGENT = (
@@ -16,41 +28,80 @@ USER_AGENT = (
     "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
 )
 TIMEOUT = 15
+# Versie van de extractielogica; verhogen als extract_from_html andere waarden kan opleveren
+EXTRACTOR_VERSION = "2"
 
 
 def fetch_page(url: str) -> tuple[str | None, str | None]:
     """Haalt HTML op van de URL. Retourneert (html, error_message)."""
+    entry, err = fetch_page_entry(url)
+    return (entry.html if entry else None), err
+
+
+def fetch_page_entry(url: str, user_agent: str = USER_AGENT) -> tuple[CacheEntry | None, str | None]:
+    """
+    Haalt de pagina op via de paginacache: vers in de cache = geen request, verlopen =
+    conditionele GET (304 hergebruikt de gecachte HTML), anders een gewone download.
+    Retourneert (entry, error_message); entry.extracted is gezet als de pagina al eens geparsed is.
+    """
+    cached, fresh = page_cache.lookup(url)
+    if fresh:
+        return cached, None
+    headers = {"User-Agent": user_agent}
+    if cached is not None:
+        headers.update(cached.conditional_headers())
+    host = host_label(url)
+    t0 = time.perf_counter()
     try:
-        resp = requests.get(
-            url,
-            headers={"User-Agent": USER_AGENT},
-            timeout=TIMEOUT,
-            allow_redirects=True,
-        )
-        resp.raise_for_status()
-        resp.encoding = resp.apparent_encoding or "utf-8"
-        return resp.text, None
+        # stream=True: get() komt terug na de headers, zodat "fetch" en "download" apart te meten zijn
+        with stage("fetch"):
+            resp = get_session().get(
+                url,
+                headers=headers,
+                timeout=TIMEOUT,
+                allow_redirects=True,
+                stream=True,
+            )
+        with resp:
+            if cached is not None and resp.status_code == 304:
+                return page_cache.revalidated(url, cached), None
+            resp.raise_for_status()
+            with stage("download"):
+                content = resp.content
+        FETCH_SECONDS.observe(time.perf_counter() - t0, host=host)
+        FETCH_BYTES.inc(len(content), host=host)
+        with stage("decode"):
+            html = decode_html(content)
     except requests.RequestException as e:
+        FETCH_FAILURES.inc(host=host)
         return None, str(e)
+    entry = page_cache.store(url, html, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), replaced=cached is not None)
+    return entry, None
+
 
+def decode_html(content: bytes) -> str:
+    """Decodeer de paginabytes met de gedetecteerde encoding (zelfde als requests' apparent_encoding)."""
+    encoding = (chardet.detect(content) or {}).get("encoding") or "utf-8"
+    try:
+        return str(content, encoding, errors="replace")
+    except (LookupError, TypeError):
+        return str(content, "utf-8", errors="replace")
 
-def _get_text(soup: BeautifulSoup, selectors: list[str], join: str = " ") -> str:
+
+def _get_text(index: PageIndex, selectors: list[str], join: str = " ") -> str:
     """Zoekt eerste match voor een van de selectors en retourneert getrimde tekst."""
     for sel in selectors:
-        el = soup.select_one(sel)
-        if el:
-            return " ".join(el.get_text(separator=" ", strip=True).split())
+        t = index.first_text(sel)
+        if t is not None:
+            return t
     return ""
 
 
-def _get_all_text(soup: BeautifulSoup, selectors: list[str], join: str = " ") -> str:
+def _get_all_text(index: PageIndex, selectors: list[str], join: str = " ") -> str:
     """Verzamelt tekst van alle elementen die matchen met een van de selectors."""
     parts = []
     for sel in selectors:
-        for el in soup.select(sel):
-            t = el.get_text(separator=" ", strip=True)
-            if t:
-                parts.append(" ".join(t.split()))
+        parts.extend(index.selector_texts(sel))
     return join.join(parts) if parts else ""
 
 
@@ -59,11 +110,12 @@ _IMG_SKIP = {"logo", "icon", "avatar", "sprite", "pixel", "tracking", "1x1", "pl
 _LISTING_IMAGE_WIDTH = "760"
 
 
-def _listing_images(soup: BeautifulSoup) -> list:
-    """Lijst van img-elementen die bij de listing horen: niet logo's/icons, en alleen width=760 (galerij)."""
-    imgs = soup.find_all("img", src=True)
+def _listing_images(index: PageIndex) -> list[dict]:
+    """Lijst van img-attributen die bij de listing horen: niet logo's/icons, en alleen width=760 (galerij)."""
+    if index.listing_images is not None:
+        return index.listing_images
     out = []
-    for img in imgs:
+    for img in index.images:
         src = (img.get("src") or "").lower()
         alt = (img.get("alt") or "").lower()
         if any(s in src or s in alt for s in _IMG_SKIP):
@@ -74,17 +126,18 @@ def _listing_images(soup: BeautifulSoup) -> list:
             if w is None or _LISTING_IMAGE_WIDTH not in str(w):
                 continue
             out.append(img)
+    index.listing_images = out
     return out
 
 
-def _count_images(soup: BeautifulSoup, url: str) -> int:
+def _count_images(index: PageIndex, url: str) -> int:
     """Telt afbeeldingen die bij de listing horen (width=760, geen logo's/icons)."""
-    return len(_listing_images(soup))
+    return len(_listing_images(index))
 
 
-def _cover_photo_suggests_nature(soup: BeautifulSoup, url: str) -> Optional[bool]:
+def _cover_photo_suggests_nature(index: PageIndex, url: str) -> Optional[bool]:
     """Eerste (cover)foto: huisje in de natuur? Afgeleid uit alt-tekst. True/False/None."""
-    imgs = _listing_images(soup)
+    imgs = _listing_images(index)
     if not imgs:
         return None
     first = imgs[0]
@@ -92,23 +145,17 @@ def _cover_photo_suggests_nature(soup: BeautifulSoup, url: str) -> Optional[bool
     src = (first.get("src") or "").lower()
     if not alt and not src:
         return None
-    text = alt + " " + src
-    nature = ("natuur", "nature", "bos", "forest", "weide", "veld", "landschap", "landscape", "buiten", "outdoor")
-    house = ("huis", "house", "vakantiehuis", "cottage", "chalet", "bungalow", "villa", "accommodatie")
-    has_nature = any(k in text for k in nature)
-    has_house = any(k in text for k in house)
-    if has_nature and has_house:
-        return True
-    if has_nature or has_house:
+    tags = PHOTO_MATCHER.tags(alt + " " + src, ("nature", "house"))
+    if "nature" in tags or "house" in tags:
         return True
     if len(alt) > 10:
         return False
     return None
 
 
-def _first_photo_house_not_interior(soup: BeautifulSoup) -> Optional[bool]:
+def _first_photo_house_not_interior(index: PageIndex) -> Optional[bool]:
     """Eerste foto: huisje (exterior) en geen interieur? Uit alt/src. True=huisje, False=interieur, None=onbekend."""
-    imgs = _listing_images(soup)
+    imgs = _listing_images(index)
     if not imgs:
         return None
     first = imgs[0]
@@ -117,18 +164,17 @@ def _first_photo_house_not_interior(soup: BeautifulSoup) -> Optional[bool]:
     text = alt + " " + src
     if not text.strip():
         return None
-    interior = ("interieur", "interior", "woonkamer", "living", "slaapkamer", "bedroom", "keuken", "kitchen", "badkamer", "bathroom", "binnen", "indoor")
-    exterior_house = ("huis", "house", "buiten", "exterior", "facade", "vakantiehuis", "chalet", "bungalow", "villa", "accommodatie", "natuur", "nature")
-    if any(k in text for k in interior):
+    tags = PHOTO_MATCHER.tags(text, ("interior",))
+    if "interior" in tags:
         return False
-    if any(k in text for k in exterior_house):
+    if "exterior" in tags:
         return True
     return None
 
 
-def _first_photo_dimensions(soup: BeautifulSoup) -> tuple[Optional[int], Optional[int]]:
+def _first_photo_dimensions(index: PageIndex) -> tuple[Optional[int], Optional[int]]:
     """Breedte en hoogte van eerste listing-foto uit HTML-attributen. (width, height) of (None, None)."""
-    imgs = _listing_images(soup)
+    imgs = _listing_images(index)
     if not imgs:
         return None, None
     first = imgs[0]
@@ -141,12 +187,12 @@ def _first_photo_dimensions(soup: BeautifulSoup) -> tuple[Optional[int], Optiona
     return w, h
 
 
-def _find_json_ld(soup: BeautifulSoup) -> list[dict]:
+def _find_json_ld(index: PageIndex) -> list[dict]:
     """Haalt JSON-LD scripts op (o.a. voor Accommodation)."""
     result = []
-    for script in soup.find_all("script", type="application/ld+json"):
+    for raw in index.json_ld:
         try:
-            data = json.loads(script.string or "{}")
+            data = json.loads(raw or "{}")
             if isinstance(data, list):
                 result.extend(data)
             elif isinstance(data, dict):
@@ -182,91 +228,21 @@ def _extract_from_json_ld(blocks: list[dict]) -> dict:
     return out
 
 
-def extract_from_html(html: str, url: str) -> ExtractedData:
-    """
-    Parsed de HTML van een advertentiepagina en vult zoveel mogelijk
-    velden van ExtractedData. Velden die niet op de pagina staan blijven None.
-    """
-    soup = BeautifulSoup(html, "lxml")
-    data = ExtractedData()
-
-    # --- Description: zoek naar hoofdtekst / beschrijvingen ---
-    # Eerste grote tekstblokken als "general", evt. sectie met "natuur" als "nature"
-    general_selectors = [
-        "[data-testid='description']",
-        ".description",
-        ".listing-description",
-        ".property-description",
-        "[class*='description']",
-        "article p",
-        ".content p",
-        "main p",
-    ]
-    data.general_description = _get_all_text(soup, general_selectors, "\n\n")
-    if not data.general_description:
-        data.general_description = _get_all_text(soup, ["p"], "\n\n")[:5000]
-
-    # Aparte "natuur" beschrijving zoeken
-    nature_selectors = [
-        "[class*='nature']",
-        "[id*='nature']",
-        "[data-section='nature']",
-        ".nature-description",
-    ]
-    data.nature_description = _get_all_text(soup, nature_selectors, "\n\n")
-    if not data.nature_description and data.general_description:
-        # Geen aparte natuur-sectie: gebruik tweede helft van algemene tekst als proxy
-        parts = (data.general_description or "").split("\n\n")
-        if len(parts) >= 2:
-            data.nature_description = "\n\n".join(parts[1:])
-
-    # Place / locatie uit tekst of meta
-    place_selectors = [
-        "[itemprop='addressLocality']",
-        ".address-locality",
-        "[class*='location']",
-        "[class*='place']",
-        "[data-testid='location']",
-    ]
-    data.place = _get_text(soup, place_selectors)
-    if not data.place:
-        meta_geo = soup.find("meta", attrs={"name": re.compile(r"geo|place|location", re.I)})
-        if meta_geo and meta_geo.get("content"):
-            data.place = meta_geo["content"].strip()
-
-    # Postcode uit tekst of JSON-LD
-    json_ld_blocks = _find_json_ld(soup)
-    json_data = _extract_from_json_ld(json_ld_blocks)
-    if json_data.get("postalCode"):
-        data.postcode = str(json_data["postalCode"]).strip()
-    if json_data.get("addressLocality") and not data.place:
-        data.place = str(json_data["addressLocality"]).strip()
-
-    # Place: malus voor ( ), * , 
-    if data.place and ("(" in data.place or "*" in data.place or "," in data.place):
-        pass  # Scorer handelt malus_place_chars
-
-    # Foto's: tel img op de pagina
-    data.photo_count = _count_images(soup, url)
-
+def _apply_reviews(index: PageIndex, json_data: dict, data: ExtractedData) -> None:
+    """Vult nr_reviews, average_rating en rating_scale_max uit de nh-markers, JSON-LD en als laatste de paginatekst."""
     # Aantal beoordelingen: <span class="nh-anchor__label">184 beoordelingen</span>
-    label_span = soup.find("span", class_=lambda c: c and "nh-anchor__label" in (c if isinstance(c, str) else " ".join(c)))
-    if label_span:
-        label_text = (label_span.get_text() or "").strip()
-        m = re.search(r"(\d+)\s*beoordelingen?", label_text, re.I)
+    if index.review_label_text is not None:
+        m = re.search(r"(\d+)\s*beoordelingen?", index.review_label_text, re.I)
         if m:
             try:
                 data.nr_reviews = int(m.group(1))
             except (ValueError, IndexError):
                 pass
     # Score: bij <span class="nh-icon__star-filled"> — zoek getal inzelfde container of tel gevulde sterren
-    stars_container = soup.find("span", class_=lambda c: c and "nh-icon__star-filled" in (c if isinstance(c, str) else " ".join(c)))
-    if stars_container:
+    if index.has_star:
         # Zoek naar getal (bijv. 4.8 of 4,8) in parent of siblings
-        parent = stars_container.parent
-        if parent:
-            parent_text = parent.get_text(separator=" ", strip=True) or ""
-            num_match = re.search(r"(\d+)[.,]?(\d*)", parent_text)
+        if index.star_parent_text is not None:
+            num_match = re.search(r"(\d+)[.,]?(\d*)", index.star_parent_text)
             if num_match:
                 try:
                     whole = num_match.group(1)
@@ -278,11 +254,10 @@ def extract_from_html(html: str, url: str) -> ExtractedData:
                         data.rating_scale_max = 10 if val <= 10 else 5
                 except (ValueError, TypeError):
                     pass
-        if data.average_rating is None and parent:
+        if data.average_rating is None and index.star_parent_text is not None:
             # Fallback: tel gevulde sterren alleen in dezelfde container (schaal 5)
-            filled = parent.find_all("span", class_=lambda c: c and "nh-icon__star-filled" in (c if isinstance(c, str) else " ".join(c)))
-            if filled:
-                data.average_rating = float(len(filled))
+            if index.star_parent_count:
+                data.average_rating = float(index.star_parent_count)
                 data.rating_scale_max = 5
     # Fallback: reviews en score uit JSON-LD
     if json_data.get("reviewCount") is not None and data.nr_reviews is None:
@@ -299,7 +274,7 @@ def extract_from_html(html: str, url: str) -> ExtractedData:
             pass
     if data.nr_reviews is None:
         # Zoek naar "X reviews" of "X beoordelingen" in pagina-tekst
-        text = soup.get_text()
+        text = index.page_text
         for pat in [r"(\d+)\s*(?:reviews?|beoordelingen?)", r"(?:reviews?|beoordelingen?)\s*[:\s]*(\d+)"]:
             m = re.search(pat, text, re.I)
             if m:
@@ -309,10 +284,79 @@ def extract_from_html(html: str, url: str) -> ExtractedData:
                 except (IndexError, ValueError):
                     pass
 
+
+def apply_photo_analysis(data: ExtractedData, ai: dict) -> None:
+    """Neem het resultaat van analyze_first_photo over in de AI-velden van ExtractedData."""
+    if ai.get("is_exterior") is not None:
+        data.first_photo_ai_exterior = ai["is_exterior"]
+    if ai.get("has_watermark") is not None:
+        data.first_photo_ai_watermark = ai["has_watermark"]
+    if ai.get("is_collage") is not None:
+        data.first_photo_ai_collage = ai["is_collage"]
+
+
+def extract_from_html(
+    html: str, url: str, analyze_photo: bool = True, backend: Optional[str] = None
+) -> ExtractedData:
+    """
+    Parsed de HTML van een advertentiepagina en vult zoveel mogelijk
+    velden van ExtractedData. Velden die niet op de pagina staan blijven None.
+    Met analyze_photo=False wordt de AI-analyse van de coverfoto overgeslagen
+    (bijv. omdat de aanroeper die zelf asynchroon doet via first_photo_src).
+    backend kiest de HTML-parser ("bs4", "lxml" of "partial"); standaard config.HTML_PARSER_BACKEND.
+    """
+    laps = Laps()
+    backend = backend or HTML_PARSER_BACKEND
+    with PARSE_SECONDS.time(backend=backend):
+        index = build_index(html, backend)
+    data = ExtractedData()
+    laps("parse")
+
+    # --- Description: zoek naar hoofdtekst / beschrijvingen ---
+    # Eerste grote tekstblokken als "general", evt. sectie met "natuur" als "nature"
+    data.general_description = _get_all_text(index, GENERAL_SELECTORS, "\n\n")
+    if not data.general_description:
+        data.general_description = _get_all_text(index, FALLBACK_SELECTORS, "\n\n")[:5000]
+
+    # Aparte "natuur" beschrijving zoeken
+    data.nature_description = _get_all_text(index, NATURE_SELECTORS, "\n\n")
+    if not data.nature_description and data.general_description:
+        # Geen aparte natuur-sectie: gebruik tweede helft van algemene tekst als proxy
+        parts = (data.general_description or "").split("\n\n")
+        if len(parts) >= 2:
+            data.nature_description = "\n\n".join(parts[1:])
+
+    # Place / locatie uit tekst of meta
+    data.place = _get_text(index, PLACE_SELECTORS)
+    if not data.place:
+        if index.meta_geo_content:
+            data.place = index.meta_geo_content.strip()
+    laps("extract-text")
+
+    # Postcode uit tekst of JSON-LD
+    json_ld_blocks = _find_json_ld(index)
+    json_data = _extract_from_json_ld(json_ld_blocks)
+    if json_data.get("postalCode"):
+        data.postcode = str(json_data["postalCode"]).strip()
+    if json_data.get("addressLocality") and not data.place:
+        data.place = str(json_data["addressLocality"]).strip()
+
+    # Place: malus voor ( ), * , 
+    if data.place and ("(" in data.place or "*" in data.place or "," in data.place):
+        pass  # Scorer handelt malus_place_chars
+    laps("extract-jsonld")
+
+    # Foto's: tel img op de pagina
+    data.photo_count = _count_images(index, url)
+    laps("extract-photos")
+
+    # Beoordelingen en gemiddelde score (nh-markers, JSON-LD, paginatekst)
+    _apply_reviews(index, json_data, data)
+    laps("extract-reviews")
+
     # Impact: nh-impact-house-tag percentage='' in paginabron; max 112 punten → 90+ = 3 blaadjes, 67+ = 2, 45+ = 1
-    impact_tag = soup.find("nh-impact-house-tag")
-    if impact_tag:
-        raw = impact_tag.get("percentage") or impact_tag.get("points")
+    if index.impact_attrs is not None:
+        raw = index.impact_attrs.get("percentage") or index.impact_attrs.get("points")
         if raw is not None:
             try:
                 val = float(str(raw).strip())
@@ -333,60 +377,93 @@ def extract_from_html(html: str, url: str) -> ExtractedData:
             except (ValueError, TypeError):
                 pass
     if data.sustainability_impact_level_leaves is None:
-        text_lower = (soup.get_text() or "").lower()
-        if "duurzaam" in text_lower or "sustainability" in text_lower or "eco" in text_lower:
+        if SUSTAINABILITY_MATCHER.tags(index.page_words):
             data.sustainability_impact_level_leaves = 1
+    laps("extract-impact")
 
     # Availability: instant booking in paginabron: <span class="nh-icon__instant-booking"></span>
-    if soup.find("span", class_=lambda c: c and "instant-booking" in (c if isinstance(c, str) else " ".join(c))):
-        data.allow_instant_booking = 1
-    elif soup.find(class_=re.compile(r"nh-icon__instant-booking", re.I)):
+    if index.instant_booking:
         data.allow_instant_booking = 1
 
     # Coverfoto (eerste foto): moet huisje in de natuur zijn – afleiden uit alt-tekst eerste gallery-foto
-    cover_nature = _cover_photo_suggests_nature(soup, url)
+    cover_nature = _cover_photo_suggests_nature(index, url)
     data.cover_photo_suggests_nature = cover_nature
 
     # Photos advisory: eerste foto huisje (geen interieur), resolutie eerste foto
-    data.first_photo_house_not_interior = _first_photo_house_not_interior(soup)
-    w, h = _first_photo_dimensions(soup)
+    data.first_photo_house_not_interior = _first_photo_house_not_interior(index)
+    w, h = _first_photo_dimensions(index)
     data.first_photo_width = w
     data.first_photo_height = h
 
     # AI-vision: analyseer eerste foto (exterior/interieur, watermerk, collage) als OPENAI_API_KEY gezet is
-    imgs = _listing_images(soup)
+    # of de lokale analyse aan staat (LQM_VISION_MODE)
+    imgs = _listing_images(index)
     if imgs:
-        first_src = imgs[0].get("src") or imgs[0].get("data-src")
-        if first_src:
-            try:
-                from vision_analyzer import analyze_first_photo
-                ai = analyze_first_photo(first_src, url)
-                if ai.get("is_exterior") is not None:
-                    data.first_photo_ai_exterior = ai["is_exterior"]
-                if ai.get("has_watermark") is not None:
-                    data.first_photo_ai_watermark = ai["has_watermark"]
-                if ai.get("is_collage") is not None:
-                    data.first_photo_ai_collage = ai["is_collage"]
-            except Exception:
-                pass
+        data.first_photo_src = imgs[0].get("src") or imgs[0].get("data-src") or None
+    laps("extract-cover")
+    if analyze_photo:
+        analyze_cover_photo(data, url)
 
     return data
 
 
+def analyze_cover_photo(data: ExtractedData, url: str) -> bool:
+    """
+    AI-analyse van de coverfoto in data. False als de analyse aan staat maar niets opleverde
+    (time-out, 429, onleesbare foto): zo'n extractie hoort niet in de caches.
+    """
+    if not data.first_photo_src:
+        return True
+    try:
+        from vision_analyzer import analyze_first_photo, vision_enabled
+        if not vision_enabled():
+            return True
+        ai = analyze_first_photo(data.first_photo_src, url)
+        apply_photo_analysis(data, ai)
+    except Exception:
+        return False
+    return any(v is not None for v in ai.values())
+
+
+def prepare_url(url: str) -> str:
+    """Getrimde URL met https:// als er geen schema is ("" bij lege invoer)."""
+    url = (url or "").strip()
+    if url and not url.startswith(("http://", "https://")):
+        url = "https://" + url
+    return url
+
+
 def extract_from_url(url: str) -> tuple[ExtractedData | None, str | None]:
     """
     Haalt de pagina op en extraheert data. Retourneert (ExtractedData, None) bij succes,
     of (None, error_message) bij fout.
     """
-    if not url or not url.strip():
+    url = prepare_url(url)
+    if not url:
         return None, "Geen URL opgegeven."
-    url = url.strip()
-    if not url.startswith(("http://", "https://")):
-        url = "https://" + url
 
-    html, err = fetch_page(url)
+    entry, err = fetch_page_entry(url)
     if err:
         return None, f"Pagina ophalen mislukt: {err}"
-
-    data = extract_from_html(html, url)
+    data, _ = extract_from_entry(entry, url)
     return data, None
+
+
+def extract_from_entry(entry: CacheEntry, url: str) -> tuple[ExtractedData, bool]:
+    """
+    Extraheer een opgehaalde pagina; bij een ongewijzigde pagina (cache-hit of 304) de eerdere extractie.
+    Retourneert (data, cachebaar): niet cachebaar als de AI-foto-analyse mislukte.
+    """
+    if entry.extracted is not None:
+        return extracted_from_dict(entry.extracted), True
+    data = extract_from_html(entry.html, url, analyze_photo=False)
+    cacheable = analyze_cover_photo(data, url)
+    if cacheable:
+        page_cache.remember_extracted(url, entry, asdict(data))
+    return data, cacheable
+
+
+def extracted_from_dict(d: dict) -> ExtractedData:
+    """ExtractedData uit een (gecachte) dict; onbekende of verouderde keys worden genegeerd."""
+    names = {f.name for f in fields(ExtractedData)}
+    return ExtractedData(**{k: v for k, v in d.items() if k in names})
@@ -0,0 +1,128 @@
+# Gedeelde HTTP-sessie voor extractor en vision_analyzer
+# Eén requests.Session per proces met een connection pool per host (keep-alive), zodat
+# pagina en coverfoto van dezelfde host/CDN geen nieuwe TCP- en TLS-handshake kosten.
+
+from __future__ import annotations
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import timing
+from config import HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_POOL_BLOCK
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+# Tellers per host: aantal requests en aantal nieuw geopende verbindingen
+_stats: dict[str, dict[str, int]] = {}
+_stats_lock = threading.Lock()
+
+
+def _count(host: str, key: str) -> None:
+    with _stats_lock:
+        per_host = _stats.setdefault(host, {"requests": 0, "connections": 0})
+        per_host[key] += 1
+
+
+class _CountingPoolMixin:
+    """Telt requests en nieuwe verbindingen per host; het verschil is hergebruik via keep-alive."""
+
+    def _new_conn(self):
+        _count(self.host, "connections")
+        return super()._new_conn()
+
+    def urlopen(self, *args, **kwargs):
+        _count(self.host, "requests")
+        return super().urlopen(*args, **kwargs)
+
+
+class _TimedConnectionMixin:
+    """Meet nieuwe verbindingen voor timing.py: "connect" is DNS + TCP (urllib3 doet beide in één aanroep)."""
+
+    def _new_conn(self):
+        t0 = time.perf_counter()
+        sock = super()._new_conn()
+        self._connect_seconds = time.perf_counter() - t0
+        timing.record("connect", self._connect_seconds)
+        return sock
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self) -> None:
+        # connect() = _new_conn() (DNS + TCP) + TLS-handshake; het verschil is "tls"
+        self._connect_seconds = 0.0
+        t0 = time.perf_counter()
+        super().connect()
+        timing.record("tls", time.perf_counter() - t0 - self._connect_seconds)
+
+
+class _CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _PooledAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    adapter = _PooledAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        pool_block=HTTP_POOL_BLOCK,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """De procesbrede sessie (lui aangemaakt, thread-safe)."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _new_session()
+    return _session
+
+
+def reset_session() -> None:
+    """Sluit de sessie en alle pools (bijv. na fork of in tests); de volgende get_session() maakt een nieuwe."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def session_stats() -> dict:
+    """Requests, geopende verbindingen en hergebruik (totaal en per host)."""
+    with _stats_lock:
+        per_host = {h: dict(v) for h, v in _stats.items()}
+    total_requests = sum(v["requests"] for v in per_host.values())
+    total_connections = sum(v["connections"] for v in per_host.values())
+    reused = max(0, total_requests - total_connections)
+    return {
+        "requests": total_requests,
+        "connections_opened": total_connections,
+        "connections_reused": reused,
+        "reuse_ratio": round(reused / total_requests, 3) if total_requests else None,
+        "per_host": per_host,
+    }
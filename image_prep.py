@@ -0,0 +1,94 @@
+# Voorbereiding van de coverfoto voor analyse
+# De download gaat in één vooraf gereserveerde buffer (Content-Length) in plaats van een steeds
+# groeiend bytes-object; daarna verkleinen we naar VISION_MAX_EDGE pixels (Pillow, in requirements.txt),
+# want voor exterior/collage/watermerk is een thumbnail genoeg en de upload wordt veel kleiner.
+
+from __future__ import annotations
+import io
+import logging
+from typing import Optional
+
+from config import VISION_MAX_EDGE
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+    logging.getLogger("lqm.image_prep").warning(
+        "Pillow ontbreekt (pip install Pillow): coverfoto's gaan onverkleind naar de foto-analyse."
+    )
+
+# Beginmaat als de server geen Content-Length stuurt
+_DEFAULT_CAPACITY = 256 * 1024
+_JPEG_QUALITY = 85
+
+
+class ImageBuffer:
+    """Schrijfbuffer met vaste bovengrens; reserveert in één keer de verwachte grootte."""
+
+    def __init__(self, max_bytes: int, expected: Optional[int] = None):
+        self.max_bytes = max_bytes
+        capacity = expected if expected and expected > 0 else _DEFAULT_CAPACITY
+        self._buf = bytearray(min(capacity, max_bytes))
+        self._len = 0
+        self.truncated = False
+
+    @classmethod
+    def for_headers(cls, headers, max_bytes: int) -> "ImageBuffer":
+        try:
+            expected = int(headers.get("content-length") or 0)
+        except ValueError:
+            expected = 0
+        return cls(max_bytes, expected)
+
+    def write(self, chunk: bytes) -> bool:
+        """Voeg chunk toe; False als max_bytes bereikt is (de rest wordt dan genegeerd)."""
+        room = self.max_bytes - self._len
+        if len(chunk) > room:
+            chunk = chunk[:room]
+            self.truncated = True
+        end = self._len + len(chunk)
+        if end > len(self._buf):
+            self._buf.extend(bytes(max(end, min(2 * len(self._buf), self.max_bytes)) - len(self._buf)))
+        self._buf[self._len:end] = chunk
+        self._len = end
+        return not self.truncated
+
+    def getvalue(self) -> Optional[bytes]:
+        if not self._len:
+            return None
+        if self._len == len(self._buf):
+            return bytes(self._buf)
+        return bytes(memoryview(self._buf)[:self._len])
+
+
+def decode_thumbnail(data: bytes, max_edge: int = VISION_MAX_EDGE):
+    """PIL-afbeelding (RGB) met de langste zijde hoogstens max_edge; None zonder Pillow of als decoderen mislukt."""
+    if Image is None:
+        return None
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.draft("RGB", (max_edge, max_edge))  # JPEG: direct op 1/2, 1/4 of 1/8 decoderen
+        img = img.convert("RGB")
+        img.thumbnail((max_edge, max_edge))
+        return img
+    except Exception:
+        return None
+
+
+def prepare_for_vision(data: bytes, max_edge: int = VISION_MAX_EDGE, img=None) -> tuple[bytes, str]:
+    """
+    (afbeelding, mime-type) voor de Vision-upload: verkleinde JPEG, of het origineel als dat niet lukt.
+    img: al gedecodeerde thumbnail van data (bijv. uit de lokale analyse), dan niet opnieuw decoderen.
+    """
+    if img is None:
+        img = decode_thumbnail(data, max_edge)
+    if img is None:
+        return data, "image/jpeg"
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=_JPEG_QUALITY, optimize=True)
+    small = out.getvalue()
+    # Een kleine JPEG kan na opnieuw comprimeren groter uitvallen
+    if len(small) >= len(data) and data[:3] == b"\xff\xd8\xff":
+        return data, "image/jpeg"
+    return small, "image/jpeg"
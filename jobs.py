@@ -0,0 +1,374 @@
+# Taken voor lange analyses (POST /api/jobs, GET /api/jobs/<id>)
+# Een taak is een lijst URL's in SQLite (WAL): de HTTP-verbinding hoeft niet open te blijven en na een
+# herstart of een gunicorn-timeout gaat het werk verder. Elk proces met een JobRunner haalt steeds een
+# paar URL's tegelijk uit de gedeelde rij (zoveel als het plekken vrij heeft), dus processen die
+# sneller klaar zijn nemen vanzelf meer werk: alle workers en cores blijven bezig.
+# URL's van een proces dat stopt zonder af te ronden komen na LQM_JOBS_CLAIM_TIMEOUT weer vrij.
+# Resultaten zijn per stuk op te halen zodra ze klaar zijn (?after=<cursor>).
+
+from __future__ import annotations
+import asyncio
+import atexit
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import metrics
+from batch import _aggregate, analyze_one
+from config import (
+    BATCH_URL_TIMEOUT, JOBS_CLAIM_TIMEOUT, JOBS_CONCURRENCY, JOBS_MAX_ATTEMPTS, JOBS_PATH, JOBS_POLL_INTERVAL,
+    JOBS_TTL,
+)
+
+logger = logging.getLogger("lqm.jobs")
+
+# Max. resultaten per GET /api/jobs/<id>; de rest met ?after=<cursor>
+PAGE_SIZE = 500
+
+
+class JobStore:
+    """Taken en hun URL's (queued -> running -> done/failed) in één SQLite-bestand, gedeeld door processen."""
+
+    def __init__(self, path: str = JOBS_PATH, claim_timeout: float = JOBS_CLAIM_TIMEOUT,
+                 max_attempts: int = JOBS_MAX_ATTEMPTS, ttl: float = JOBS_TTL):
+        self.path = path
+        self.claim_timeout = claim_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, count INTEGER NOT NULL, created REAL NOT NULL, finished REAL, totals TEXT)"
+        )
+        # seq: volgorde van afronden binnen de taak, de cursor voor ?after=
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS job_items ("
+            " job_id TEXT NOT NULL, idx INTEGER NOT NULL, url TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'queued',"
+            " worker TEXT, claimed REAL, attempts INTEGER NOT NULL DEFAULT 0, seq INTEGER, result TEXT,"
+            " PRIMARY KEY (job_id, idx))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS job_items_status ON job_items (status, claimed)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS job_items_seq ON job_items (job_id, seq)")
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Schrijftransactie; BEGIN IMMEDIATE neemt de schrijflock meteen, zodat twee processen nooit dezelfde URL pakken."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def create(self, urls: list[str]) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._write() as db:
+            self._purge(db, now)
+            db.execute("INSERT INTO jobs (id, count, created) VALUES (?, ?, ?)", (job_id, len(urls), now))
+            db.executemany(
+                "INSERT INTO job_items (job_id, idx, url) VALUES (?, ?, ?)",
+                ((job_id, i, u) for i, u in enumerate(urls)),
+            )
+        return job_id
+
+    def claim(self, worker: str, n: int) -> list[tuple[str, int, str]]:
+        """Tot n URL's (job_id, idx, url) op naam van deze worker, oudste taak eerst."""
+        now = time.time()
+        with self._write() as db:
+            self._reclaim(db, now)
+            rows = db.execute(
+                "SELECT rowid, job_id, idx, url FROM job_items WHERE status = 'queued' ORDER BY rowid LIMIT ?", (n,)
+            ).fetchall()
+            db.executemany(
+                "UPDATE job_items SET status = 'running', worker = ?, claimed = ?, attempts = attempts + 1 WHERE rowid = ?",
+                ((worker, now, r[0]) for r in rows),
+            )
+        return [(job_id, idx, url) for _, job_id, idx, url in rows]
+
+    def complete(self, job_id: str, idx: int, worker: str, result: dict) -> bool:
+        """Uitkomst opslaan; False als de URL inmiddels niet meer van deze worker is (weer vrijgegeven)."""
+        with self._write() as db:
+            return self._finish(db, job_id, idx, result, "AND worker = ? AND status = 'running'", (worker,))
+
+    def release(self, worker: str) -> int:
+        """Lopende URL's van deze worker teruggeven (netjes stoppen); telt niet als poging."""
+        with self._write() as db:
+            return db.execute(
+                "UPDATE job_items SET status = 'queued', worker = NULL, claimed = NULL, attempts = attempts - 1"
+                " WHERE worker = ? AND status = 'running'",
+                (worker,),
+            ).rowcount
+
+    def _reclaim(self, db: sqlite3.Connection, now: float) -> None:
+        """URL's van gestopte processen weer vrijgeven, of na max_attempts als mislukt afronden."""
+        stale = db.execute(
+            "SELECT job_id, idx, url, attempts FROM job_items WHERE status = 'running' AND claimed < ?",
+            (now - self.claim_timeout,),
+        ).fetchall()
+        for job_id, idx, url, attempts in stale:
+            if attempts < self.max_attempts:
+                db.execute(
+                    "UPDATE job_items SET status = 'queued', worker = NULL, claimed = NULL WHERE job_id = ? AND idx = ?",
+                    (job_id, idx),
+                )
+            else:
+                error = f"Geen uitkomst na {attempts} pogingen (worker gestopt)."
+                self._finish(db, job_id, idx, {"ok": False, "url": url, "error": error}, "", ())
+
+    def _finish(self, db: sqlite3.Connection, job_id: str, idx: int, result: dict, where: str, params: tuple) -> bool:
+        seq = db.execute("SELECT coalesce(max(seq), 0) + 1 FROM job_items WHERE job_id = ?", (job_id,)).fetchone()[0]
+        updated = db.execute(
+            "UPDATE job_items SET status = ?, seq = ?, result = ?, worker = NULL"
+            f" WHERE job_id = ? AND idx = ? {where}",
+            ("done" if result.get("ok") else "failed", seq, json.dumps(result), job_id, idx, *params),
+        ).rowcount
+        if updated and seq == db.execute("SELECT count FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]:
+            self._close_job(db, job_id)
+        return bool(updated)
+
+    def _close_job(self, db: sqlite3.Connection, job_id: str) -> None:
+        """Laatste URL klaar: totalen (als bij de batch-API) eenmalig berekenen en bewaren."""
+        now = time.time()
+        created = db.execute("SELECT created FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        results = [json.loads(r[0]) for r in db.execute(
+            "SELECT result FROM job_items WHERE job_id = ? ORDER BY idx", (job_id,)
+        )]
+        db.execute(
+            "UPDATE jobs SET finished = ?, totals = ? WHERE id = ?",
+            (now, json.dumps(_aggregate(results, now - created)), job_id),
+        )
+
+    def _purge(self, db: sqlite3.Connection, now: float) -> None:
+        expired = [r[0] for r in db.execute("SELECT id FROM jobs WHERE finished < ?", (now - self.ttl,))]
+        for job_id in expired:
+            db.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+            db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def get(self, job_id: str, after: int = 0, limit: int = PAGE_SIZE) -> Optional[dict]:
+        """
+        Status, tellers en de resultaten die na cursor `after` klaar zijn (in volgorde van afronden,
+        met "index" in de invoerlijst). Bij een afgeronde taak ook "totals". None als de taak onbekend is.
+        """
+        with self._lock:
+            job = self._db.execute("SELECT count, created, finished, totals FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None:
+                return None
+            counts = dict(self._db.execute(
+                "SELECT status, count(*) FROM job_items WHERE job_id = ? GROUP BY status", (job_id,)
+            ).fetchall())
+            rows = self._db.execute(
+                "SELECT seq, idx, result FROM job_items WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+                (job_id, after, limit),
+            ).fetchall()
+        count, created, finished, totals = job
+        if finished is not None:
+            status = "done"
+        elif counts.get("queued", 0) == count:
+            status = "queued"
+        else:
+            status = "running"
+        out = {
+            "id": job_id,
+            "status": status,
+            "count": count,
+            "progress": {
+                "queued": counts.get("queued", 0),
+                "running": counts.get("running", 0),
+                "ok": counts.get("done", 0),
+                "failed": counts.get("failed", 0),
+            },
+            "created": created,
+            "finished": finished,
+            "results": [{"index": idx, **json.loads(result)} for _, idx, result in rows],
+            "cursor": rows[-1][0] if rows else after,
+        }
+        if totals is not None:
+            out["totals"] = json.loads(totals)
+        return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, count(*) FROM job_items GROUP BY status").fetchall())
+            jobs = self._db.execute("SELECT count(*), count(finished) FROM jobs").fetchone()
+        return {
+            "jobs": jobs[0],
+            "jobs_open": jobs[0] - jobs[1],
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+        }
+
+
+class JobRunner:
+    """
+    Verwerkt URL's uit de JobStore op een eigen event loop in een achtergrondthread: ophalen async,
+    parsen in threads (als de batch-API). Pakt nieuwe URL's zodra er een plek vrijkomt.
+    """
+
+    def __init__(self, store: JobStore, concurrency: int = JOBS_CONCURRENCY, url_timeout: float = BATCH_URL_TIMEOUT,
+                 poll_interval: float = JOBS_POLL_INTERVAL):
+        self.store = store
+        self.concurrency = max(1, concurrency)
+        self.url_timeout = url_timeout
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self.run, name="lqm-jobs", daemon=True)
+        self._thread.start()
+
+    def run(self) -> None:
+        """Blokkerend tot stop(); voor een eigen workerproces (python -m lqm jobs)."""
+        asyncio.run(self._loop())
+
+    def wake(self) -> None:
+        """Nieuwe taak in dit proces: niet wachten tot het volgende poll-interval."""
+        self._wake.set()
+
+    def stop(self, timeout: float = 10) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    async def _loop(self) -> None:
+        from async_fetch import close_async_client
+        tasks: set[asyncio.Task] = set()
+        try:
+            while not self._stop.is_set():
+                free = self.concurrency - len(tasks)
+                claimed = []
+                if free > 0:
+                    try:
+                        claimed = await asyncio.to_thread(self.store.claim, self.worker_id, free)
+                    except sqlite3.Error:
+                        logger.exception("URL's ophalen uit de takenrij mislukt")
+                    for item in claimed:
+                        tasks.add(asyncio.create_task(self._run(*item)))
+                if len(claimed) < free or free <= 0:
+                    # Rij leeg of alle plekken bezet: wachten op een afgeronde URL, een nieuwe taak of het interval
+                    if tasks:
+                        await asyncio.wait(tasks, timeout=self.poll_interval, return_when=asyncio.FIRST_COMPLETED)
+                    else:
+                        await asyncio.to_thread(self._wake.wait, self.poll_interval)
+                    self._wake.clear()
+                tasks = {t for t in tasks if not t.done()}
+        except RuntimeError:
+            # Interpreter sluit af (to_thread kan niet meer); lopende URL's gaan hieronder terug in de rij
+            pass
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await close_async_client()
+            self.store.release(self.worker_id)
+
+    async def _run(self, job_id: str, idx: int, url: str) -> None:
+        result = await analyze_one(url, self.url_timeout)
+        metrics.ANALYZE_REQUESTS.inc(endpoint="jobs", outcome="ok" if result.get("ok") else "failed")
+        try:
+            stored = await asyncio.to_thread(self.store.complete, job_id, idx, self.worker_id, result)
+        except sqlite3.Error:
+            logger.exception("Uitkomst opslaan mislukt (taak %s, URL %d)", job_id, idx)
+            return
+        if not stored:
+            logger.warning("URL %d van taak %s was al vrijgegeven; uitkomst niet opgeslagen", idx, job_id)
+
+
+_store: JobStore | None = None
+_runner: JobRunner | None = None
+_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+    """De procesbrede JobStore (lui aangemaakt, thread-safe)."""
+    global _store
+    if _store is None:
+        with _lock:
+            if _store is None:
+                _store = JobStore()
+    return _store
+
+
+def start_job_runner() -> JobRunner:
+    """Start (eenmalig per proces) de achtergrondthread die URL's uit de takenrij verwerkt."""
+    global _store, _runner
+    runner = _runner
+    if runner is not None:
+        return runner
+    with _lock:
+        if _runner is None:
+            if _store is None:
+                _store = JobStore()
+            _runner = JobRunner(_store)
+            _runner.start()
+            atexit.register(_runner.stop)
+        return _runner
+
+
+def stop_job_runner() -> None:
+    global _runner
+    with _lock:
+        runner, _runner = _runner, None
+    if runner is not None:
+        runner.stop()
+
+
+def wake_job_runner() -> None:
+    if _runner is not None:
+        _runner.wake()
+
+
+def _after_fork() -> None:
+    # De SQLite-verbinding en de thread gaan niet mee naar een kindproces; dat maakt zo nodig eigen aan
+    global _store, _runner, _lock
+    _store, _runner, _lock = None, None, threading.Lock()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _worker_process(concurrency: int) -> None:
+    runner = JobRunner(JobStore(), concurrency=concurrency)
+    try:
+        runner.run()
+    except KeyboardInterrupt:
+        pass
+
+
+def run_workers(processes: int, concurrency: int = JOBS_CONCURRENCY) -> None:
+    """Eigen workerprocessen naast (of zonder) de webserver; blokkeert tot Ctrl-C."""
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        _worker_process(concurrency)
+        return
+    procs = [multiprocessing.Process(target=_worker_process, args=(concurrency,), name=f"lqm-jobs-{i}")
+             for i in range(processes)]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.join()
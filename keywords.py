@@ -0,0 +1,99 @@
+# Zoekwoorden in alt-teksten, bestandsnamen en paginatekst
+# Alle woordenlijsten van een matcher worden één keer gecompileerd tot één regex; één scan over
+# de tekst geeft dan alle treffers met hun lijst (tag). Per lijst kies je hoe een woord moet passen:
+# overal in de tekst (samenstellingen als "boshuisje"), alleen als heel woord ("eco", niet in
+# "decoratie") of alleen aan het begin van een woord ("duurzaam" in "duurzaamheid").
+
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator, NamedTuple
+
+_MODES = ("substring", "word", "prefix")
+
+
+@dataclass(frozen=True)
+class KeywordSet:
+    tag: str
+    words: tuple[str, ...]
+    match: str = "substring"  # "substring" | "word" | "prefix"
+
+
+class KeywordHit(NamedTuple):
+    tag: str
+    keyword: str
+    start: int
+
+
+class KeywordMatcher:
+    """Alle woorden van een aantal KeywordSets in één regex; hoofdletterongevoelig."""
+
+    def __init__(self, *sets: KeywordSet):
+        self._entries: dict[str, list[tuple[str, str]]] = {}  # woord -> [(tag, match), ...]
+        for s in sets:
+            if s.match not in _MODES:
+                raise ValueError(f"Onbekende match {s.match!r} (kies uit {', '.join(_MODES)})")
+            for word in s.words:
+                self._entries.setdefault(word.lower(), []).append((s.tag, s.match))
+        self.tags_all = frozenset(s.tag for s in sets)
+        # Alleen letterlijke alternatieven (zonder groepen of lookarounds), zodat de regex-engine snel
+        # kan zoeken; woordgrenzen controleren we per treffer. Langste eerst: "vakantiehuis" vóór "huis".
+        words = sorted(self._entries, key=len, reverse=True)
+        self._pattern = re.compile("|".join(map(re.escape, words)) or "(?!)")
+        # Kortere woorden die in een woord zitten en op dezelfde positie beginnen vindt de regex niet apart
+        self._prefixes = {w: [o for o in words if len(o) < len(w) and w.startswith(o)] for w in words}
+
+    def hits(self, text: str) -> Iterator[KeywordHit]:
+        """Alle treffers (ook overlappende) in volgorde van voorkomen; één per tag per treffer. start is de positie in text.lower()."""
+        text = (text or "").lower()
+        pos = 0
+        while True:
+            m = self._pattern.search(text, pos)
+            if m is None:
+                return
+            start = m.start()
+            for word in (m.group(), *self._prefixes[m.group()]):
+                end = start + len(word)
+                for tag, mode in self._entries[word]:
+                    if mode != "substring" and start and _is_word_char(text[start - 1]):
+                        continue
+                    if mode == "word" and end < len(text) and _is_word_char(text[end]):
+                        continue
+                    yield KeywordHit(tag, word, start)
+            pos = start + 1
+
+    def tags(self, text: str, wanted: Iterable[str] | None = None) -> set[str]:
+        """
+        Tags met minstens één treffer. Met wanted stopt de scan zodra die tags gevonden zijn; de uitkomst
+        kan dan ook andere tags bevatten die al eerder in de tekst stonden.
+        """
+        wanted = self.tags_all if wanted is None else frozenset(wanted)
+        found: set[str] = set()
+        for hit in self.hits(text):
+            found.add(hit.tag)
+            if found >= wanted:
+                break
+        return found
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+# Eerste (cover)foto: alt-tekst + bestandsnaam. Substring, want in bestandsnamen en Nederlandse
+# samenstellingen staan de woorden vaak aan elkaar ("boshuisje", "woonkamer_2.jpg").
+PHOTO_MATCHER = KeywordMatcher(
+    KeywordSet("nature", ("natuur", "nature", "bos", "forest", "weide", "veld", "landschap", "landscape", "buiten", "outdoor")),
+    KeywordSet("house", ("huis", "house", "vakantiehuis", "cottage", "chalet", "bungalow", "villa", "accommodatie")),
+    KeywordSet("interior", ("interieur", "interior", "woonkamer", "living", "slaapkamer", "bedroom", "keuken", "kitchen",
+                            "badkamer", "bathroom", "binnen", "indoor")),
+    KeywordSet("exterior", ("huis", "house", "buiten", "exterior", "facade", "vakantiehuis", "chalet", "bungalow", "villa",
+                            "accommodatie", "natuur", "nature")),
+)
+
+# Duurzaamheid in de paginatekst (fallback als er geen impact-score op de pagina staat). "eco" alleen
+# als los woord (of "eco-..."); de echte eco-woorden staan apart als begin van een woord.
+SUSTAINABILITY_MATCHER = KeywordMatcher(
+    KeywordSet("sustainability", ("duurzaam", "sustainability", "ecologisch", "ecological"), match="prefix"),
+    KeywordSet("sustainability", ("eco",), match="word"),
+)
@@ -0,0 +1,181 @@
+# Command line: python -m lqm <commando> ...
+#   batch IN.jsonl OUT.jsonl   URL's of records uit een JSONL-bestand analyseren (bulk.py)
+#   jobs                       workerprocessen voor de takenrij van /api/jobs (jobs.py)
+#   queue push|status|export   gedeelde werkrij voor meerdere machines vullen en uitlezen (work_queue.py)
+#   worker                     batches uit die werkrij analyseren (één of meer per machine)
+#   crawl URL... OUT.jsonl     advertenties van een site vinden (sitemaps, overzichtspagina's) en analyseren
+
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import sys
+
+from config import (
+    BATCH_CONCURRENCY, BATCH_URL_TIMEOUT, BULK_CHECKPOINT_EVERY, BULK_WINDOW, BULK_WORKERS, JOBS_CONCURRENCY,
+    WORK_BATCH_SIZE, WORK_CONCURRENCY, WORK_LEASE_SECONDS, WORK_QUEUE, CRAWL_BURST, CRAWL_HOST_CONCURRENCY,
+    CRAWL_MAX_DEPTH, CRAWL_MAX_FRONTIER, CRAWL_RATE,
+)
+
+
+def _progress(stats: dict) -> None:
+    print(f"ok={stats['ok']} failed={stats['failed']} skipped={stats['skipped']} "
+          f"t={stats['elapsed_seconds']:.0f}s", file=sys.stderr, flush=True)
+
+
+def _cmd_batch(args: argparse.Namespace) -> int:
+    from bulk import CheckpointError, run_bulk
+    try:
+        stats = asyncio.run(run_bulk(
+            args.input, args.output,
+            window=args.window, concurrency=args.concurrency, workers=args.workers,
+            url_timeout=args.timeout, checkpoint_path=args.checkpoint, checkpoint_every=args.checkpoint_every,
+            photos=args.photos, fresh=args.fresh, progress=None if args.quiet else _progress,
+        ))
+    except KeyboardInterrupt:
+        print("Onderbroken; hetzelfde commando gaat verder vanaf het checkpoint.", file=sys.stderr)
+        return 130
+    except CheckpointError as e:
+        print(f"{e}; gebruik --fresh om opnieuw te beginnen.", file=sys.stderr)
+        return 2
+    print(json.dumps(stats), file=sys.stderr)
+    return 0
+
+
+def _cmd_jobs(args: argparse.Namespace) -> int:
+    from jobs import run_workers
+    try:
+        run_workers(args.processes, concurrency=args.concurrency)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _read_items(path: str):
+    """URL-items uit een invoerbestand in het formaat van `batch`; records en ongeldige regels worden overgeslagen."""
+    from bulk import parse_line
+    with open(path, "r", encoding="utf-8") as f:
+        for n, text in enumerate(f, 1):
+            try:
+                item = parse_line(text)
+            except ValueError as e:
+                print(f"Regel {n} overgeslagen: {e}", file=sys.stderr)
+                continue
+            if item is None:
+                continue
+            if "url" not in item:
+                print(f"Regel {n} overgeslagen: de werkrij neemt alleen URL's.", file=sys.stderr)
+                continue
+            yield {k: item[k] for k in ("url", "id") if k in item}
+
+
+def _cmd_queue(args: argparse.Namespace) -> int:
+    from work_queue import open_queue
+    queue = open_queue(args.queue)
+    if args.action == "push":
+        batches = queue.push(_read_items(args.path), args.batch_size)
+        print(json.dumps({"batches": batches, **queue.stats()}))
+    elif args.action == "status":
+        print(json.dumps(queue.stats()))
+    else:
+        count = 0
+        with open(args.path, "w", encoding="utf-8") as f:
+            for result in queue.results():
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+                count += 1
+        print(json.dumps({"exported": count}), file=sys.stderr)
+    return 0
+
+
+def _cmd_worker(args: argparse.Namespace) -> int:
+    from work_queue import open_queue, run_worker
+    try:
+        counts = run_worker(open_queue(args.queue), concurrency=args.concurrency, lease_seconds=args.lease,
+                            exit_when_empty=args.exit_when_empty)
+    except KeyboardInterrupt:
+        # run_worker heeft de lopende batch al teruggegeven
+        return 130
+    print(json.dumps(counts), file=sys.stderr)
+    return 0
+
+
+def _cmd_crawl(args: argparse.Namespace) -> int:
+    from crawler import Crawler
+    with open(args.output, "w", encoding="utf-8") as out:
+        def write(result: dict) -> None:
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+        crawler = Crawler(
+            args.urls, write, include=args.include, follow=args.follow, sitemaps=args.sitemap,
+            max_pages=args.max_pages, max_depth=args.max_depth, host_concurrency=args.host_concurrency,
+            rate=args.rate, burst=args.burst, max_frontier=args.max_frontier, discover_only=args.discover_only,
+        )
+        try:
+            stats = asyncio.run(crawler.run())
+        except KeyboardInterrupt:
+            print("Onderbroken.", file=sys.stderr)
+            return 130
+    print(json.dumps(stats), file=sys.stderr)
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m lqm", description="LQM Advertentie Beoordelaar")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="URL's of records uit een JSONL-bestand analyseren, één rapport per regel")
+    batch.add_argument("input", help='JSONL: per regel een URL, {"url": ...} of {"record": {...}}')
+    batch.add_argument("output", help="JSONL met één rapport per regel (in volgorde van afronden)")
+    batch.add_argument("--window", type=int, default=BULK_WINDOW, help="max. regels tegelijk in behandeling")
+    batch.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="max. pagina's tegelijk ophalen")
+    batch.add_argument("--workers", type=int, default=BULK_WORKERS, help="processen voor parsen/scoren (0 = aantal CPU's)")
+    batch.add_argument("--timeout", type=float, default=BATCH_URL_TIMEOUT, help="seconden per URL")
+    batch.add_argument("--checkpoint", help="checkpointbestand (standaard OUTPUT.checkpoint)")
+    batch.add_argument("--checkpoint-every", type=int, default=BULK_CHECKPOINT_EVERY, help="checkpoint na zoveel regels")
+    batch.add_argument("--photos", action="store_true", help="ook de AI-foto-analyse van de coverfoto")
+    batch.add_argument("--fresh", action="store_true", help="checkpoint negeren en opnieuw beginnen")
+    batch.add_argument("--quiet", action="store_true", help="geen voortgang op stderr")
+    batch.set_defaults(func=_cmd_batch)
+
+    jobs = commands.add_parser("jobs", help="URL's uit de takenrij van /api/jobs verwerken tot Ctrl-C")
+    jobs.add_argument("--processes", type=int, default=0, help="workerprocessen (0 = aantal CPU's)")
+    jobs.add_argument("--concurrency", type=int, default=JOBS_CONCURRENCY, help="URL's tegelijk per proces")
+    jobs.set_defaults(func=_cmd_jobs)
+
+    queue = commands.add_parser("queue", help="gedeelde werkrij vullen (push), bekijken (status) of resultaten wegschrijven (export)")
+    queue.add_argument("action", choices=["push", "status", "export"])
+    queue.add_argument("path", nargs="?", help="push: invoer (als bij batch); export: JSONL-uitvoer")
+    queue.add_argument("--queue", default=WORK_QUEUE, help="SQLite-pad of redis://host:6379/0 (LQM_WORK_QUEUE)")
+    queue.add_argument("--batch-size", type=int, default=WORK_BATCH_SIZE, help="URL's per batch")
+    queue.set_defaults(func=_cmd_queue)
+
+    worker = commands.add_parser("worker", help="batches uit de gedeelde werkrij analyseren tot Ctrl-C")
+    worker.add_argument("--queue", default=WORK_QUEUE, help="SQLite-pad of redis://host:6379/0 (LQM_WORK_QUEUE)")
+    worker.add_argument("--concurrency", type=int, default=WORK_CONCURRENCY, help="URL's tegelijk")
+    worker.add_argument("--lease", type=float, default=WORK_LEASE_SECONDS, help="leaseduur in seconden")
+    worker.add_argument("--exit-when-empty", action="store_true", help="stoppen zodra de rij leeg en niets meer in behandeling is")
+    worker.set_defaults(func=_cmd_worker)
+
+    crawl = commands.add_parser("crawl", help="advertenties van een site vinden via sitemaps en overzichtspagina's en analyseren")
+    crawl.add_argument("urls", nargs="+", help="host(s) of overzichtspagina's om te beginnen")
+    crawl.add_argument("output", help="JSONL met één rapport per advertentie (of per URL met --discover-only)")
+    crawl.add_argument("--include", help="regex voor advertentie-URL's (bijv. '/vakantiehuis/'); zonder: alle URL's uit de sitemaps")
+    crawl.add_argument("--follow", help="regex voor links naar verdere overzichtspagina's (bijv. 'pagina=')")
+    crawl.add_argument("--sitemap", action="append", help="extra sitemap-URL (naast die uit robots.txt)")
+    crawl.add_argument("--max-pages", type=int, default=0, help="stoppen na zoveel advertenties (0 = geen limiet)")
+    crawl.add_argument("--max-depth", type=int, default=CRAWL_MAX_DEPTH, help="max. overzichtspagina's diep")
+    crawl.add_argument("--host-concurrency", type=int, default=CRAWL_HOST_CONCURRENCY, help="verzoeken tegelijk per host")
+    crawl.add_argument("--rate", type=float, default=CRAWL_RATE, help="verzoeken per seconde per host (0 = onbeperkt)")
+    crawl.add_argument("--burst", type=int, default=CRAWL_BURST, help="max. verzoeken direct achter elkaar per host")
+    crawl.add_argument("--max-frontier", type=int, default=CRAWL_MAX_FRONTIER, help="max. URL's in de rij")
+    crawl.add_argument("--discover-only", action="store_true", help="alleen URL's vinden, niet analyseren (invoer voor batch of queue push)")
+    crawl.set_defaults(func=_cmd_crawl)
+
+    args = parser.parse_args(argv)
+    if args.command == "queue" and args.action in ("push", "export") and not args.path:
+        parser.error(f"queue {args.action} verwacht een bestand")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,594 @@
+# LQM-regels als tabel: per attribuut de gevallen (voorwaarde, punten, teksten) in volgorde
+# Bij import worden de voorwaarden per categorie tot één Python-functie gecompileerd die alleen
+# (geval, punten) per attribuut teruggeeft. Teksten (reden, aanbeveling) worden pas gemaakt als
+# een rapport wordt opgebouwd (render_rule), niet bij het scoren zelf.
+#
+# Voorwaarden en puntformules zijn Python-expressies over `d` (ExtractedData), de helpers hieronder,
+# de drempels (MIN_PHOTOS, ...) en de `let`-namen van de regel of categorie. Namen uit `weights`
+# worden bij het compileren als constante ingevuld; LQM_WEIGHTS_FILE kan ze overschrijven.
+# Teksten zijn str.format-sjablonen met dezelfde namen, de `values` van de regel (alleen voor de
+# tekst) en w[naam] voor de gewichten.
+
+from __future__ import annotations
+import hashlib
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, Optional, Union
+
+try:
+    from config import POSTCODE_PATTERNS, POSTCODE_MIN_LEN, POSTCODE_MAX_LEN, WEIGHTS_FILE
+except ImportError:
+    POSTCODE_PATTERNS = {}
+    POSTCODE_MIN_LEN = 4
+    POSTCODE_MAX_LEN = 10
+    WEIGHTS_FILE = ""
+
+# Drempels (ook beschikbaar in voorwaarden en teksten)
+MIN_GEN_LEN = 275   # algemene beschrijving minimaal lang genoeg
+MIN_NAT_LEN = 200   # natuur beschrijving minimaal lang genoeg
+MIN_PHOTOS = 11
+MAX_PHOTOS = 50
+MIN_PHOTO_WIDTH = 600
+MIN_PHOTO_HEIGHT = 400
+
+# Categorieën die alleen advies geven en niet meetellen in het totaal
+ADVISORY_CATEGORIES = ("Description", "Photos", "Gastenbeoordelingen")
+
+
+# ---------- Helpers voor voorwaarden ----------
+
+def _len(s: Optional[str]) -> int:
+    return len(s.strip()) if s and s.strip() else 0
+
+
+def _validate_postcode(postcode: Optional[str], country: Optional[str]) -> bool:
+    if not postcode or not postcode.strip():
+        return False
+    pc = postcode.strip().replace(" ", "")
+    country = (country or "").upper()[:2]
+    if country in POSTCODE_PATTERNS:
+        return bool(POSTCODE_PATTERNS[country].match(pc))
+    return POSTCODE_MIN_LEN <= len(pc) <= POSTCODE_MAX_LEN
+
+
+# Reeks van 8+ letters die helemaal uit hoofdletters bestaat (niet: het staartje van "abcDEFGHIJKL")
+_CAPS_WORD = re.compile(r"(?<![A-Za-z])[A-Z]{8,}(?![A-Za-z])")
+
+
+def _caps_count(text: str) -> int:
+    """Aantal lange woorden (8+ letters) in HOOFDLETTERS."""
+    return len(_CAPS_WORD.findall(text))
+
+
+def _type_count(types: Optional[str]) -> int:
+    return len([x for x in (types or "").split(",") if x.strip()])
+
+
+def _has_midnight(times: Optional[list]) -> bool:
+    return any(t == "00:00:00" or t == "00:00" for t in times or [])
+
+
+def _hour(t: Optional[str]) -> Optional[int]:
+    """Uur uit "HH:MM" of "HH:MM:SS"; None als leeg of niet te parsen."""
+    if not t:
+        return None
+    try:
+        return int(t.split(":")[0])
+    except ValueError:
+        return None
+
+
+# ---------- Tabel ----------
+
+@dataclass
+class Case:
+    """Eén uitkomst van een regel. when=None: alle overige gevallen (altijd de laatste)."""
+    when: Optional[str]
+    points: Union[int, str]
+    reason: str
+    recommendation: Optional[str] = None
+    passed: Optional[bool] = None
+    not_applicable: bool = False
+    pending: Union[bool, str] = False  # of de naam van een let (bijv. "ai_pending")
+    # Gezet door compile_rules: teksten bevatten {namen} of pending is een naam
+    templated: bool = field(default=False, repr=False, compare=False)
+
+
+@dataclass
+class Rule:
+    attribute: str
+    category: str
+    type_: str  # "bonus" | "malus" | "advisory"
+    cases: list[Case]
+    weights: dict[str, int] = field(default_factory=dict)
+    let: dict[str, str] = field(default_factory=dict)      # voor voorwaarden en teksten
+    values: dict[str, str] = field(default_factory=dict)   # alleen voor teksten
+    # Gecompileerd (compile_rules): d -> namen voor de teksten; None als de regel alleen vaste teksten heeft
+    scope: Optional[Callable] = field(default=None, repr=False, compare=False)
+
+
+# Namen die per categorie één keer berekend worden
+CATEGORY_LET: dict[str, dict[str, str]] = {
+    "Availability": {
+        "opengds": "(d.channel_manager_type or '').upper() == 'OPENGDS'",
+        "smoobu": "(d.channel_manager_type or '').upper() == 'SMOOBU'",
+    },
+    "Photos": {
+        "ai_pending": "bool(d.first_photo_ai_pending)",
+    },
+}
+
+_NA = "Niet zichtbaar."
+_AI_PENDING = "AI-analyse van de eerste foto loopt nog…"
+
+RULES: list[Rule] = [
+    # ---------- Description (advisory) ----------
+    Rule("algemene_beschrijving", "Description", "advisory", let={"len_gen": "_len(d.general_description)"}, cases=[
+        Case("d.general_description is None or not d.general_description.strip()", 0,
+             "Algemene beschrijving ontbreekt.", passed=False,
+             recommendation="Voeg een algemene beschrijving toe van minimaal 275 tekens (bij voorkeur meer dan 550). Beschrijf het huisje, de omgeving en wat gasten kunnen verwachten."),
+        Case("len_gen < MIN_GEN_LEN", 0,
+             "Algemene beschrijving is {len_gen} tekens (minimaal {MIN_GEN_LEN}).", passed=False,
+             recommendation="Maak de algemene beschrijving langer: minimaal {MIN_GEN_LEN} tekens (bij voorkeur meer dan 550). Nu: {len_gen} tekens."),
+        Case(None, 0, "Algemene beschrijving is lang genoeg ({len_gen} tekens).", passed=True),
+    ]),
+    Rule("natuur_beschrijving", "Description", "advisory", let={"len_nat": "_len(d.nature_description)"}, cases=[
+        Case("d.nature_description is None or not d.nature_description.strip()", 0,
+             "Natuur beschrijving ontbreekt.", passed=False,
+             recommendation="Voeg een aparte natuur beschrijving toe van minimaal 200 tekens (bij voorkeur meer dan 550). Beschrijf de natuur, het landschap en de omgeving rond het huisje."),
+        Case("len_nat < MIN_NAT_LEN", 0,
+             "Natuur beschrijving is {len_nat} tekens (minimaal {MIN_NAT_LEN}).", passed=False,
+             recommendation="Maak de natuur beschrijving langer: minimaal {MIN_NAT_LEN} tekens (bij voorkeur meer dan 550). Nu: {len_nat} tekens."),
+        Case(None, 0, "Natuur beschrijving is lang genoeg ({len_nat} tekens).", passed=True),
+    ]),
+    Rule("beschrijvingen_verschillend", "Description", "advisory", cases=[
+        Case("d.general_description is not None and d.nature_description is not None"
+             " and _len(d.general_description) > 75 and d.general_description.strip() == d.nature_description.strip()", 0,
+             "Algemene en natuur beschrijving zijn identiek.", passed=False,
+             recommendation="Schrijf een aparte tekst voor de natuur beschrijving in plaats van dezelfde tekst te kopiëren. De natuur beschrijving moet gaan over het landschap, de omgeving en de natuur; de algemene beschrijving over het huisje en de voorzieningen."),
+        Case(None, 0, "Algemene en natuur beschrijving zijn verschillend.", passed=True),
+    ]),
+    Rule("geen_capslock", "Description", "advisory",
+         let={"combined": "(d.general_description or '') + ' ' + (d.nature_description or '')",
+              "caps_count": "_caps_count(combined)"}, cases=[
+        Case("not combined", 0, "Geen tekst om te controleren.", not_applicable=True),
+        Case("caps_count >= 2", 0, "Er staan {caps_count} lange woorden in HOOFDLETTERS.", passed=False,
+             recommendation="Vermijd lange woorden in HOOFDLETTERS (capslock); dat oogt onrustig en onprofessioneel. Gebruik normale hoofdletters (alleen eerste letter van een zin of eigennaam)."),
+        Case(None, 0, "Geen overmatig gebruik van hoofdletters.", passed=True),
+    ]),
+
+    # ---------- Impact ----------
+    Rule("bonus_impact_score_leaves", "Impact", "bonus", weights={"no_leaves": 1, "leaves": 3}, cases=[
+        Case("d.sustainability_impact_level_leaves is None", 0, "Impact score niet beschikbaar.", not_applicable=True),
+        Case("d.sustainability_impact_level_leaves == 0", "no_leaves",
+             "Sustainability leaves: {d.sustainability_impact_level_leaves} (bonus {w[no_leaves]} bij 0, {w[leaves]} bij ≥1)."),
+        Case(None, "leaves",
+             "Sustainability leaves: {d.sustainability_impact_level_leaves} (bonus {w[no_leaves]} bij 0, {w[leaves]} bij ≥1)."),
+    ]),
+    Rule("malus_impact_score_leaves", "Impact", "malus", weights={"points": -5}, cases=[
+        Case("d.sustainability_impact_level_leaves is None", "points", "Impact/duurzaamheidsscore ontbreekt."),
+        Case(None, 0, "Impact score aanwezig."),
+    ]),
+
+    # ---------- Location ----------
+    Rule("malus_not_a_valid_postcode", "Location", "malus", weights={"points": -2}, cases=[
+        Case("d.postcode is None and not (d.place and any(c.isdigit() for c in d.place))", 0,
+             "Postcode niet beschikbaar vanaf URL.", not_applicable=True),
+        Case("d.postcode and not _validate_postcode(d.postcode, d.country)", "points", "Ongeldige of ontbrekende postcode."),
+        Case(None, 0, "Postcode OK of niet gecontroleerd."),
+    ]),
+    Rule("malus_place_chars", "Location", "malus", weights={"points": -2}, let={"place": "d.place or ''"}, cases=[
+        Case("'(' in place or '*' in place or ',' in place", "points", "Plaatsnaam bevat marketing/onduidelijke tekens."),
+        Case(None, 0, "Plaatsnaam OK."),
+    ]),
+
+    # ---------- Availability ----------
+    Rule("bonus_allow_instant_booking", "Availability", "bonus", weights={"points": 15}, cases=[
+        Case("d.allow_instant_booking is None", 0, "Niet zichtbaar op pagina.", not_applicable=True),
+        Case("d.allow_instant_booking == 1", "points", "Direct boeken mogelijk."),
+        Case(None, 0, "Geen direct boeken."),
+    ]),
+    Rule("bonus_has_channel_manager", "Availability", "bonus", weights={"points": 10}, cases=[
+        Case("d.channel_manager_type", "points", "Channel manager aanwezig."),
+        Case(None, 0, "Geen channel manager."),
+    ]),
+    Rule("bonus_has_opengds", "Availability", "bonus", weights={"points": 10}, cases=[
+        Case("opengds", "points", "OpenGDS integratie."),
+        Case(None, 0, "Geen OpenGDS."),
+    ]),
+    # vereenvoudigd: geen errors = bonus per feed, gewicht hangt af van het aantal feeds
+    Rule("bonus_icals_working", "Availability", "bonus", weights={"one_feed": 4, "two_feeds": 3, "per_feed": 2, "cap": 8}, cases=[
+        Case("d.nr_icals_error is None or d.nr_icals_total is None", 0, "Niet zichtbaar op pagina.", not_applicable=True),
+        Case("d.nr_icals_error == 0 and d.nr_icals_total > 0",
+             "min(cap, d.nr_icals_total * (one_feed if d.nr_icals_total == 1 else two_feeds if d.nr_icals_total == 2 else per_feed))",
+             "iCals werken ({d.nr_icals_total} feeds)."),
+        Case(None, 0, "Geen werkende iCals of errors."),
+    ]),
+    # niet OPENGDS: weekend/midweek/long weekend
+    Rule("bonus_short_stay", "Availability", "bonus", weights={"points": 12}, cases=[
+        Case("d.has_short_stay_types is None or opengds", 0, "Niet zichtbaar op pagina.", not_applicable=True),
+        Case("d.has_short_stay_types", "points", "Korte verblijven mogelijk."),
+        Case(None, 0, "Geen korte verblijven."),
+    ]),
+    Rule("bonus_priceplan_updated6months_or_recent", "Availability", "bonus", weights={"points": 3}, cases=[
+        Case("d.years_platform is None or d.months_updated_priceplan is None", 0, _NA, not_applicable=True),
+        Case("d.years_platform > 0 and d.months_updated_priceplan <= 6", "points", "Prijsplan recent bijgewerkt."),
+        # Negatieve years_platform: geen bonus, maar de tekst volgt alleen de datum
+        Case("d.years_platform and d.months_updated_priceplan <= 6", 0, "Prijsplan recent bijgewerkt."),
+        Case(None, 0, "Niet recent."),
+    ]),
+    Rule("bonus_recent_agenda_block_updated", "Availability", "bonus", weights={"points": 3}, cases=[
+        Case("d.months_last_update_blocks is None", 0, _NA, not_applicable=True),
+        Case("d.months_last_update_blocks <= 6", "points", "Agenda recent bijgewerkt."),
+        Case(None, 0, "Niet recent."),
+    ]),
+    Rule("malus_available_only_weeks", "Availability", "malus", weights={"points": -5}, cases=[
+        Case("d.only_weeks_possible is None or opengds", 0, "Niet van toepassing.", not_applicable=True),
+        Case("d.only_weeks_possible", "points", "Alleen weken boekbaar."),
+        Case(None, 0, "Meerdere verblijftypes."),
+    ]),
+    Rule("malus_available_only_otherstays", "Availability", "malus", weights={"points": -10}, cases=[
+        Case("d.only_other_stays_possible is None or opengds", 0, "Niet van toepassing.", not_applicable=True),
+        Case("d.only_other_stays_possible", "points", "Alleen 'overige' verblijven."),
+        Case(None, 0, "Standaard verblijven mogelijk."),
+    ]),
+    # per iCal-fout, tenzij OPENGDS/Smoobu
+    Rule("malus_icals_not_working", "Availability", "malus", weights={"per_error": -10}, cases=[
+        Case("d.nr_icals_error is None or opengds or smoobu", 0, "Niet van toepassing of OpenGDS/Smoobu.", not_applicable=True),
+        Case(None, "min(0, d.nr_icals_error * per_error)", "Aantal iCal-fouten: {d.nr_icals_error}."),
+    ]),
+    Rule("malus_fully_blocked", "Availability", "malus", weights={"points": -30}, cases=[
+        Case("d.fully_blocked is None or opengds", 0, _NA, not_applicable=True),
+        Case("d.fully_blocked == 1", "points", "Volledig geblokkeerd."),
+        Case(None, 0, "Niet volledig geblokkeerd."),
+    ]),
+    Rule("malus_fully_nonbookable", "Availability", "malus", weights={"points": -30}, cases=[
+        Case("d.fully_nonbookable is None or opengds", 0, _NA, not_applicable=True),
+        Case("d.fully_nonbookable == 1", "points", "Volledig niet boekbaar."),
+        Case(None, 0, "Boekbaar."),
+    ]),
+    Rule("malus_fully_available", "Availability", "malus", weights={"points": -5}, cases=[
+        Case("d.fully_available is None or opengds", 0, _NA, not_applicable=True),
+        Case("d.fully_available == 1", "points", "Volledig beschikbaar (geen agenda?)."),
+        Case(None, 0, "Agenda geconfigureerd."),
+    ]),
+    Rule("malus_months_updated", "Availability", "malus", weights={"points": -3}, cases=[
+        Case("d.months_updated is None", 0, _NA, not_applicable=True),
+        Case("d.months_updated > 12", "points", "Laatste update {d.months_updated} maanden geleden."),
+        Case(None, 0, "Laatste update {d.months_updated} maanden geleden."),
+    ]),
+
+    # ---------- Photos (advisory) ----------
+    Rule("aantal_fotos", "Photos", "advisory", cases=[
+        Case("d.photo_count is None", 0, "Aantal foto's niet bepaald.", not_applicable=True,
+             recommendation="Zorg voor minimaal 11 en maximaal 50 foto's van de accommodatie."),
+        Case("MIN_PHOTOS <= d.photo_count <= MAX_PHOTOS", 0,
+             "Aantal foto's is goed: {d.photo_count} (tussen {MIN_PHOTOS} en {MAX_PHOTOS}).", passed=True),
+        Case("d.photo_count < MIN_PHOTOS", 0, "Te weinig foto's: {d.photo_count} (minimaal {MIN_PHOTOS}).", passed=False,
+             recommendation="Voeg meer foto's toe. Een goede advertentie heeft minimaal {MIN_PHOTOS} en maximaal {MAX_PHOTOS} foto's. Nu: {d.photo_count}."),
+        Case(None, 0, "Te veel foto's: {d.photo_count} (maximaal {MAX_PHOTOS}).", passed=False,
+             recommendation="Gebruik maximaal {MAX_PHOTOS} foto's. Te veel foto's kan overweldigend zijn. Nu: {d.photo_count}. Kies de beste en meest representatieve foto's."),
+    ]),
+    # AI-analyse of alt-tekst; een uitkomst uit de alt-tekst kan nog door de AI-analyse worden overschreven
+    Rule("eerste_foto_huisje", "Photos", "advisory",
+         let={"first_house": "d.first_photo_ai_exterior if d.first_photo_ai_exterior is not None else d.first_photo_house_not_interior"},
+         values={"ai_note": "' (AI-analyse)' if d.first_photo_ai_exterior is not None else ''",
+                 "source_note": "' (AI-analyse)' if d.first_photo_ai_exterior is not None else ' (uit alt-tekst/bestandsnaam).'"},
+         cases=[
+        Case("first_house is True", 0,
+             "De eerste (cover)foto toont een huisje/exterior, geen interieur.{ai_note}",
+             passed=True, pending="ai_pending"),
+        Case("first_house is False", 0,
+             "De eerste foto toont een interieur, geen huisje van buiten.{source_note}",
+             passed=False, pending="ai_pending",
+             recommendation="Zet een foto van het huisje zelf (exterior, bijvoorbeeld de voorgevel of het huisje in de omgeving) als eerste/coverfoto. Geen interieur (woonkamer, keuken, slaapkamer) als eerste foto; dat kan later in de galerij."),
+        Case("ai_pending", 0, _AI_PENDING, not_applicable=True, pending=True),
+        Case(None, 0,
+             "Niet te bepalen of de eerste foto een huisje of interieur is (geen/weinig alt-tekst). Stel OPENAI_API_KEY in voor AI-analyse.",
+             not_applicable=True,
+             recommendation="Zorg dat de eerste foto het huisje van buiten toont (geen interieur als coverfoto). Voeg bij voorkeur een duidelijke alt-tekst toe aan de foto's."),
+    ]),
+    Rule("geen_namen_op_fotos", "Photos", "advisory", cases=[
+        Case("d.first_photo_ai_watermark is not None and d.first_photo_ai_watermark", 0,
+             "Op de eerste foto is tekst, een watermerk of logo zichtbaar (AI-analyse).", passed=False,
+             recommendation="Verwijder watermerken, namen of logo's van de foto's. Foto's moeten professioneel en neutraal ogen."),
+        Case("d.first_photo_ai_watermark is not None", 0,
+             "Geen watermerk of tekst zichtbaar op de eerste foto (AI-analyse).", passed=True),
+        Case("ai_pending", 0, _AI_PENDING, not_applicable=True, pending=True),
+        Case(None, 0, "Niet automatisch te controleren. Stel OPENAI_API_KEY in voor AI-analyse van de foto.", not_applicable=True,
+             recommendation="Controleer handmatig dat er geen namen, watermerken of logo's op de foto's staan. Foto's moeten professioneel en neutraal ogen."),
+    ]),
+    Rule("geen_collage", "Photos", "advisory", cases=[
+        Case("d.first_photo_ai_collage is not None and d.first_photo_ai_collage", 0,
+             "De eerste foto is een collage van meerdere afbeeldingen (AI-analyse).", passed=False,
+             recommendation="Gebruik losse foto's, geen collages. Elke foto moet één duidelijke afbeelding tonen."),
+        Case("d.first_photo_ai_collage is not None", 0, "De eerste foto is geen collage (AI-analyse).", passed=True),
+        Case("ai_pending", 0, _AI_PENDING, not_applicable=True, pending=True),
+        Case(None, 0, "Niet automatisch te controleren. Stel OPENAI_API_KEY in voor AI-analyse van de foto.", not_applicable=True,
+             recommendation="Gebruik losse foto's, geen collages. Elke foto moet één duidelijke afbeelding tonen."),
+    ]),
+    Rule("voldoende_resolutie", "Photos", "advisory", cases=[
+        Case("d.first_photo_width is None or d.first_photo_height is None", 0, "Resolutie niet uit HTML te bepalen.", not_applicable=True,
+             recommendation="Zorg dat alle foto's voldoende resolutie hebben (minimaal {MIN_PHOTO_WIDTH}×{MIN_PHOTO_HEIGHT} pixels aanbevolen). Geen kleine of wazige afbeeldingen."),
+        Case("d.first_photo_width >= MIN_PHOTO_WIDTH and d.first_photo_height >= MIN_PHOTO_HEIGHT", 0,
+             "Resolutie eerste foto is voldoende ({d.first_photo_width}×{d.first_photo_height} px).", passed=True),
+        Case(None, 0,
+             "Resolutie eerste foto is laag: {d.first_photo_width}×{d.first_photo_height} px (aanbevolen min. {MIN_PHOTO_WIDTH}×{MIN_PHOTO_HEIGHT}).",
+             passed=False,
+             recommendation="Upload foto's met voldoende resolutie (minimaal {MIN_PHOTO_WIDTH}×{MIN_PHOTO_HEIGHT} pixels aanbevolen). Kleine of wazige foto's ogen onprofessioneel."),
+    ]),
+
+    # ---------- Gastenbeoordelingen (advisory) ----------
+    Rule("advies_gastenbeoordelingen", "Gastenbeoordelingen", "advisory", cases=[
+        Case(None, 0, "Gastenbeoordelingen helpen nieuwe gasten bij hun keuze. Recente beoordelingen zijn cruciaal.",
+             not_applicable=True,
+             recommendation=(
+                 "Vraag gasten na hun verblijf om een beoordeling te schrijven. "
+                 "Benadruk dat recente beoordelingen cruciaal zijn: ze laten zien dat je accommodatie actief en betrouwbaar is. "
+                 "Nieuwere beoordelingen wegen zwaarder voor potentiële gasten dan oude."
+             )),
+    ]),
+    # Score "boven de 8": op schaal 10 is dat >= 8; op schaal 5 is dat >= 4
+    Rule("compliment_beoordelingen", "Gastenbeoordelingen", "advisory",
+         let={"scale": "d.rating_scale_max or 10",
+              "above_8": "d.average_rating is not None and ((scale == 10 and d.average_rating >= 8) or (scale == 5 and d.average_rating >= 4))"},
+         cases=[
+        Case("d.nr_reviews is not None and d.nr_reviews > 3 and above_8", 0,
+             "Compliment: je hebt {d.nr_reviews} beoordelingen met een gemiddelde score van {d.average_rating:.1f} (boven de 8). Dat versterkt het vertrouwen van nieuwe gasten.",
+             passed=True),
+        Case("d.nr_reviews is not None and d.nr_reviews > 3 and d.average_rating is not None", 0,
+             "Je hebt {d.nr_reviews} beoordelingen (gemiddeld {d.average_rating:.1f}). Nog geen score boven de 8.", passed=False,
+             recommendation="Blijf gasten vragen om een beoordeling. Een gemiddelde score boven de 8 (op 10) geeft potentiële gasten extra vertrouwen."),
+        Case("d.nr_reviews is not None and d.nr_reviews <= 3", 0,
+             "Je hebt {d.nr_reviews} beoordeling(en). Meer recente beoordelingen helpen nieuwe gasten.", passed=False,
+             recommendation="Vraag gasten actief om een beoordeling na hun verblijf. Meer dan 3 beoordelingen met een score boven de 8 versterken je advertentie."),
+        Case(None, 0, "Aantal of gemiddelde beoordeling niet zichtbaar op de pagina.", not_applicable=True,
+             recommendation="Laat gasten beoordelingen schrijven. Meer dan 3 beoordelingen met een score boven de 8 zijn een sterk visitekaartje."),
+    ]),
+
+    # ---------- Filters ----------
+    Rule("malus_dont_allow_babies_but_many_attributes", "Filters", "malus", weights={"points": -3}, cases=[
+        Case("d.max_babies is None or d.baby_facilities_count is None", 0, _NA, not_applicable=True),
+        Case("d.max_babies == 0 and d.baby_facilities_count >= 2", "points", "Geen baby's toegestaan maar wel babyvoorzieningen."),
+        Case(None, 0, "Geen baby's toegestaan maar wel babyvoorzieningen."),
+    ]),
+    Rule("malus_mismatch_allow_pets_and_pets_attributes", "Filters", "malus", weights={"points": -5}, cases=[
+        Case("d.max_animals is None or d.has_pet_related_features is None", 0, _NA, not_applicable=True),
+        Case("d.max_animals == 0 and d.has_pet_related_features", "points", "Geen huisdieren maar wel huisdier-voorzieningen."),
+        Case(None, 0, "Geen huisdieren maar wel huisdier-voorzieningen."),
+    ]),
+    Rule("malus_zero_houseattributes", "Filters", "malus", weights={"points": -5}, cases=[
+        Case("d.total_house_attributes is None", 0, _NA, not_applicable=True),
+        Case("d.total_house_attributes == 0", "points", "Geen huisattributen ingevuld."),
+        Case(None, 0, "Attributen aanwezig."),
+    ]),
+    # meer dan 2 types
+    Rule("malus_accomodation_type_count", "Filters", "malus", weights={"points": -3},
+         let={"type_count": "_type_count(d.accommodation_type_string)"}, cases=[
+        Case("not d.accommodation_type_string", 0, _NA, not_applicable=True),
+        Case("type_count > 2", "points", "Meerdere accommodatietypes: {type_count}."),
+        Case(None, 0, "Meerdere accommodatietypes: {type_count}."),
+    ]),
+    Rule("malus_allow_fireworks_missing", "Filters", "malus", weights={"points": -3}, cases=[
+        Case("d.allow_fireworks is None", "points", "Vuurwerk-beleid ontbreekt."),
+        Case(None, 0, "Ingevuld."),
+    ]),
+    Rule("malus_allow_groups_missing", "Filters", "malus", weights={"points": -3}, cases=[
+        Case("d.allow_groups is None", "points", "Groepen-beleid ontbreekt."),
+        Case(None, 0, "Ingevuld."),
+    ]),
+    Rule("malus_allow_smoking_parties_missing", "Filters", "malus", weights={"points": -3}, cases=[
+        Case("d.allow_smoking is None or d.allow_parties is None", "points", "Roken/feesten filter ontbreekt."),
+        Case(None, 0, "Ingevuld."),
+    ]),
+    Rule("malus_more_rooms_than_persons", "Filters", "malus", weights={"points": -7}, cases=[
+        Case("d.number_of_bedrooms is None or d.max_persons is None or d.max_babies is None", 0, _NA, not_applicable=True),
+        Case("d.number_of_bedrooms > (d.max_persons or 0) + (d.max_babies or 0)", "points", "Meer slaapkamers dan personen+baby's."),
+        Case(None, 0, "Meer slaapkamers dan personen+baby's."),
+    ]),
+    Rule("malus_nr_house_themes_overwhelming", "Filters", "malus", weights={"points": -5}, cases=[
+        Case("d.nr_house_themes is None", 0, _NA, not_applicable=True),
+        Case("d.nr_house_themes >= 6", "points", "Aantal thema's: {d.nr_house_themes}."),
+        Case(None, 0, "Aantal thema's: {d.nr_house_themes}."),
+    ]),
+    Rule("malus_province_not_at_sea_coast", "Filters", "malus", weights={"points": -7}, cases=[
+        Case("d.theme_coastal is None or d.region_inland is None", 0, _NA, not_applicable=True),
+        Case("d.theme_coastal and d.region_inland", "points", "Kust-thema maar regio inland."),
+        Case(None, 0, "Kust-thema maar regio inland."),
+    ]),
+
+    # ---------- Time Settings ----------
+    Rule("malus_arrival_departure_00h00", "Time Settings", "malus", weights={"points": -2}, cases=[
+        Case("_has_midnight(d.arrival_departure_times)", "points", "Aankomst/vertrek om 00:00 (placeholder?)."),
+        Case(None, 0, "Geen 00:00."),
+    ]),
+    # vereenvoudigd: niet te beoordelen zonder exacte tijden
+    Rule("malus_arrival_departure_moment_no_full_15mins", "Time Settings", "malus", cases=[
+        Case(None, 0, "Alleen te beoordelen met exacte tijden.", not_applicable=True),
+    ]),
+    Rule("malus_short_arrival_departure_gap_minutes", "Time Settings", "malus", cases=[
+        Case(None, 0, "Niet zichtbaar op pagina.", not_applicable=True),
+    ]),
+    Rule("malus_silence_start_end_time_missing", "Time Settings", "malus", weights={"points": -3}, cases=[
+        Case("d.silence_start is None or d.silence_end is None", "points", "Stilte-uren ontbreken."),
+        Case(None, 0, "Stilte-uren ingevuld."),
+    ]),
+    # silence_end in de middag/avond (12:00–22:00) wijst op verwisselde tijden
+    Rule("malus_silence_start_stop_swapped", "Time Settings", "malus", weights={"points": -5},
+         let={"silence_end_hour": "_hour(d.silence_end)"}, cases=[
+        Case("not d.silence_end", 0, "Geen stilte-einde.", not_applicable=True),
+        Case("silence_end_hour is None", 0, "Tijd niet parsebaar.", not_applicable=True),
+        Case("12 <= silence_end_hour <= 22", "points", "Stilte-einde in middag/avond (logica-fout)."),
+        Case(None, 0, "Stilte-einde OK."),
+    ]),
+    # malus_months_updated staat alleen bij Availability (zelfde regel, geen dubbeltelling)
+]
+
+
+# ---------- Gewichten ----------
+
+def load_weights(path: str) -> dict[str, dict[str, int]]:
+    """
+    Gewichten uit een JSON-bestand: {"attribuut": punten} voor regels met één gewicht ("points"),
+    of {"attribuut": {"naam": punten, ...}}. Onbekende attributen of namen geven een ValueError.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    rules = {r.attribute: r for r in RULES}
+    out: dict[str, dict[str, int]] = {}
+    for attribute, value in raw.items():
+        rule = rules.get(attribute)
+        if rule is None or not rule.weights:
+            raise ValueError(f"{path}: geen gewichten voor {attribute!r}")
+        if not isinstance(value, dict):
+            value = {"points": value}
+        unknown = set(value) - set(rule.weights)
+        if unknown:
+            raise ValueError(f"{path}: onbekend gewicht {sorted(unknown)} voor {attribute!r} (kies uit {sorted(rule.weights)})")
+        out[attribute] = {k: int(v) for k, v in value.items()}
+    return out
+
+
+def apply_weights(overrides: dict[str, dict[str, int]]) -> None:
+    for rule in RULES:
+        rule.weights.update(overrides.get(rule.attribute, {}))
+
+
+def weights_fingerprint() -> str:
+    """Korte hash van alle gewichten (voor de cachesleutel van rapporten)."""
+    blob = json.dumps({r.attribute: r.weights for r in RULES}, sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:12]
+
+
+# ---------- Compileren ----------
+
+# Namen waarmee de regelexpressies worden uitgevoerd (ook door batch_scorer)
+RULE_NAMESPACE = {
+    "_len": _len, "_validate_postcode": _validate_postcode, "_caps_count": _caps_count,
+    "_type_count": _type_count, "_has_midnight": _has_midnight, "_hour": _hour,
+    "MIN_GEN_LEN": MIN_GEN_LEN, "MIN_NAT_LEN": MIN_NAT_LEN, "MIN_PHOTOS": MIN_PHOTOS, "MAX_PHOTOS": MAX_PHOTOS,
+    "MIN_PHOTO_WIDTH": MIN_PHOTO_WIDTH, "MIN_PHOTO_HEIGHT": MIN_PHOTO_HEIGHT,
+}
+
+
+def inline_weights(expr: Union[int, str], weights: dict[str, int]) -> str:
+    """Puntformule met de gewichten als constanten; een gewichtsnaam alleen is het gewicht zelf."""
+    if isinstance(expr, int):
+        return repr(expr)
+    for name, value in weights.items():
+        expr = re.sub(rf"(?<![\w.'\"]){re.escape(name)}(?![\w'\"])", f"({value!r})", expr)
+    return expr
+
+
+def _category_source(category: str, rules: list[Rule]) -> str:
+    """Broncode van één evaluatiefunctie: lets, dan per regel een if/elif-keten naar (geval, punten)."""
+    lines = [f"def _evaluate(d):"]
+    for name, expr in CATEGORY_LET.get(category, {}).items():
+        lines.append(f"    {name} = {expr}")
+    results = []
+    for n, rule in enumerate(rules):
+        lines.append(f"    # {rule.attribute}")
+        for name, expr in rule.let.items():
+            lines.append(f"    {name} = {expr}")
+        for i, case in enumerate(rule.cases):
+            points = inline_weights(case.points, rule.weights)
+            if case.when is None:
+                lines.append("    else:" if i else "    if True:")
+            else:
+                lines.append(f"    {'elif' if i else 'if'} {inline_weights(case.when, rule.weights)}:")
+            lines.append(f"        r{n} = ({i}, {points})")
+        results.append(f"r{n}")
+    lines.append(f"    return ({', '.join(results)},)")
+    return "\n".join(lines) + "\n"
+
+
+def _needs_scope(case: Case) -> bool:
+    return "{" in case.reason or "{" in (case.recommendation or "") or isinstance(case.pending, str)
+
+
+def _scope_source(rule: Rule) -> str:
+    """Broncode van de functie die de namen voor de teksten van één regel berekent."""
+    lines = ["def _scope(d, w):"]
+    for name, expr in list(CATEGORY_LET.get(rule.category, {}).items()) + list(rule.let.items()) + list(rule.values.items()):
+        lines.append(f"    {name} = {expr}")
+    lines.append("    return _Scope(locals())")
+    return "\n".join(lines) + "\n"
+
+
+class _Scope(dict):
+    """Namen voor str.format_map; drempels en helpers uit RULE_NAMESPACE als ze niet lokaal zijn."""
+
+    def __missing__(self, key):
+        return RULE_NAMESPACE[key]
+
+
+@dataclass
+class CompiledCategory:
+    name: str
+    rules: list[Rule]
+    evaluate: Callable  # d -> tuple[(geval, punten), ...] in de volgorde van rules
+    source: str
+
+
+def _compile_category(category: str, rules: list[Rule]) -> CompiledCategory:
+    source = _category_source(category, rules)
+    namespace = dict(RULE_NAMESPACE)
+    exec(compile(source, f"<lqm_rules:{category}>", "exec"), namespace)
+    for rule in rules:
+        rule.scope = None
+        for case in rule.cases:
+            case.templated = _needs_scope(case)
+        if any(c.templated for c in rule.cases):
+            scope_ns = dict(RULE_NAMESPACE, _Scope=_Scope)
+            exec(compile(_scope_source(rule), f"<lqm_rules:{rule.attribute}>", "exec"), scope_ns)
+            rule.scope = scope_ns["_scope"]
+    return CompiledCategory(category, rules, namespace["_evaluate"], source)
+
+
+def _validate(rules: list[Rule]) -> None:
+    seen = set()
+    for rule in rules:
+        if rule.attribute in seen:
+            raise ValueError(f"dubbel attribuut {rule.attribute!r}")
+        seen.add(rule.attribute)
+        if not rule.cases or rule.cases[-1].when is not None:
+            raise ValueError(f"{rule.attribute}: laatste geval moet when=None zijn")
+        if any(c.when is None for c in rule.cases[:-1]):
+            raise ValueError(f"{rule.attribute}: when=None alleen als laatste geval")
+
+
+def compile_rules() -> list[CompiledCategory]:
+    """Compileer RULES per categorie (in tabelvolgorde); opnieuw aanroepen na apply_weights."""
+    _validate(RULES)
+    categories: dict[str, list[Rule]] = {}
+    for rule in RULES:
+        categories.setdefault(rule.category, []).append(rule)
+    return [_compile_category(name, rules) for name, rules in categories.items()]
+
+
+# ---------- Teksten ----------
+
+def render_rule(rule: Rule, case_index: int, d) -> tuple:
+    """
+    (reason, not_applicable, passed, recommendation, pending) voor het gekozen geval: de velden van LQMScoreItem na type_.
+    Vaste teksten zijn steeds hetzelfde object uit de tabel; ingevulde teksten worden geïnterneerd.
+    """
+    case = rule.cases[case_index]
+    if not case.templated:
+        return case.reason, case.not_applicable, case.passed, case.recommendation, case.pending
+    scope = rule.scope(d, rule.weights)
+    recommendation, pending = case.recommendation, case.pending
+    if recommendation is not None:
+        recommendation = sys.intern(recommendation.format_map(scope))
+    if isinstance(pending, str):
+        pending = bool(scope[pending])
+    # Ingevulde teksten herhalen zich veel tussen listings ("... 12 maanden geleden."): één kopie delen
+    return sys.intern(case.reason.format_map(scope)), case.not_applicable, case.passed, recommendation, pending
+
+
+if WEIGHTS_FILE:
+    apply_weights(load_weights(WEIGHTS_FILE))
+
+CATEGORIES = compile_rules()
@@ -0,0 +1,348 @@
+# Prometheus-metrics (GET /metrics, tekstformaat 0.0.4) zonder extra dependency
+# Tellers en histogrammen leven per proces in het geheugen (één lock, geen I/O bij het tellen).
+# Met meerdere gunicorn-workers zet je LQM_METRICS_DIR: elk proces schrijft dan elke
+# LQM_METRICS_FLUSH_INTERVAL seconden (en bij afsluiten) zijn waarden naar <map>/<pid>-<id>.json en
+# /metrics telt alle bestanden op, dus ook die van inmiddels herstarte workers (tellers blijven oplopen).
+# Begin per deploy met een lege map. Cachetellers komen uit de stats() van de caches (collectors).
+
+from __future__ import annotations
+import atexit
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Callable, Iterable, Optional
+from urllib.parse import urlparse
+
+from config import METRICS_DIR, METRICS_FLUSH_INTERVAL, METRICS_MAX_HOSTS
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconden; van een cachehit (ms) tot een trage pagina of OpenAI-aanroep (tientallen seconden)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Cache-uitkomsten die als hit tellen voor lqm_cache_hit_ratio
+_HIT_RESULTS = ("hit", "revalidated", "similar_hit")
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, registry: "Registry", name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        reg = self.registry
+        with reg._lock:
+            values = reg._values(self)
+            values[key] = values.get(key, 0) + amount
+        reg._touched()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry: "Registry", name: str, help: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(registry, name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        """Waarde in de eerste bucket met grens >= value; opgeslagen als [per bucket..., +Inf, som, aantal]."""
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        reg = self.registry
+        with reg._lock:
+            values = reg._values(self)
+            row = values.get(key)
+            if row is None:
+                row = values[key] = [0] * (len(self.buckets) + 3)
+            row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+        reg._touched()
+
+    def time(self, **labels) -> "_Timer":
+        return _Timer(self, labels)
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "t0")
+
+    def __init__(self, histogram: Histogram, labels: dict):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.t0, **self.labels)
+
+
+class Registry:
+    """Alle metrics van het proces; snapshot() voor het bestand van dit proces, render() voor /metrics."""
+
+    def __init__(self, directory: str = METRICS_DIR, flush_interval: float = METRICS_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._metrics: dict[str, _Metric] = {}
+        self._data: dict[str, dict[tuple, object]] = {}
+        self._collectors: list[Callable[[], Iterable[tuple[str, dict, float]]]] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._path: Optional[str] = None
+        self._flusher: Optional[threading.Thread] = None
+        self._dirty = threading.Event()
+        self._flush_lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(self, name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, help, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} bestaat al")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collect: Callable[[], Iterable[tuple[str, dict, float]]]) -> None:
+        """collect() -> [(naam van een Counter, labels, huidige stand)]; aangeroepen bij elke snapshot."""
+        self._collectors.append(collect)
+
+    def _values(self, metric: _Metric) -> dict:
+        """De series van metric (aanroepen met self._lock)."""
+        self._check_fork()
+        return self._data.setdefault(metric.name, {})
+
+    def _check_fork(self) -> None:
+        if os.getpid() != self._pid:
+            # Geforkt (gunicorn --preload): de waarden van de ouder horen niet bij deze worker
+            self._pid = os.getpid()
+            self._data.clear()
+            self._path = None
+            self._flusher = None
+            self._dirty = threading.Event()
+            self._flush_lock = threading.Lock()
+
+    # ---------- Meerdere processen ----------
+
+    def _touched(self) -> None:
+        if not self.directory:
+            return
+        self._dirty.set()
+        if self._flusher is None:
+            with self._lock:
+                if self._flusher is None:
+                    self._flusher = threading.Thread(target=self._flush_loop, name="lqm-metrics", daemon=True)
+                    self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._dirty.wait()
+            time.sleep(self.flush_interval)
+            self._dirty.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Schrijf de waarden van dit proces naar de gedeelde map (atomair)."""
+        if not self.directory:
+            return
+        snapshot = self.snapshot()
+        with self._flush_lock:  # flush-thread en /metrics kunnen tegelijk schrijven
+            try:
+                if self._path is None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    # Eigen id naast de pid: een nieuwe worker met een hergebruikte pid overschrijft geen oude tellers
+                    self._path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.json")
+                tmp = self._path + ".tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp, self._path)
+            except OSError:
+                pass
+
+    def snapshot(self) -> dict:
+        """{metric: {labels als JSON-lijst: waarde of histogramrij}} van dit proces, inclusief collectors."""
+        with self._lock:
+            self._check_fork()
+            out = {name: {json.dumps(list(k)): (list(v) if isinstance(v, list) else v) for k, v in values.items()}
+                   for name, values in self._data.items()}
+        for collect in self._collectors:
+            try:
+                samples = list(collect())
+            except Exception:  # een kapotte collector mag /metrics niet breken
+                continue
+            for name, labels, value in samples:
+                metric = self._metrics[name]
+                key = json.dumps(list(metric._key(labels)))
+                series = out.setdefault(name, {})
+                series[key] = series.get(key, 0) + value
+        return out
+
+    def _merged(self) -> dict:
+        """Snapshots van alle processen opgeteld (zonder map: alleen dit proces)."""
+        if not self.directory:
+            return self.snapshot()
+        self.flush()
+        merged: dict[str, dict[str, object]] = {}
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for name, series in snapshot.items():
+                target = merged.setdefault(name, {})
+                for key, value in series.items():
+                    current = target.get(key)
+                    if current is None:
+                        target[key] = list(value) if isinstance(value, list) else value
+                    elif isinstance(value, list):
+                        target[key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        target[key] = current + value
+        return merged
+
+    # ---------- Tekstformaat ----------
+
+    def render(self) -> str:
+        data = self._merged()
+        lines: list[str] = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {_escape_help(metric.help)}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(data.get(name, {}).items()):
+                labels = list(zip(metric.labelnames, json.loads(key)))
+                if metric.kind == "counter":
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip((*metric.buckets, float("inf")), value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels + [('le', _number(bound))])} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(value[-2])}")
+                lines.append(f"{name}_count{_labels(labels)} {value[-1]}")
+        lines.extend(_cache_hit_ratio(data.get(CACHE_LOOKUPS.name, {})))
+        return "\n".join(lines) + "\n"
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: list[tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in pairs) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _cache_hit_ratio(series: dict) -> list[str]:
+    """Gauge lqm_cache_hit_ratio per cache, uit de opgetelde lqm_cache_lookups_total van alle processen."""
+    totals: dict[str, list[float]] = {}
+    for key, value in series.items():
+        cache, result = json.loads(key)
+        row = totals.setdefault(cache, [0, 0])
+        row[0] += value if result in _HIT_RESULTS else 0
+        row[1] += value
+    lines = ["# HELP lqm_cache_hit_ratio Aandeel lookups dat uit de cache kwam (alle processen)",
+             "# TYPE lqm_cache_hit_ratio gauge"]
+    for cache, (hits, lookups) in sorted(totals.items()):
+        if lookups:
+            lines.append(f"lqm_cache_hit_ratio{_labels([('cache', cache)])} {round(hits / lookups, 4)}")
+    return lines
+
+
+REGISTRY = Registry()
+atexit.register(REGISTRY.flush)
+
+ANALYZE_REQUESTS = REGISTRY.counter(
+    "lqm_analyze_requests_total", "Analyseverzoeken per endpoint en uitkomst", ("endpoint", "outcome"))
+ANALYZE_SECONDS = REGISTRY.histogram(
+    "lqm_analyze_duration_seconds", "Duur van analyseverzoeken", ("endpoint",))
+FETCH_SECONDS = REGISTRY.histogram(
+    "lqm_fetch_duration_seconds", "Pagina ophalen (tot en met de body) per host", ("host",))
+FETCH_BYTES = REGISTRY.counter(
+    "lqm_fetch_bytes_total", "Gedownloade paginabytes per host", ("host",))
+FETCH_FAILURES = REGISTRY.counter(
+    "lqm_fetch_failures_total", "Mislukte paginadownloads per host", ("host",))
+PARSE_SECONDS = REGISTRY.histogram(
+    "lqm_parse_duration_seconds", "HTML parsen (build_index) per backend", ("backend",),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+OPENAI_SECONDS = REGISTRY.histogram(
+    "lqm_openai_duration_seconds", "Duur van OpenAI Vision-aanroepen")
+OPENAI_REQUESTS = REGISTRY.counter(
+    "lqm_openai_requests_total", "OpenAI Vision-aanroepen per uitkomst (ok of failed)", ("outcome",))
+CACHE_LOOKUPS = REGISTRY.counter(
+    "lqm_cache_lookups_total", "Lookups per cache (page, report, vision) en uitkomst", ("cache", "result"))
+
+_hosts: set[str] = set()
+_hosts_lock = threading.Lock()
+
+
+def host_label(url: str) -> str:
+    """Host van de URL als label; na LQM_METRICS_MAX_HOSTS verschillende hosts wordt het "other"."""
+    host = (urlparse(url).hostname or "").lower()
+    if host in _hosts:
+        return host
+    with _hosts_lock:
+        if len(_hosts) < METRICS_MAX_HOSTS:
+            _hosts.add(host)
+            return host
+    return "other"
+
+
+def _cache_counts() -> Iterable[tuple[str, dict, float]]:
+    from page_cache import get_page_cache
+    from report_cache import get_report_cache
+    from vision_cache import get_vision_cache
+
+    page = get_page_cache()
+    if page is not None:
+        s = page.stats()
+        for result, key in (("hit", "hits"), ("miss", "misses"), ("revalidated", "revalidated"), ("refetched", "refetched")):
+            yield CACHE_LOOKUPS.name, {"cache": "page", "result": result}, s[key]
+    s = get_report_cache().stats()
+    yield CACHE_LOOKUPS.name, {"cache": "report", "result": "hit"}, s["hits"]
+    yield CACHE_LOOKUPS.name, {"cache": "report", "result": "miss"}, s["misses"]
+    vision = get_vision_cache()
+    if vision is not None:
+        s = vision.stats()
+        for result, key in (("hit", "hits"), ("similar_hit", "similar_hits"), ("miss", "misses")):
+            yield CACHE_LOOKUPS.name, {"cache": "vision", "result": result}, s[key]
+
+
+REGISTRY.add_collector(_cache_counts)
+
+
+def render() -> str:
+    """De tekst voor GET /metrics."""
+    return REGISTRY.render()
@@ -0,0 +1,237 @@
+# Paginacache voor fetch_page: LRU in het geheugen of op schijf, met TTL en revalidatie
+# Binnen de TTL geen netwerkverkeer; daarna een conditionele GET (If-None-Match /
+# If-Modified-Since). Bij 304 blijven HTML én de eerder geëxtraheerde data geldig.
+
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict, replace
+from typing import Optional
+
+from config import PAGE_CACHE_BACKEND, PAGE_CACHE_TTL, PAGE_CACHE_MAX_BYTES, PAGE_CACHE_MAX_ENTRIES, PAGE_CACHE_DIR
+from url_utils import normalize_url
+
+
+@dataclass
+class CacheEntry:
+    """Eén gecachte pagina: HTML, validators voor revalidatie en (optioneel) de extractie-uitkomst."""
+    url: str
+    html: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    stored_at: float = field(default_factory=time.time)
+    extracted: Optional[dict] = None  # dataclasses.asdict(ExtractedData) van deze HTML
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.stored_at < ttl
+
+    def conditional_headers(self) -> dict:
+        """Headers voor een conditionele GET; leeg als de server geen validators gaf."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class PageCache:
+    """Basis voor cache-backends: get/put per sleutel (genormaliseerde URL) plus tellers."""
+
+    def __init__(self, ttl: float = PAGE_CACHE_TTL):
+        self.ttl = ttl
+        self._counts = {"hits": 0, "misses": 0, "revalidated": 0, "refetched": 0}
+        self._counts_lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str) -> str:
+        return normalize_url(url)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        raise NotImplementedError
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        raise NotImplementedError
+
+    def count(self, name: str) -> None:
+        """Hoog een teller op: hits (vers), misses (niet in cache), revalidated (304), refetched (verlopen, 200)."""
+        with self._counts_lock:
+            self._counts[name] += 1
+
+    def stats(self) -> dict:
+        with self._counts_lock:
+            counts = dict(self._counts)
+        lookups = counts["hits"] + counts["misses"] + counts["revalidated"] + counts["refetched"]
+        counts["hit_ratio"] = round((counts["hits"] + counts["revalidated"]) / lookups, 3) if lookups else None
+        counts["backend"] = type(self).__name__
+        return counts
+
+
+class MemoryPageCache(PageCache):
+    """
+    LRU in het geheugen (per proces), begrensd op aantal pagina's én op de totale HTML-grootte
+    (len(html)): advertentiepagina's zijn al snel 300 KB tot 1 MB. Entries worden niet gewijzigd
+    na put (andere threads kunnen ze vasthouden); revalidated/remember_extracted zetten een kopie.
+    """
+
+    def __init__(self, max_entries: int = PAGE_CACHE_MAX_ENTRIES, ttl: float = PAGE_CACHE_TTL,
+                 max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.html)
+            if len(entry.html) > self.max_bytes:
+                return  # past nooit: niet de hele cache ervoor leegmaken
+            self._entries[key] = entry
+            self._bytes += len(entry.html)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.html)
+
+    def stats(self) -> dict:
+        out = super().stats()
+        with self._lock:
+            out["entries"] = len(self._entries)
+            out["bytes"] = self._bytes
+        out["max_bytes"] = self.max_bytes
+        return out
+
+
+class DiskPageCache(PageCache):
+    """Cache op schijf (één JSON-bestand per URL); gedeeld tussen workers en bewaard na herstart."""
+
+    # Na zoveel schrijfacties controleren we of er bestanden weg moeten
+    _EVICT_EVERY = 64
+
+    def __init__(self, directory: str = PAGE_CACHE_DIR, max_entries: int = PAGE_CACHE_MAX_ENTRIES, ttl: float = PAGE_CACHE_TTL):
+        super().__init__(ttl)
+        self.directory = directory
+        self.max_entries = max_entries
+        self._puts = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = CacheEntry(**json.load(f))
+            os.utime(path)  # LRU: laatst gebruikt
+            return entry
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def put(self, key: str, entry: CacheEntry) -> None:
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(asdict(entry), f, ensure_ascii=False)
+            os.replace(tmp, path)  # atomair: andere workers zien nooit een half bestand
+        except OSError:
+            return
+        self._puts += 1
+        if self._puts % self._EVICT_EVERY == 0:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Verwijder de minst recent gebruikte bestanden boven max_entries."""
+        try:
+            files = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        except OSError:
+            return
+        excess = len(files) - self.max_entries
+        if excess <= 0:
+            return
+        files.sort(key=lambda e: e.stat().st_mtime)
+        for e in files[:excess]:
+            try:
+                os.remove(e.path)
+            except OSError:
+                pass
+
+
+_cache: PageCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> PageCache | None:
+    """De procesbrede paginacache volgens LQM_PAGE_CACHE ("memory", "disk" of "off")."""
+    global _cache
+    if PAGE_CACHE_BACKEND == "off":
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskPageCache() if PAGE_CACHE_BACKEND == "disk" else MemoryPageCache()
+    return _cache
+
+
+def set_page_cache(cache: PageCache | None) -> None:
+    """Vervang de procesbrede cache (eigen backend, of None om terug te gaan naar de config)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+# ---------- Hulpfuncties voor de fetchers (sync in extractor, async in async_fetch) ----------
+
+def lookup(url: str) -> tuple[Optional[CacheEntry], bool]:
+    """(entry, vers). Vers = binnen TTL, geen request nodig. Niet vers = revalideren met entry.conditional_headers()."""
+    cache = get_page_cache()
+    if cache is None:
+        return None, False
+    entry = cache.get(cache.key(url))
+    if entry is not None and entry.is_fresh(cache.ttl):
+        cache.count("hits")
+        return entry, True
+    return entry, False
+
+
+def revalidated(url: str, entry: CacheEntry) -> CacheEntry:
+    """Server antwoordde 304: de gecachte pagina (en extractie) is weer een TTL geldig."""
+    cache = get_page_cache()
+    entry = replace(entry, stored_at=time.time())
+    if cache is not None:
+        cache.count("revalidated")
+        cache.put(cache.key(url), entry)
+    return entry
+
+
+def store(url: str, html: str, etag: Optional[str], last_modified: Optional[str], replaced: bool) -> CacheEntry:
+    """Nieuwe download opslaan (replaced=True als er een verlopen versie in de cache stond)."""
+    entry = CacheEntry(url=url, html=html, etag=etag, last_modified=last_modified)
+    cache = get_page_cache()
+    if cache is not None:
+        cache.count("refetched" if replaced else "misses")
+        cache.put(cache.key(url), entry)
+    return entry
+
+
+def remember_extracted(url: str, entry: CacheEntry, extracted: dict) -> None:
+    """Bewaar de extractie bij (een kopie van) de pagina, zodat een hit of 304 het parsen overslaat."""
+    entry = replace(entry, extracted=extracted)
+    cache = get_page_cache()
+    if cache is not None:
+        cache.put(cache.key(url), entry)
@@ -0,0 +1,506 @@
+# Pagina-index: alles wat extract_from_html van een advertentiepagina nodig heeft,
+# verzameld in één doorloop van de DOM-boom (in plaats van een find/select per helper).
+
+from __future__ import annotations
+import re
+from typing import Callable, Optional
+
+from bs4 import BeautifulSoup, Tag
+from lxml import etree
+
+# CSS-selectors die de extractor gebruikt (volgorde = prioriteit)
+GENERAL_SELECTORS = [
+    "[data-testid='description']",
+    ".description",
+    ".listing-description",
+    ".property-description",
+    "[class*='description']",
+    "article p",
+    ".content p",
+    "main p",
+]
+NATURE_SELECTORS = [
+    "[class*='nature']",
+    "[id*='nature']",
+    "[data-section='nature']",
+    ".nature-description",
+]
+PLACE_SELECTORS = [
+    "[itemprop='addressLocality']",
+    ".address-locality",
+    "[class*='location']",
+    "[class*='place']",
+    "[data-testid='location']",
+]
+FALLBACK_SELECTORS = ["p"]
+ALL_SELECTORS = GENERAL_SELECTORS + NATURE_SELECTORS + PLACE_SELECTORS + FALLBACK_SELECTORS
+
+_META_GEO_NAME = re.compile(r"geo|place|location", re.I)
+_INSTANT_BOOKING = re.compile(r"nh-icon__instant-booking", re.I)
+_IMG_ATTRS = ("src", "alt", "width", "data-width", "height", "data-height", "data-src")
+
+
+# ---------- Selectors: de kleine subset die we gebruiken, vooraf gecompileerd ----------
+# Ondersteund: tag, .klasse, [attr='v'], [attr*='v'] en "voorouder afstammeling".
+
+_COMPOUND = re.compile(r"^([a-zA-Z][\w-]*)?((?:\.[\w-]+|\[[\w-]+\*?='[^']*'\])*)$")
+_PART = re.compile(r"\.([\w-]+)|\[([\w-]+)(\*?)='([^']*)'\]")
+
+
+def _attr(attrs: dict, name: str) -> Optional[str]:
+    v = attrs.get(name)
+    if isinstance(v, list):  # BeautifulSoup splitst class in een lijst
+        return " ".join(v)
+    return v
+
+
+class _Simple:
+    """Eén compound selector (zonder combinator): tagnaam plus attribuut-/klassevoorwaarden."""
+
+    def __init__(self, text: str):
+        m = _COMPOUND.match(text)
+        if not m or not text:
+            raise ValueError(f"Selector niet ondersteund: {text!r}")
+        self.tag = m.group(1).lower() if m.group(1) else None
+        self.checks = []
+        for cls, name, star, value in _PART.findall(m.group(2)):
+            if cls:
+                self.checks.append(("class", "~=", cls))
+            else:
+                self.checks.append((name.lower(), "*=" if star else "=", value))
+
+    def match(self, name: str, attrs: dict) -> bool:
+        if self.tag is not None and name != self.tag:
+            return False
+        for attr_name, op, value in self.checks:
+            v = _attr(attrs, attr_name)
+            if v is None:
+                return False
+            if op == "=":
+                if v != value:
+                    return False
+            elif op == "*=":
+                if not value or value not in v:
+                    return False
+            elif value not in v.split():
+                return False
+        return True
+
+    def xpath(self) -> str:
+        """Dezelfde voorwaarden als XPath-stap (class genormaliseerd zoals BeautifulSoup hem samenvoegt)."""
+        preds = []
+        for attr_name, op, value in self.checks:
+            ref = "normalize-space(@class)" if attr_name == "class" else f"@{attr_name}"
+            if op == "=":
+                preds.append(f"{ref}='{value}'")
+            elif op == "*=":
+                preds.append(f"contains({ref},'{value}')" if value else "false()")
+            else:
+                # Goedkope voorfilter op de ruwe waarde, daarna de exacte woordtest
+                preds.append(f"contains(@{attr_name},'{value}')")
+                preds.append(f"contains(concat(' ',{ref},' '),' {value} ')")
+        return (self.tag or "*") + "".join(f"[{p}]" for p in preds)
+
+
+class CompiledSelector:
+    """Selector van de vorm "A" of "A B" (B met een voorouder die aan A voldoet)."""
+
+    def __init__(self, selector: str):
+        parts = selector.split()
+        if not 1 <= len(parts) <= 2:
+            raise ValueError(f"Selector niet ondersteund: {selector!r}")
+        self.selector = selector
+        self.subject = _Simple(parts[-1])
+        self.ancestor = _Simple(parts[0]) if len(parts) == 2 else None
+
+    def xpath(self) -> str:
+        prefix = f"//{self.ancestor.xpath()}" if self.ancestor else ""
+        return f"{prefix}//{self.subject.xpath()}"
+
+
+COMPILED_SELECTORS = [CompiledSelector(s) for s in ALL_SELECTORS]
+# Unieke voorouder-voorwaarden; per element houden we bij welke daarvan op een voorouder gelden
+_ANCESTOR_KEYS = list(dict.fromkeys(c.selector.split()[0] for c in COMPILED_SELECTORS if c.ancestor))
+_ANCESTORS = [_Simple(k) for k in _ANCESTOR_KEYS]
+_SELECTOR_ANCESTOR = [(_ANCESTOR_KEYS.index(c.selector.split()[0]) if c.ancestor else -1) for c in COMPILED_SELECTORS]
+
+
+def _norm(text: str) -> str:
+    return " ".join(text.split())
+
+
+class PageIndex:
+    """
+    Resultaat van één doorloop: afbeeldingen, JSON-LD, nh-*-markers en per selector de
+    gematchte elementen. Tekst wordt pas berekend als een helper erom vraagt.
+    """
+
+    def __init__(self, text_of: Callable[[object], str], page_text: Callable[[], str], page_words: Callable[[], str]):
+        self._text_of = text_of          # element -> get_text(separator=" ", strip=True)
+        self._page_text_fn = page_text   # volledige paginatekst (get_text() zonder scheiding)
+        self._page_words_fn = page_words  # idem, met een spatie tussen de tekstfragmenten
+        self._page_text: Optional[str] = None
+        self._page_words: Optional[str] = None
+        self.images: list[dict] = []                 # attributen van alle <img src=...>, documentvolgorde
+        self.json_ld: list[str] = []                 # inhoud van <script type="application/ld+json">
+        self.matches: dict[str, list] = {s: [] for s in ALL_SELECTORS}
+        self.meta_geo_content: Optional[str] = None  # content van de eerste meta name~geo|place|location
+        self.impact_attrs: Optional[dict] = None     # attributen van de eerste <nh-impact-house-tag>
+        self.review_label_text: Optional[str] = None  # tekst van de eerste span.nh-anchor__label
+        self.has_star = False                         # er is een span.nh-icon__star-filled
+        self.star_parent_text: Optional[str] = None   # tekst van de container van de eerste ster
+        self.star_parent_count = 0                    # aantal gevulde sterren in die container
+        self.instant_booking = False
+        self.listing_images: Optional[list[dict]] = None  # cache voor extractor._listing_images
+
+    def selector_texts(self, selector: str) -> list[str]:
+        """Genormaliseerde, niet-lege teksten van alle matches van de selector."""
+        out = []
+        for el in self.matches[selector]:
+            t = self._text_of(el)
+            if t:
+                out.append(_norm(t))
+        return out
+
+    def first_text(self, selector: str) -> Optional[str]:
+        """Genormaliseerde tekst van de eerste match (ook als die leeg is); None zonder match."""
+        els = self.matches[selector]
+        return _norm(self._text_of(els[0])) if els else None
+
+    @property
+    def page_text(self) -> str:
+        """Volledige paginatekst, één keer berekend (voor de regex-fallbacks)."""
+        if self._page_text is None:
+            self._page_text = self._page_text_fn() or ""
+        return self._page_text
+
+    @property
+    def page_words(self) -> str:
+        """Paginatekst met spaties tussen de elementen, voor zoekwoorden met woordgrenzen ("eco</li><li>..." blijft los)."""
+        if self._page_words is None:
+            self._page_words = self._page_words_fn() or ""
+        return self._page_words
+
+
+def _class_str(attrs: dict) -> str:
+    return _attr(attrs, "class") or ""
+
+
+def build_soup_index(soup: BeautifulSoup) -> PageIndex:
+    """Bouw de PageIndex met één iteratieve doorloop van de BeautifulSoup-boom."""
+    index = PageIndex(
+        text_of=lambda el: el.get_text(separator=" ", strip=True),
+        page_text=soup.get_text,
+        page_words=lambda: soup.get_text(" "),
+    )
+    n_anc = len(_ANCESTORS)
+    meta_found = False
+    star_el = None
+    # Stapel van (element, voorouder-vlaggen); kinderen omgekeerd erop zodat we in documentvolgorde lopen
+    stack: list[tuple[Tag, tuple]] = [(c, (False,) * n_anc) for c in reversed(soup.contents) if isinstance(c, Tag)]
+    while stack:
+        el, anc = stack.pop()
+        name = el.name
+        attrs = el.attrs
+
+        for i, comp in enumerate(COMPILED_SELECTORS):
+            a = _SELECTOR_ANCESTOR[i]
+            if (a < 0 or anc[a]) and comp.subject.match(name, attrs):
+                index.matches[comp.selector].append(el)
+
+        if name == "img":
+            if "src" in attrs:
+                index.images.append({k: attrs.get(k) for k in _IMG_ATTRS})
+        elif name == "script":
+            if attrs.get("type") == "application/ld+json":
+                index.json_ld.append(el.string)
+        elif name == "meta":
+            if not meta_found:
+                n = attrs.get("name")
+                if n is not None and _META_GEO_NAME.search(_attr(attrs, "name")):
+                    meta_found = True
+                    index.meta_geo_content = attrs.get("content")
+        elif name == "nh-impact-house-tag":
+            if index.impact_attrs is None:
+                index.impact_attrs = {k: _attr(attrs, k) for k in attrs}
+
+        cls = _class_str(attrs)
+        if cls:
+            if name == "span":
+                if index.review_label_text is None and "nh-anchor__label" in cls:
+                    index.review_label_text = (el.get_text() or "").strip()
+                if star_el is None and "nh-icon__star-filled" in cls:
+                    star_el = el
+                if "instant-booking" in cls:
+                    index.instant_booking = True
+            if not index.instant_booking and _INSTANT_BOOKING.search(cls):
+                index.instant_booking = True
+
+        children = [c for c in el.contents if isinstance(c, Tag)]
+        if children:
+            if n_anc:
+                child_anc = tuple(anc[k] or _ANCESTORS[k].match(name, attrs) for k in range(n_anc))
+            else:
+                child_anc = anc
+            for c in reversed(children):
+                stack.append((c, child_anc))
+
+    if star_el is not None:
+        index.has_star = True
+        parent = star_el.parent
+        if parent is not None:
+            index.star_parent_text = parent.get_text(separator=" ", strip=True) or ""
+            index.star_parent_count = sum(
+                1 for s in parent.find_all("span") if "nh-icon__star-filled" in _class_str(s.attrs)
+            )
+    return index
+
+
+# ---------- lxml-backend: zelfde PageIndex, zonder BeautifulSoup-boom ----------
+# Tag-selectors en "A B" gaan via XPath (in C); selectors op één attribuut controleren we in
+# één Python-lus over de elementen die zo'n attribuut hebben (contains() in libxml2 is traag).
+
+# Tekst binnen deze elementen telt BeautifulSoup niet mee in get_text() (eigen stringtypes)
+_STRING_CONTAINERS = ("script", "style", "template", "rt", "rp")
+_IN_CONTAINER = " or ".join(f"self::{t}" for t in _STRING_CONTAINERS)
+_TEXT = etree.XPath(f".//text()[not(ancestor::*[{_IN_CONTAINER}])]", smart_strings=False)
+# Zonder template/rt/rp kan tekst alleen direct in script/style zitten: veel goedkopere test
+_TEXT_SIMPLE = etree.XPath(".//text()[not(parent::script or parent::style)]", smart_strings=False)
+_X_HAS_NESTED_CONTAINER = etree.XPath("boolean(//template | //rt | //rp)")
+_CONTAINER_TEXT = {
+    t: etree.XPath(f".//text()[name(ancestor::*[{_IN_CONTAINER}][1])='{t}']", smart_strings=False)
+    for t in _STRING_CONTAINERS
+}
+
+_ATTR_CHECKS: dict[str, list[tuple[str, str, str]]] = {}  # attribuut -> [(selector, op, waarde)]
+_XPATH_SELECTORS: dict[str, etree.XPath] = {}
+for _c in COMPILED_SELECTORS:
+    if _c.ancestor is None and _c.subject.tag is None and len(_c.subject.checks) == 1:
+        _name, _op, _value = _c.subject.checks[0]
+        _ATTR_CHECKS.setdefault(_name, []).append((_c.selector, _op, _value))
+    else:
+        _XPATH_SELECTORS[_c.selector] = etree.XPath(_c.xpath())
+_ATTR_CHECKS.setdefault("class", [])  # class is ook nodig voor de nh-*-markers
+_X_CANDIDATES = etree.XPath("descendant::*[" + " or ".join(f"@{n}" for n in _ATTR_CHECKS) + "]")
+_X_IMAGES = etree.XPath("//img[@src]")
+_X_JSON_LD = etree.XPath("//script[@type='application/ld+json']")
+_X_META = etree.XPath("//meta[@name]")
+_X_IMPACT = etree.XPath("(//nh-impact-house-tag)[1]")
+
+
+def _lxml_attrs(el) -> dict:
+    """Attributen zoals BeautifulSoup ze samenvoegt (class met enkele spaties)."""
+    attrs = dict(el.attrib)
+    if "class" in attrs:
+        attrs["class"] = " ".join(attrs["class"].split())
+    return attrs
+
+
+def _parse_lxml(html: str):
+    parser = etree.HTMLParser(recover=True)
+    parser.feed(html or "")
+    return parser.close()
+
+
+def build_lxml_index(html: str) -> PageIndex:
+    """Bouw de PageIndex rechtstreeks op een lxml-boom; geeft dezelfde uitkomst als build_soup_index."""
+    return _lxml_tree_index(_parse_lxml(html))
+
+
+def _lxml_tree_index(root, json_ld: Optional[list[str]] = None, markers: bool = True) -> PageIndex:
+    """
+    PageIndex van een geparste lxml-boom. json_ld: al uit de bron gehaalde JSON-LD (anders uit de boom);
+    markers=False slaat het zoeken naar nh-*-spans over (de voorfilter zag ze niet in de bron).
+    """
+    if root is None:
+        return PageIndex(text_of=lambda el: "", page_text=lambda: "", page_words=lambda: "")
+
+    text = _TEXT if _X_HAS_NESTED_CONTAINER(root) else _TEXT_SIMPLE
+
+    def strings(el) -> list[str]:
+        # Tekstfragmenten zoals Tag.get_text ze ziet; is el zelf een script/style/..., dan juist die tekst
+        return (_CONTAINER_TEXT.get(el.tag) or text)(el)
+
+    def text_of(el) -> str:
+        return " ".join(t for t in (s.strip() for s in strings(el)) if t)
+
+    index = PageIndex(text_of=text_of, page_text=lambda: "".join(text(root)), page_words=lambda: " ".join(text(root)))
+
+    for selector, xp in _XPATH_SELECTORS.items():
+        index.matches[selector] = xp(root)
+    matches = index.matches
+    star_el = None
+    for el in _X_CANDIDATES(root):
+        attrs = el.attrib
+        for name, checks in _ATTR_CHECKS.items():
+            v = attrs.get(name)
+            if v is None:
+                continue
+            if name == "class":
+                v = " ".join(v.split())
+            for selector, op, value in checks:
+                if op == "*=":
+                    ok = bool(value) and value in v
+                elif op == "=":
+                    ok = v == value
+                else:
+                    ok = value in v.split()
+                if ok:
+                    matches[selector].append(el)
+
+        cls = attrs.get("class") if markers else None
+        if cls:
+            if el.tag == "span":
+                if index.review_label_text is None and "nh-anchor__label" in cls:
+                    index.review_label_text = "".join(strings(el)).strip()
+                if star_el is None and "nh-icon__star-filled" in cls:
+                    star_el = el
+                if "instant-booking" in cls:
+                    index.instant_booking = True
+            if not index.instant_booking and _INSTANT_BOOKING.search(cls):
+                index.instant_booking = True
+
+    index.images = [{k: img.get(k) for k in _IMG_ATTRS} for img in _X_IMAGES(root)]
+    index.json_ld = json_ld if json_ld is not None else [el.text for el in _X_JSON_LD(root)]
+    for meta in _X_META(root):
+        if _META_GEO_NAME.search(meta.get("name")):
+            index.meta_geo_content = meta.get("content")
+            break
+    impact = _X_IMPACT(root)
+    if impact:
+        index.impact_attrs = _lxml_attrs(impact[0])
+    if star_el is not None:
+        index.has_star = True
+        parent = star_el.getparent()
+        if parent is not None:
+            index.star_parent_text = text_of(parent)
+            index.star_parent_count = sum(
+                1 for s in parent.iterdescendants("span") if "nh-icon__star-filled" in (s.get("class") or "")
+            )
+    return index
+
+
+# ---------- Voorfilter op de ruwe HTML (backend "partial") ----------
+# Inline scripts en styles zijn vaak het grootste deel van een pagina, maar leveren behalve
+# JSON-LD niets op voor de extractie. De voorfilter knipt hun inhoud weg voordat lxml parset,
+# haalt JSON-LD rechtstreeks uit de bron en kijkt of de nh-*-markers er überhaupt in staan.
+# Lukt dat niet ondubbelzinnig, dan volgt een gewone volledige parse.
+
+# Elementen waarvan de inhoud tekst is (geen markup); daarbinnen telt een "<script" niet
+_RAW_TEXT_TAGS = ("script", "style", "title", "textarea", "xmp", "iframe", "noembed", "noframes")
+_RAW_OPEN = re.compile(r"<!--|<(%s|plaintext)(?=[\s/>])" % "|".join(_RAW_TEXT_TAGS), re.I)
+_RAW_CLOSE = {t: re.compile(rf"</{t}[\s/>]", re.I) for t in _RAW_TEXT_TAGS}
+_COMMENT_END = re.compile(r"--!?>")
+_ESCAPED_SCRIPT = re.compile(r"<!--.*?<script[\s/>]", re.I | re.S)
+_START_TAG_REST = re.compile(r"""(?:=\s*"[^"]*"|=\s*'[^']*'|[^>])*>""")
+# Een script/style met een attribuut waarop een selector test, houdt zijn inhoud (get_text kan die nodig hebben)
+_SELECTOR_ATTR_NAMES = sorted({n for c in COMPILED_SELECTORS for sim in (c.subject, c.ancestor) if sim for n, _, _ in sim.checks})
+_SELECTOR_ATTR = re.compile(r"(?<![\w-])(?:%s)\s*=" % "|".join(map(re.escape, _SELECTOR_ATTR_NAMES)), re.I)
+_X_SCRIPTS_STYLES = etree.XPath("//script | //style")
+# Tekenreferenties kunnen een marker in een attribuut "verstoppen" (&#95; = _, &lowbar; = _)
+_CHAR_REF = re.compile(r"&#|&lowbar;|&UnderBar;")
+
+
+def prefilter_html(html: str) -> Optional[tuple[str, list[Optional[str]]]]:
+    """
+    (ingekorte HTML, inhoud per script/style in documentvolgorde) of None als de bron niet
+    eenduidig te knippen is. Inhoud None = niet weggeknipt (staat nog in de ingekorte HTML).
+    """
+    out: list[str] = []
+    bodies: list[Optional[str]] = []
+    copied = 0  # tot hier is de bron al naar out gekopieerd
+    scan = 0
+    while True:
+        m = _RAW_OPEN.search(html, scan)
+        if m is None:
+            break
+        tag = m.group(1)
+        if tag is None:  # commentaar overslaan (<!--> en <!---> zijn al compleet, einde --> of --!>)
+            start = m.end()
+            if html.startswith(">", start):
+                scan = start + 1
+            elif html.startswith("->", start):
+                scan = start + 2
+            else:
+                end = _COMMENT_END.search(html, start)
+                if end is None:
+                    break
+                scan = end.end()
+            continue
+        tag = tag.lower()
+        if tag == "plaintext":  # alles daarna is tekst
+            break
+        rest = _START_TAG_REST.match(html, m.end())
+        if rest is None:
+            return None
+        body_start = rest.end()
+        close = _RAW_CLOSE[tag].search(html, body_start)
+        body_end = close.start() if close else len(html)
+        if tag == "script" and _ESCAPED_SCRIPT.search(html, body_start, body_end):
+            return None  # "<!--" gevolgd door "<script": het script loopt dan door na </script>
+        if tag in ("script", "style"):
+            if _SELECTOR_ATTR.search(html, m.end(), body_start):
+                bodies.append(None)
+            else:
+                out.append(html[copied:body_start])
+                bodies.append(html[body_start:body_end])
+                copied = body_end
+        if close is None:
+            break
+        scan = close.end()
+    out.append(html[copied:])
+    return "".join(out), bodies
+
+
+def _raw_text(body: str) -> Optional[str]:
+    """Scriptinhoud zoals de parser hem aflevert: regeleinden genormaliseerd, NUL vervangen, leeg = None."""
+    if not body:
+        return None
+    return body.replace("\r\n", "\n").replace("\r", "\n").replace("\x00", "\ufffd")
+
+
+def build_partial_index(html: str) -> PageIndex:
+    """
+    PageIndex via de voorfilter: lxml parset de HTML zonder script-/style-inhoud, JSON-LD komt uit
+    de bron. Valt terug op build_lxml_index als de ingekorte boom niet klopt met wat de voorfilter zag.
+    """
+    pre = prefilter_html(html or "")
+    if pre is None:
+        return build_lxml_index(html)
+    slim, bodies = pre
+    root = _parse_lxml(slim)
+    if root is None:
+        return build_lxml_index(html)
+    elements = _X_SCRIPTS_STYLES(root)
+    if len(elements) != len(bodies):
+        return build_lxml_index(html)
+    json_ld = []
+    for el, body in zip(elements, bodies):
+        if body is not None and el.text is not None:
+            return build_lxml_index(html)  # weggeknipte inhoud kwam toch in de boom terecht
+        if el.tag == "script" and el.get("type") == "application/ld+json":
+            json_ld.append(el.text if body is None else _raw_text(body))
+    markers = (
+        "nh-anchor__label" in html
+        or "nh-icon__star-filled" in html
+        or "instant-booking" in html.lower()  # ook NH-ICON__INSTANT-BOOKING telt
+        or _CHAR_REF.search(html) is not None
+    )
+    return _lxml_tree_index(root, json_ld=json_ld, markers=markers)
+
+
+# Beschikbare parser-backends (config.HTML_PARSER_BACKEND)
+BACKENDS: dict[str, Callable[[str], PageIndex]] = {
+    "bs4": lambda html: build_soup_index(BeautifulSoup(html, "lxml")),
+    "lxml": build_lxml_index,
+    "partial": build_partial_index,
+}
+
+
+def build_index(html: str, backend: str = "lxml") -> PageIndex:
+    """PageIndex voor deze HTML met de gekozen backend ("bs4", "lxml" of "partial")."""
+    try:
+        build = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Onbekende parser-backend: {backend!r} (kies uit {', '.join(BACKENDS)})") from None
+    return build(html)
@@ -0,0 +1,167 @@
+# Lokale analyse van de coverfoto zonder API (NumPy + Pillow, beide optioneel)
+# Zelfde uitkomst als vision_analyzer.analyze_first_photo (is_exterior, has_watermark,
+# is_collage), maar met eenvoudige beeldkenmerken op de verkleinde foto (image_prep): rechte
+# naden of witte stroken dwars door het beeld (collage), horizontale rijen blokjes met
+# scherp contrast in twee tinten (tekst/watermerk) en lucht/groen (exterior).
+# Elke waarde is None als het beeld geen duidelijk antwoord geeft.
+
+from __future__ import annotations
+from typing import Optional
+
+from config import VISION_MAX_EDGE
+from image_prep import Image, decode_thumbnail
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Collage: naad = sprong in helderheid over (bijna) de hele breedte/hoogte, scherp t.o.v. de buurlijnen
+_SEAM_STEP = 24          # min. helderheidssprong per pixel
+_SEAM_COVERAGE = 0.6     # deel van de lijn met zo'n sprong
+_SEAM_SHARPNESS = 4.0    # lijn-energie t.o.v. de mediaan van de buurlijnen
+_GUTTER_STD = 3.0        # scheidingsstrook: vrijwel egaal ...
+_GUTTER_COVERAGE = 0.6   # ... en aan beide kanten over de hele breedte duidelijk anders
+_MARGIN = 0.08           # naden vlak langs de rand tellen niet (kaders, afsnijding)
+
+# Tekst/watermerk: blokjes van 8x8 px met veel randen en twee duidelijke tinten
+_BLOCK = 8
+_TEXT_EDGE = 30          # min. helderheidssprong voor een letterrand
+_TEXT_DENSITY = 0.1      # deel van het blokje met randen, horizontaal én verticaal
+_TEXT_MIN_RANGE = 50     # contrast tussen letter en achtergrond
+_TEXT_TWO_TONE = 0.65    # deel van de pixels dicht bij de lichtste of donkerste tint
+_TEXT_RUN = 3            # aaneengesloten tekstblokjes op één rij
+
+
+def local_available() -> bool:
+    """NumPy en Pillow zijn geïnstalleerd."""
+    return np is not None and Image is not None
+
+
+def analyze_image_local(data: bytes) -> dict[str, Optional[bool]]:
+    """Als analyze_image_base64, maar lokaal; lege dict zonder NumPy/Pillow of als decoderen mislukt."""
+    if not local_available():
+        return {}
+    img = decode_thumbnail(data, VISION_MAX_EDGE)
+    return analyze_thumbnail(img) if img is not None else {}
+
+
+def analyze_thumbnail(img) -> dict[str, Optional[bool]]:
+    """Analyse van een al gedecodeerde RGB-thumbnail (image_prep.decode_thumbnail)."""
+    if np is None or min(img.size) < 4 * _BLOCK:
+        return {}
+    rgb = np.asarray(img, dtype=np.float32)
+    gray = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    return {
+        "is_exterior": _is_exterior(rgb),
+        "has_watermark": _has_text(gray),
+        "is_collage": _is_collage(gray),
+    }
+
+
+# ---------- Collage ----------
+
+def _seam_lines(gray) -> list[int]:
+    """Posities (rijen) waar een harde, rechte naad over de hele breedte loopt."""
+    n = gray.shape[0]
+    # Over twee rijen, want bij verkleinen valt een naad vaak tussen twee pixels
+    d = np.abs(gray[2:] - gray[:-2])
+    coverage = (d > _SEAM_STEP).mean(axis=1)
+    energy = d.mean(axis=1)
+    lo, hi = max(int(n * _MARGIN), 6), min(int(n * (1 - _MARGIN)) - 2, len(energy) - 6)
+    if hi <= lo:
+        return []
+    # Kandidaten: lokaal maximum met genoeg dekking; alleen die vergelijken we met hun omgeving
+    mid = energy[lo:hi]
+    peak = (coverage[lo:hi] >= _SEAM_COVERAGE) & (mid >= energy[lo - 1:hi - 1]) & (mid >= energy[lo + 1:hi + 1])
+    lines = []
+    for i in np.flatnonzero(peak) + lo:
+        around = np.concatenate((energy[i - 6:i - 1], energy[i + 2:i + 7]))
+        if energy[i] >= _SEAM_SHARPNESS * max(float(np.median(around)), 1.0):
+            lines.append(int(i) + 1)
+    return lines
+
+
+def _gutters(gray) -> int:
+    """
+    Aantal egale stroken (max. 6% van de hoogte) buiten de randen waar de rijen erboven en
+    eronder over vrijwel de hele breedte van de strook verschillen: de witte of zwarte rand tussen twee foto's.
+    """
+    n = gray.shape[0]
+    flat = gray.std(axis=1) < _GUTTER_STD
+    lo, hi = int(n * _MARGIN), int(n * (1 - _MARGIN))
+    # Begin en einde van elke egale strook (einde = eerste niet-egale rij erna)
+    edges = np.flatnonzero(np.diff(flat[lo - 1:hi + 1].astype(np.int8))) + lo
+    count = 0
+    for start, end in zip(edges[::2], edges[1::2]):
+        if flat[start - 1] or end - start > max(2, int(n * 0.06)):
+            continue
+        level = gray[start:end].mean()
+        above = (np.abs(gray[start - 1] - level) > _SEAM_STEP).mean()
+        below = (np.abs(gray[end] - level) > _SEAM_STEP).mean()
+        if above >= _GUTTER_COVERAGE and below >= _GUTTER_COVERAGE:
+            count += 1
+    return count
+
+
+def _is_collage(gray) -> Optional[bool]:
+    rows, cols = _seam_lines(gray), _seam_lines(gray.T)
+    gutters = _gutters(gray) + _gutters(gray.T)
+    if gutters or (rows and cols) or len(rows) >= 2 or len(cols) >= 2:
+        return True
+    if rows or cols:
+        return None  # één rechte lijn kan ook een dakrand of horizon zijn
+    return False
+
+
+# ---------- Tekst / watermerk ----------
+
+def _blocks(a):
+    """(rijen, kolommen, _BLOCK*_BLOCK) weergave van een 2D-array in blokjes."""
+    h, w = (a.shape[0] // _BLOCK) * _BLOCK, (a.shape[1] // _BLOCK) * _BLOCK
+    a = a[:h, :w]
+    return a.reshape(h // _BLOCK, _BLOCK, w // _BLOCK, _BLOCK).swapaxes(1, 2).reshape(h // _BLOCK, w // _BLOCK, -1)
+
+
+def _has_run(mask, length: int) -> bool:
+    """Staan er ergens length blokjes naast elkaar op één rij?"""
+    if mask.shape[1] < length:
+        return False
+    run = mask[:, :mask.shape[1] - length + 1].copy()
+    for j in range(1, length):
+        run &= mask[:, j:j + run.shape[1]]
+    return bool(run.any())
+
+
+def _has_text(gray) -> Optional[bool]:
+    dx = np.zeros_like(gray)
+    dy = np.zeros_like(gray)
+    dx[:, 1:] = np.abs(np.diff(gray, axis=1))
+    dy[1:, :] = np.abs(np.diff(gray, axis=0))
+    b = _blocks(gray)
+    # Letters hebben zowel verticale als horizontale randen (een naad of dakrand maar één van beide)
+    strokes = ((_blocks(dx) > _TEXT_EDGE).mean(axis=2) > _TEXT_DENSITY) & ((_blocks(dy) > _TEXT_EDGE).mean(axis=2) > _TEXT_DENSITY)
+    lo, hi = b.min(axis=2, keepdims=True), b.max(axis=2, keepdims=True)
+    # Pixels liggen dicht bij de donkerste of lichtste tint van het blokje (letter of achtergrond)
+    two_tone = (np.minimum(b - lo, hi - b) < 0.2 * (hi - lo)).mean(axis=2)
+    texty = strokes & ((hi - lo)[..., 0] > _TEXT_MIN_RANGE)
+    if _has_run(texty & (two_tone > _TEXT_TWO_TONE), _TEXT_RUN):
+        return True
+    if _has_run(texty, _TEXT_RUN - 1):
+        return None
+    return False
+
+
+# ---------- Exterior / interieur ----------
+
+def _is_exterior(rgb) -> Optional[bool]:
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    top = slice(0, rgb.shape[0] // 3)
+    sky = (b[top] > r[top] + 10) & (b[top] >= g[top]) & (b[top] > 120)
+    green = (g > r + 8) & (g > b) & (g > 50)
+    sky_frac, green_frac = float(sky.mean()), float(green.mean())
+    if sky_frac > 0.15 or green_frac > 0.2:
+        return True
+    if sky_frac < 0.01 and green_frac < 0.02:
+        return False
+    return None
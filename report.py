@@ -0,0 +1,155 @@
+# Rapportopbouw: ExtractedData -> LQM-scores -> JSON-serialiseerbaar rapport
+# Gedeeld door de Flask-API (enkele URL en batch) en de async ophaallaag.
+
+from __future__ import annotations
+import asyncio
+from dataclasses import asdict, replace
+
+import page_cache
+from config import VISION_DEFERRED
+from extractor import apply_photo_analysis, extract_from_entry, extract_from_html, fetch_page_entry, prepare_url
+from page_cache import CacheEntry
+from report_cache import cached_report, get_report_cache
+from timing import Laps
+from vision_analyzer import analyze_first_photo, vision_remote
+from vision_jobs import get_vision_jobs
+from lqm_scorer import (
+    ExtractedData,
+    score_all,
+    total_lqm_score,
+    summary_by_category,
+    LQMScoreItem,
+)
+
+
+def item_to_dict(i: LQMScoreItem) -> dict:
+    """Serialiseer één score-item voor JSON."""
+    d = {
+        "attribute": i.attribute,
+        "category": i.category,
+        "score": i.score,
+        "type": i.type_,
+        "reason": i.reason,
+        "not_applicable": i.not_applicable,
+    }
+    if i.passed is not None:
+        d["passed"] = i.passed
+    if i.recommendation is not None:
+        d["recommendation"] = i.recommendation
+    if i.pending:
+        d["pending"] = True
+    return d
+
+
+def build_report(url: str, extracted: ExtractedData) -> dict:
+    """Scoort de geëxtraheerde data en bouwt het rapport zoals /api/analyze het retourneert."""
+    laps = Laps()
+    items = score_all(extracted)
+    laps("score")
+    total = total_lqm_score(items)
+    by_category = summary_by_category(items)
+    report = {
+        "ok": True,
+        "url": url,
+        "total_lqm_score": total,
+        "items": [item_to_dict(i) for i in items],
+        "by_category": {
+            cat: {
+                "bonus": info["bonus"],
+                "malus": info["malus"],
+                "items": [item_to_dict(i) for i in info["items"]],
+                "advisory": info.get("advisory", False),
+                "all_passed": info.get("all_passed"),
+            }
+            for cat, info in by_category.items()
+        },
+    }
+    laps("report")
+    return report
+
+
+def analyze_url(url: str, defer_vision: bool = VISION_DEFERRED) -> tuple[dict | None, str | None]:
+    """
+    Ophalen, extraheren en scoren van één URL. Retourneert (rapport, None) of (None, foutmelding).
+    Byte-identieke pagina-inhoud krijgt het eerder berekende rapport (report_cache).
+    Met defer_vision wacht het rapport niet op de AI-foto-analyse: de foto-items staan dan op
+    "pending" en rapport["vision_job"] verwijst naar de achtergrondtaak (GET /api/vision/<id>).
+    """
+    full_url = prepare_url(url)
+    if not full_url:
+        return None, "Geen URL opgegeven."
+    entry, err = fetch_page_entry(full_url)
+    if err:
+        return None, f"Pagina ophalen mislukt: {err}"
+    key, report = cached_report(entry.html, url, full_url)
+    if report is not None:
+        return report, None
+    cacheable = True
+    if defer_vision and entry.extracted is None and vision_remote():
+        data = extract_from_html(entry.html, full_url, analyze_photo=False)
+        report = _deferred_report(key, url, full_url, entry, data)
+        if report is not None:
+            return report, None
+    else:
+        data, cacheable = extract_from_entry(entry, full_url)
+    report = build_report(url, data)
+    if cacheable:
+        get_report_cache().put(key, report)
+    return report, None
+
+
+def _deferred_report(key: str, url: str, full_url: str, entry: CacheEntry, data: ExtractedData) -> dict | None:
+    """Rapport met de foto-items op "pending" en een achtergrondtaak; None (na remember_extracted) zonder coverfoto."""
+    if data.first_photo_src:
+        report = build_report(url, replace(data, first_photo_ai_pending=True))
+        job_id = get_vision_jobs().submit(key, lambda: _finish_vision(key, url, full_url, entry, data))
+        report["vision_job"] = {"id": job_id, "status": "pending"}
+        return report
+    page_cache.remember_extracted(full_url, entry, asdict(data))
+    return None
+
+
+def _finish_vision(key: str, url: str, full_url: str, entry: CacheEntry, data: ExtractedData) -> dict:
+    """
+    Achtergrondtaak: AI-foto-analyse, daarna het volledige rapport bouwen. Alleen met een uitkomst
+    gaat het in beide caches; een time-out of 429 van OpenAI mag niet de hele cacheduur blijven hangen.
+    """
+    ai = analyze_first_photo(data.first_photo_src, full_url)
+    apply_photo_analysis(data, ai)
+    report = build_report(url, data)
+    if any(v is not None for v in ai.values()):
+        get_report_cache().put(key, report)
+        page_cache.remember_extracted(full_url, entry, asdict(data))
+    return report
+
+
+async def async_analyze_url(
+    url: str, defer_vision: bool = False, user_agent: str | None = None
+) -> tuple[dict | None, str | None]:
+    """
+    Async variant van analyze_url (ophalen via async_fetch, parsen in een thread). defer_vision staat
+    standaard uit: de batch wacht op de foto-analyse; asgi.py geeft LQM_VISION_DEFERRED door.
+    user_agent: eigen User-Agent voor het ophalen van de pagina (standaard die van de extractor).
+    """
+    from async_fetch import async_extract_from_entry, async_fetch_page_entry
+    full_url = prepare_url(url)
+    if not full_url:
+        return None, "Geen URL opgegeven."
+    entry, err = await async_fetch_page_entry(full_url, user_agent)
+    if err:
+        return None, f"Pagina ophalen mislukt: {err}"
+    key, report = cached_report(entry.html, url, full_url)
+    if report is not None:
+        return report, None
+    cacheable = True
+    if defer_vision and entry.extracted is None and vision_remote():
+        data = await asyncio.to_thread(extract_from_html, entry.html, full_url, False)
+        report = _deferred_report(key, url, full_url, entry, data)
+        if report is not None:
+            return report, None
+    else:
+        data, cacheable = await async_extract_from_entry(entry, full_url)
+    report = build_report(url, data)
+    if cacheable:
+        get_report_cache().put(key, report)
+    return report, None
@@ -0,0 +1,87 @@
+# Memoisatie van LQM-rapporten op basis van de pagina-inhoud
+# Dezelfde HTML (byte-identiek) met dezelfde regelversie geeft hetzelfde rapport; dan slaan
+# we parsen, de (betaalde) AI-foto-analyse en het scoren over.
+
+from __future__ import annotations
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from config import REPORT_CACHE_MAX_ENTRIES
+from extractor import EXTRACTOR_VERSION
+from lqm_scorer import RULES_VERSION
+from vision_analyzer import VISION_MODE, vision_enabled
+
+
+def content_key(html: str, full_url: str) -> str:
+    """
+    Sleutel: hash van de paginatekst plus extractor- en regelversie (en welke foto-analyse actief is).
+    Met foto-analyse telt ook de pagina-URL mee: de coverfoto wordt daartegen opgelost, dus dezelfde
+    template-HTML op twee hosts is een andere foto.
+    """
+    h = hashlib.sha256(html.encode("utf-8", "surrogatepass"))
+    if vision_enabled():
+        vision = VISION_MODE
+        h.update(b"\0" + full_url.encode("utf-8", "surrogatepass"))
+    else:
+        vision = "noai"
+    return f"{h.hexdigest()}:{EXTRACTOR_VERSION}:{RULES_VERSION}:{vision}"
+
+
+class ReportCache:
+    """Begrensde LRU van rapporten (per proces) met hit/miss-tellers."""
+
+    def __init__(self, max_entries: int = REPORT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            report = self._entries.get(key)
+            if report is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return report
+
+    def put(self, key: str, report: dict) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = report
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses, entries = self.hits, self.misses, len(self._entries)
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / lookups, 3) if lookups else None,
+            "entries": entries,
+            "max_entries": self.max_entries,
+        }
+
+
+_cache = ReportCache()
+
+
+def get_report_cache() -> ReportCache:
+    return _cache
+
+
+def cached_report(html: str, url: str, full_url: str) -> tuple[str, Optional[dict]]:
+    """(sleutel, rapport) voor deze HTML op full_url; het rapport krijgt de gevraagde URL. None als nog niet gescoord."""
+    key = content_key(html, full_url)
+    report = _cache.get(key)
+    if report is not None:
+        report = {**report, "url": url}
+    return key, report
@@ -0,0 +1,113 @@
+# Tijdmeting per stap van één verzoek (ophalen, parsen, extractie, foto-analyse, scoren, JSON)
+# De meting van het lopende verzoek staat in een contextvar: code diep in extractor of vision_analyzer
+# roept alleen stage()/Laps aan en hoeft niets door te geven. Zonder actieve meting (bulk, batch, tests)
+# doen die niets. Threads via asyncio.to_thread en taken op dezelfde event loop nemen de meting mee;
+# achtergrondtaken (vision_jobs) niet, die horen niet bij de responstijd.
+# Uitvoer: Server-Timing-header, optioneel "timings" in het rapport en één JSON-logregel per verzoek.
+
+from __future__ import annotations
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+logger = logging.getLogger("lqm.timing")
+
+_current: ContextVar[Optional["Timings"]] = ContextVar("lqm_timings", default=None)
+
+
+class Timings:
+    """Duur per stap (opgeteld als een stap vaker voorkomt, bijv. meerdere verbindingen) en het aantal keer."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def as_dict(self) -> dict[str, float]:
+        """Milliseconden per stap (in volgorde van eerste voorkomen) plus "total"."""
+        out = {name: round(s * 1000, 2) for name, s in self.stages.items()}
+        out["total"] = round(self.total() * 1000, 2)
+        return out
+
+    def header(self) -> str:
+        """Waarde voor de Server-Timing-header: 'fetch;dur=12.3, parse;dur=4.1, ..., total;dur=80.2'."""
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.as_dict().items())
+
+    def log(self, **fields) -> None:
+        """Eén JSON-regel op logger lqm.timing (INFO) met de stappen en de meegegeven velden."""
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({"event": "timings", **fields, "timings_ms": self.as_dict()}, ensure_ascii=False))
+
+
+def current() -> Optional[Timings]:
+    return _current.get()
+
+
+@contextmanager
+def collect() -> Iterator[Timings]:
+    """Meet alles binnen dit blok (één verzoek); geneste aanroepen voegen toe aan dezelfde meting."""
+    timings = _current.get()
+    if timings is not None:
+        yield timings
+        return
+    timings = Timings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+def record(name: str, seconds: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+class stage:
+    """with stage("parse"): ... telt de duur van het blok bij die stap op (niets als er geen meting loopt)."""
+
+    __slots__ = ("name", "timings", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self) -> "stage":
+        self.timings = _current.get()
+        if self.timings is not None:
+            self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self.timings is not None:
+            self.timings.add(self.name, time.perf_counter() - self.t0)
+
+
+class Laps:
+    """
+    Stopwatch voor opeenvolgende stappen in één functie: laps("parse") telt de tijd sinds het vorige
+    rondje (of sinds Laps()) bij "parse" op. Handig waar een with-blok per stap de code zou verbouwen.
+    """
+
+    __slots__ = ("timings", "t")
+
+    def __init__(self):
+        self.timings = _current.get()
+        self.t = time.perf_counter() if self.timings is not None else 0.0
+
+    def __call__(self, name: str) -> None:
+        if self.timings is None:
+            return
+        now = time.perf_counter()
+        self.timings.add(name, now - self.t)
+        self.t = now
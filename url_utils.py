@@ -0,0 +1,39 @@
+# URL-normalisatie: zelfde advertentie = zelfde sleutel (cache, deduplicatie)
+
+from __future__ import annotations
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query-parameters die niets aan de pagina veranderen (tracking)
+_TRACKING_PARAMS = {"fbclid", "gclid", "msclkid", "mc_cid", "mc_eid", "_ga"}
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonieke vorm van een URL: schema en host in kleine letters, zonder standaardpoort,
+    fragment en tracking-parameters (utm_*, fbclid, ...), query-parameters gesorteerd.
+    Zonder schema wordt https:// aangenomen (zoals extract_from_url doet).
+    """
+    url = (url or "").strip()
+    if not url:
+        return ""
+    if not url.lower().startswith(("http://", "https://")):
+        url = "https://" + url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = f"[{host}]"  # IPv6-adres: hostname geeft het zonder haken terug
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    netloc = host if port is None or _DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    if parts.username:
+        netloc = f"{parts.username}@{netloc}"
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in _TRACKING_PARAMS
+    ]
+    query.sort()
+    return urlunsplit((scheme, netloc, parts.path or "/", urlencode(query), ""))
@@ -1,13 +1,22 @@
 # AI-analyse van de eerste foto (OpenAI Vision) voor LQM Photos-advisory
-# Optioneel: alleen actief als OPENAI_API_KEY is gezet
+# Optioneel: alleen actief als OPENAI_API_KEY is gezet, of lokaal (photo_heuristics) via LQM_VISION_MODE
 
 from __future__ import annotations
+import asyncio
 import base64
 import json
+import logging
 import os
 import re
 from typing import Optional
-import requests
+
+from config import VISION_DETAIL, VISION_MODE
+from http_session import get_session
+from metrics import OPENAI_REQUESTS, OPENAI_SECONDS
+from image_prep import ImageBuffer, decode_thumbnail, prepare_for_vision
+from photo_heuristics import analyze_thumbnail, local_available
+from timing import stage
+from vision_cache import get_vision_cache
 
 USER_AGENT = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
@@ -16,6 +25,18 @@ USER_AGENT = (
 IMAGE_TIMEOUT = 15
 IMAGE_MAX_BYTES = 4 * 1024 * 1024  # 4 MB
 OPENAI_TIMEOUT = 30
+VISION_MODEL = "gpt-4o-mini"
+# Verhogen bij een andere prompt of ander model: oude uitkomsten in vision_cache tellen dan niet meer
+VISION_PROMPT_VERSION = 1
+
+logger = logging.getLogger("lqm.vision")
+
+if VISION_MODE in ("local", "hybrid") and not local_available():
+    # Anders valt elke foto stil terug op de handmatige tip
+    logger.error(
+        "LQM_VISION_MODE=%s vereist NumPy en Pillow (pip install numpy Pillow); de lokale foto-analyse staat uit.",
+        VISION_MODE,
+    )
 
 
 def _resolve_image_url(src: str, page_url: str) -> str:
@@ -36,31 +57,48 @@ def _resolve_image_url(src: str, page_url: str) -> str:
     return urljoin(page_url, src)
 
 
-def _fetch_image_as_base64(url: str) -> Optional[str]:
-    """Haal afbeelding op en retourneer als base64-string, of None bij fout."""
+def _fetch_image(url: str) -> Optional[bytes]:
+    """Haal afbeelding op (max. IMAGE_MAX_BYTES), of None bij fout."""
     try:
-        resp = requests.get(
+        with stage("image"), get_session().get(
             url,
             headers={"User-Agent": USER_AGENT},
             timeout=IMAGE_TIMEOUT,
             stream=True,
-        )
-        resp.raise_for_status()
-        content_type = (resp.headers.get("content-type") or "").lower()
-        if "image/" not in content_type and not content_type.startswith("image"):
-            return None
-        data = b""
-        for chunk in resp.iter_content(chunk_size=8192):
-            data += chunk
-            if len(data) > IMAGE_MAX_BYTES:
-                break
-        if not data:
-            return None
-        return base64.standard_b64encode(data).decode("ascii")
+        ) as resp:
+            # `with` sluit de response ook na een afgebroken download; een niet uitgelezen verbinding
+            # wordt dan gesloten in plaats van hergebruikt (beter dan de rest van een te grote foto lezen)
+            resp.raise_for_status()
+            content_type = (resp.headers.get("content-type") or "").lower()
+            if "image/" not in content_type and not content_type.startswith("image"):
+                return None
+            buf = ImageBuffer.for_headers(resp.headers, IMAGE_MAX_BYTES)
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                if not buf.write(chunk):
+                    break
+        return buf.getvalue()
     except Exception:
         return None
 
 
+def _api_key() -> str:
+    return os.environ.get("OPENAI_API_KEY", "").strip()
+
+
+def vision_enabled() -> bool:
+    """Foto-analyse staat aan: OPENAI_API_KEY gezet, of lokaal (LQM_VISION_MODE local/hybrid) met NumPy en Pillow."""
+    if VISION_MODE == "local":
+        return local_available()
+    if VISION_MODE == "hybrid":
+        return bool(_api_key()) or local_available()
+    return bool(_api_key())
+
+
+def vision_remote() -> bool:
+    """De foto-analyse kan OpenAI aanroepen (seconden); lokaal duurt het milliseconden."""
+    return VISION_MODE != "local" and bool(_api_key())
+
+
 def analyze_first_photo(image_url: str, page_url: str) -> dict[str, Optional[bool]]:
     """
     Analyseer de eerste/coverfoto met OpenAI Vision.
@@ -68,32 +106,82 @@ def analyze_first_photo(image_url: str, page_url: str) -> dict[str, Optional[boo
       - is_exterior: True = huis/exterior, False = interieur, None = onbekend/fout
       - has_watermark: True = tekst/watermerk zichtbaar, False = geen, None = onbekend
       - is_collage: True = collage van meerdere foto's, False = enkele foto, None = onbekend
-    Zonder OPENAI_API_KEY of bij fout: lege dict of partial.
+    Zonder OPENAI_API_KEY (en zonder lokale analyse) of bij fout: lege dict of partial.
     """
-    out: dict[str, Optional[bool]] = {}
-    api_key = os.environ.get("OPENAI_API_KEY", "").strip()
-    if not api_key:
-        return out
+    if not vision_enabled() or not image_url or not page_url:
+        return {}
 
-    if not image_url or not page_url:
-        return out
+    resolved = _resolve_image_url(image_url, page_url)
+    if not resolved:
+        return {}
+
+    data = _fetch_image(resolved)
+    if not data:
+        return {}
+    return analyze_image_bytes(data, _api_key())
+
+
+async def async_analyze_first_photo(image_url: str, page_url: str) -> dict[str, Optional[bool]]:
+    """Als analyze_first_photo, maar haalt de afbeelding op via de gedeelde async client (async_fetch)."""
+    if not vision_enabled() or not image_url or not page_url:
+        return {}
 
     resolved = _resolve_image_url(image_url, page_url)
     if not resolved:
-        return out
+        return {}
+
+    from async_fetch import async_fetch_image
+    data = await async_fetch_image(resolved, IMAGE_MAX_BYTES)
+    if not data:
+        return {}
+    # De OpenAI-client (en de SQLite-cache) is synchroon; in een thread zodat de event loop doorloopt
+    return await asyncio.to_thread(analyze_image_bytes, data, _api_key())
 
-    b64 = _fetch_image_as_base64(resolved)
-    if not b64:
-        return out
 
+def analyze_image_bytes(data: bytes, api_key: str) -> dict[str, Optional[bool]]:
+    """
+    Als analyze_image_base64, maar eerst in vision_cache kijken (zelfde of bijna dezelfde afbeelding).
+    Met LQM_VISION_MODE local/hybrid daarna de lokale analyse (photo_heuristics); OpenAI alleen als
+    die iets openlaat (hybrid) en er een key is. Naar OpenAI gaat een verkleinde versie (image_prep).
+    """
+    local: dict[str, Optional[bool]] = {}
+    img = None
+    if VISION_MODE in ("local", "hybrid"):
+        with stage("photo-local"):
+            img = decode_thumbnail(data)
+            local = analyze_thumbnail(img) if img is not None else {}
+        if VISION_MODE == "local" or not api_key or (local and None not in local.values()):
+            return local
+    cache = get_vision_cache()
+    version = f"{VISION_MODEL}:{VISION_PROMPT_VERSION}"
+    h = None
+    if cache is not None:
+        cached, h = cache.get(data, version)
+        if cached is not None:
+            return {**local, **{k: v for k, v in cached.items() if v is not None}}
+    with stage("image-prep"):
+        payload, mime = prepare_for_vision(data, img=img)
+    with stage("openai"), OPENAI_SECONDS.time():
+        out = analyze_image_base64(base64.standard_b64encode(payload).decode("ascii"), api_key, mime)
+    # analyze_image_base64 vangt fouten zelf af; een leeg antwoord is een mislukte aanroep
+    OPENAI_REQUESTS.inc(outcome="ok" if out else "failed")
+    if cache is not None and out:
+        cache.put(data, version, out, h)
+    # Wat OpenAI niet beantwoordt (of bij een fout) houdt de lokale uitkomst
+    return {**local, **{k: v for k, v in out.items() if v is not None}}
+
+
+def analyze_image_base64(b64: str, api_key: str, mime: str = "image/jpeg") -> dict[str, Optional[bool]]:
+    """Stuur een base64-afbeelding naar OpenAI Vision en parse het JSON-antwoord."""
+    out: dict[str, Optional[bool]] = {}
     try:
         try:
             from openai import OpenAI
         except ImportError:
             return out
-        client = OpenAI(api_key=api_key)
+        client = OpenAI(api_key=api_key, timeout=OPENAI_TIMEOUT)
         response = client.chat.completions.create(
-            model="gpt-4o-mini",
+            model=VISION_MODEL,
             max_tokens=300,
             messages=[
                 {
@@ -109,7 +197,7 @@ def analyze_first_photo(image_url: str, page_url: str) -> dict[str, Optional[boo
                     "content": [
                         {
                             "type": "image_url",
-                            "image_url": {"url": f"data:image/jpeg;base64,{b64}"},
+                            "image_url": {"url": f"data:{mime};base64,{b64}", "detail": VISION_DETAIL},
                         },
                         {
                             "type": "text",
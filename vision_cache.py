@@ -0,0 +1,217 @@
+# Cache van AI-foto-analyses (vision_analyzer) in SQLite
+# Sleutel is de inhoud van de afbeelding: sha256 voor exact dezelfde bytes en een dHash
+# (perceptuele hash, vereist Pillow) zodat een opnieuw gecomprimeerde of geschaalde kopie
+# van dezelfde coverfoto ook raak is. Gedeeld tussen workers en bewaard na herstart.
+# Zoeken op dHash gaat via banden: de hash in 8 stukken van 8 bits, elk geïndexeerd. Wijken twee
+# hashes op hoogstens 7 bits af, dan is minstens één band gelijk; alleen die rijen worden vergeleken.
+
+from __future__ import annotations
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from config import VISION_CACHE_PATH, VISION_CACHE_MAX_ENTRIES, VISION_CACHE_MAX_DISTANCE
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+_MASK64 = (1 << 64) - 1
+_BANDS = 8
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def dhash(data: bytes) -> Optional[int]:
+    """64-bits verschil-hash (9x8 grijswaarden, links/rechts vergeleken); None zonder Pillow of bij een onleesbare afbeelding."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.draft("L", (64, 64))  # JPEG: direct verkleind decoderen
+            small = img.convert("L").resize((9, 8), Image.BILINEAR)
+            px = small.load()
+    except Exception:
+        return None
+    h = 0
+    for y in range(8):
+        for x in range(8):
+            h = (h << 1) | (px[x, y] > px[x + 1, y])
+    return h
+
+
+def _signed(h: int) -> int:
+    """SQLite INTEGER is signed 64-bit."""
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+
+def _bands(h: int) -> list[int]:
+    """Band-sleutels van een dHash: (bandnummer << 8) | die 8 bits."""
+    h &= _MASK64
+    return [(i << 8) | ((h >> (8 * i)) & 0xFF) for i in range(_BANDS)]
+
+
+class VisionCache:
+    """Begrensde LRU (op last_used) van analyse-uitkomsten per afbeelding, met hit/miss-tellers."""
+
+    def __init__(self, path: str = VISION_CACHE_PATH, max_entries: int = VISION_CACHE_MAX_ENTRIES,
+                 max_distance: int = VISION_CACHE_MAX_DISTANCE):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self._counts = {"hits": 0, "similar_hits": 0, "misses": 0, "stores": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vision_results ("
+            " sha256 TEXT NOT NULL, version TEXT NOT NULL, dhash INTEGER, result TEXT NOT NULL,"
+            " created REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (sha256, version))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS vision_results_last_used ON vision_results (last_used)")
+        has_bands = self._db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'vision_bands'"
+        ).fetchone() is not None
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vision_bands ("
+            " version TEXT NOT NULL, band INTEGER NOT NULL, sha256 TEXT NOT NULL,"
+            " PRIMARY KEY (version, band, sha256)) WITHOUT ROWID"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS vision_bands_sha256 ON vision_bands (sha256, version)")
+        if not has_bands:
+            # Cache van vóór de banden: eenmalig aanvullen
+            for sha, version, h in self._db.execute(
+                "SELECT sha256, version, dhash FROM vision_results WHERE dhash IS NOT NULL"
+            ).fetchall():
+                self._insert_bands(sha, version, h)
+
+    def get(self, data: bytes, version: str) -> tuple[Optional[dict], Optional[int]]:
+        """
+        (uitkomst, dhash) voor deze afbeelding. Eerst exact op sha256, daarna de dichtstbijzijnde
+        dHash binnen max_distance bits. De dhash gaat mee naar put(), zodat die maar één keer berekend wordt.
+        """
+        sha = content_hash(data)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT result FROM vision_results WHERE sha256 = ? AND version = ?", (sha, version)
+            ).fetchone()
+            if row is not None:
+                self._touch(sha, version)
+                self._counts["hits"] += 1
+                return json.loads(row[0]), None
+        h = dhash(data) if self.max_distance > 0 else None
+        if h is not None:
+            with self._lock:
+                best = None
+                for other_sha, other_h in self._similar_candidates(h, version):
+                    distance = ((other_h ^ h) & _MASK64).bit_count()
+                    if distance <= self.max_distance and (best is None or distance < best[0]):
+                        best = (distance, other_sha)
+                row = None
+                if best is not None:
+                    row = self._db.execute(
+                        "SELECT result FROM vision_results WHERE sha256 = ? AND version = ?", (best[1], version)
+                    ).fetchone()
+                if row is not None:
+                    self._touch(best[1], version)
+                    self._counts["similar_hits"] += 1
+                    # Deze kopie voortaan ook exact vinden
+                    self._insert(sha, version, h, row[0])
+                    return json.loads(row[0]), h
+        with self._lock:
+            self._counts["misses"] += 1
+        return None, h
+
+    def put(self, data: bytes, version: str, result: dict, h: Optional[int] = None) -> None:
+        if self.max_entries <= 0:
+            return
+        if h is None and self.max_distance > 0:
+            h = dhash(data)
+        with self._lock:
+            self._insert(content_hash(data), version, h, json.dumps(result))
+            self._counts["stores"] += 1
+
+    def _similar_candidates(self, h: int, version: str) -> list[tuple[str, int]]:
+        """(sha256, dhash) van rijen die binnen max_distance kunnen liggen (aanroepen met lock)."""
+        if self.max_distance >= _BANDS:
+            # Te ruim voor de banden: alle hashes langs (zonder de uitkomsten zelf te laden)
+            return self._db.execute(
+                "SELECT sha256, dhash FROM vision_results WHERE version = ? AND dhash IS NOT NULL", (version,)
+            ).fetchall()
+        bands = _bands(h)
+        return self._db.execute(
+            "SELECT DISTINCT r.sha256, r.dhash FROM vision_bands b"
+            " JOIN vision_results r ON r.sha256 = b.sha256 AND r.version = b.version"
+            f" WHERE b.version = ? AND b.band IN ({', '.join('?' * len(bands))})",
+            (version, *bands),
+        ).fetchall()
+
+    def _insert_bands(self, sha: str, version: str, h: int) -> None:
+        self._db.executemany(
+            "INSERT OR IGNORE INTO vision_bands (version, band, sha256) VALUES (?, ?, ?)",
+            [(version, band, sha) for band in _bands(h)],
+        )
+
+    def _insert(self, sha: str, version: str, h: Optional[int], result: str) -> None:
+        """Rij opslaan en de oudste rijen boven max_entries verwijderen (aanroepen met lock)."""
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO vision_results (sha256, version, dhash, result, created, last_used, hits)"
+            " VALUES (?, ?, ?, ?, ?, ?, 0)",
+            (sha, version, _signed(h) if h is not None else None, result, now, now),
+        )
+        if h is not None:
+            self._insert_bands(sha, version, h)
+        evicted = self._db.execute(
+            "SELECT sha256, version FROM vision_results ORDER BY last_used"
+            " LIMIT max(0, (SELECT count(*) FROM vision_results) - ?)",
+            (self.max_entries,),
+        ).fetchall()
+        if evicted:
+            self._db.executemany("DELETE FROM vision_results WHERE sha256 = ? AND version = ?", evicted)
+            self._db.executemany("DELETE FROM vision_bands WHERE sha256 = ? AND version = ?", evicted)
+            self._counts["evicted"] += len(evicted)
+
+    def _touch(self, sha: str, version: str) -> None:
+        """LRU: laatst gebruikt bijwerken (aanroepen met lock)."""
+        self._db.execute(
+            "UPDATE vision_results SET last_used = ?, hits = hits + 1 WHERE sha256 = ? AND version = ?",
+            (time.time(), sha, version),
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._counts)
+            counts["entries"] = self._db.execute("SELECT count(*) FROM vision_results").fetchone()[0]
+        lookups = counts["hits"] + counts["similar_hits"] + counts["misses"]
+        counts["hit_ratio"] = round((counts["hits"] + counts["similar_hits"]) / lookups, 3) if lookups else None
+        counts["max_entries"] = self.max_entries
+        counts["perceptual"] = Image is not None and self.max_distance > 0
+        return counts
+
+
+_cache: VisionCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_vision_cache() -> VisionCache | None:
+    """De procesbrede cache; None als LQM_VISION_CACHE_MAX_ENTRIES 0 is."""
+    global _cache
+    if VISION_CACHE_MAX_ENTRIES <= 0:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = VisionCache()
+    return _cache
@@ -0,0 +1,105 @@
+# Achtergrondtaken voor de AI-foto-analyse
+# /api/analyze geeft het rapport direct terug met de foto-items als "pending"; de download en
+# OpenAI-call lopen hier in een threadpool. Het bijgewerkte rapport is daarna op te halen via
+# GET /api/vision/<id>. Status en uitkomst staan in SQLite (LQM_VISION_JOBS_PATH), zodat elke
+# gunicorn-worker op dezelfde machine de taak kan teruggeven, ook als een andere worker hem uitvoert.
+
+from __future__ import annotations
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from config import VISION_JOBS_PATH, VISION_WORKERS, VISION_JOB_TTL
+
+
+class VisionJobs:
+    """Threadpool plus gedeelde takenlijst (id -> status/uitkomst); één lopende taak per sleutel per proces."""
+
+    def __init__(self, path: str = VISION_JOBS_PATH, workers: int = VISION_WORKERS, ttl: float = VISION_JOB_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.workers = max(1, workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="vision")
+        self._running: dict[str, str] = {}  # sleutel -> id van de taak die hier nog loopt
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS vision_jobs ("
+            " id TEXT PRIMARY KEY, status TEXT NOT NULL, created REAL NOT NULL, finished REAL,"
+            " result TEXT, error TEXT)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS vision_jobs_created ON vision_jobs (created)")
+
+    def submit(self, key: str, fn: Callable[[], dict]) -> str:
+        """Start fn op de achtergrond; loopt er hier al een taak voor deze sleutel, dan diens id."""
+        with self._lock:
+            job_id = self._running.get(key)
+            if job_id is not None:
+                return job_id
+            self._expire()
+            job_id = uuid.uuid4().hex
+            self._db.execute(
+                "INSERT INTO vision_jobs (id, status, created) VALUES (?, 'pending', ?)", (job_id, time.time())
+            )
+            self._running[key] = job_id
+        self._executor.submit(self._run, key, job_id, fn)
+        return job_id
+
+    def _run(self, key: str, job_id: str, fn: Callable[[], dict]) -> None:
+        try:
+            result, status, error = json.dumps(fn()), "done", None
+        except Exception as e:
+            result, status, error = None, "failed", str(e) or type(e).__name__
+        with self._lock:
+            self._db.execute(
+                "UPDATE vision_jobs SET status = ?, result = ?, error = ?, finished = ? WHERE id = ?",
+                (status, result, error, time.time(), job_id),
+            )
+            if self._running.get(key) == job_id:
+                del self._running[key]
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """De taak (status pending/done/failed, result, error) of None als onbekend/verlopen."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT status, result, error FROM vision_jobs WHERE id = ? AND coalesce(finished, created) >= ?",
+                (job_id, time.time() - self.ttl),
+            ).fetchone()
+        if row is None:
+            return None
+        status, result, error = row
+        return {"id": job_id, "status": status, "result": json.loads(result) if result else None, "error": error}
+
+    def _expire(self) -> None:
+        """Verwijder taken die langer dan de TTL klaar zijn, of zo lang pending (proces gestopt); aanroepen met lock."""
+        self._db.execute("DELETE FROM vision_jobs WHERE coalesce(finished, created) < ?", (time.time() - self.ttl,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {"pending": 0, "done": 0, "failed": 0}
+            counts.update(self._db.execute("SELECT status, count(*) FROM vision_jobs GROUP BY status").fetchall())
+            counts["running"] = len(self._running)
+        counts["workers"] = self.workers
+        return counts
+
+
+_jobs: VisionJobs | None = None
+_jobs_lock = threading.Lock()
+
+
+def get_vision_jobs() -> VisionJobs:
+    """De procesbrede takenlijst (lui aangemaakt, zodat er zonder AI-analyse geen threads starten)."""
+    global _jobs
+    if _jobs is None:
+        with _jobs_lock:
+            if _jobs is None:
+                _jobs = VisionJobs()
+    return _jobs
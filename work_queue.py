@@ -0,0 +1,432 @@
+# Gedeelde werkrij voor meerdere machines (python -m lqm worker), bijv. een heel portfolio opnieuw scoren
+# Geen coördinator: workers pakken zelf een batch URL's met een lease (geldig tot `expires`) en
+# verlengen die met een heartbeat zolang ze bezig zijn. Stopt een worker of valt een machine weg, dan
+# verloopt de lease en pakt de eerstvolgende worker de batch opnieuw. Elke claim verhoogt het
+# fencing-token van de batch; heartbeat en complete slagen alleen met het actuele token, dus een
+# verlopen lease wordt precies één keer opnieuw uitgegeven en een trage oude worker kan geen
+# resultaten meer wegschrijven. De resultaten staan in dezelfde backend (de gedeelde sink).
+# Backends: SqliteWorkQueue (één bestand; één machine en tests) en RedisWorkQueue (broker voor
+# meerdere machines, vereist het pakket redis).
+
+from __future__ import annotations
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+from config import WORK_CONCURRENCY, WORK_LEASE_SECONDS, WORK_MAX_ATTEMPTS, WORK_POLL_INTERVAL, WORK_QUEUE
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger("lqm.work_queue")
+
+
+@dataclass
+class Lease:
+    """Eén geclaimde batch: items ({"url": ..., eventueel "id"}) en het fencing-token van deze claim."""
+    batch_id: str
+    items: list[dict]
+    token: int
+    attempt: int
+
+
+def failed_results(items: list[dict], error: str) -> list[dict]:
+    return [{**item, "ok": False, "error": error} for item in items]
+
+
+def _exhausted_error(attempts: int) -> str:
+    return f"Geen uitkomst na {attempts} pogingen (lease steeds verlopen)."
+
+
+class WorkQueue:
+    """Basis voor backends: batches toevoegen, claimen met lease, verlengen, afronden en resultaten lezen."""
+
+    def __init__(self, max_attempts: int = WORK_MAX_ATTEMPTS):
+        self.max_attempts = max(1, max_attempts)
+
+    def push(self, items: Iterable[dict], batch_size: int) -> int:
+        """Items in batches van batch_size in de rij zetten; retourneert het aantal batches."""
+        batches = 0
+        batch: list[dict] = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                self.add_batch(batch)
+                batches += 1
+                batch = []
+        if batch:
+            self.add_batch(batch)
+            batches += 1
+        return batches
+
+    def add_batch(self, items: list[dict]) -> str:
+        raise NotImplementedError
+
+    def claim(self, worker: str, lease_seconds: float) -> Optional[Lease]:
+        """Een wachtende batch, of een batch met verlopen lease (opnieuw uitgegeven); None als er niets is."""
+        raise NotImplementedError
+
+    def heartbeat(self, lease: Lease, lease_seconds: float) -> bool:
+        """Lease verlengen; False als de batch inmiddels aan een andere worker is uitgegeven."""
+        raise NotImplementedError
+
+    def complete(self, lease: Lease, results: list[dict]) -> bool:
+        """Resultaten opslaan en de batch afronden; False (en niets opgeslagen) bij een verouderd token."""
+        raise NotImplementedError
+
+    def release(self, lease: Lease) -> None:
+        """Batch onafgerond teruggeven (worker stopt netjes); telt niet als poging."""
+        raise NotImplementedError
+
+    def results(self) -> Iterator[dict]:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """Aantal batches per toestand (pending, leased, done, failed) en het aantal resultaten."""
+        raise NotImplementedError
+
+
+class SqliteWorkQueue(WorkQueue):
+    """Werkrij in één SQLite-bestand (WAL); BEGIN IMMEDIATE maakt claimen atomair tussen processen."""
+
+    def __init__(self, path: str, max_attempts: int = WORK_MAX_ATTEMPTS):
+        super().__init__(max_attempts)
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS work_batches ("
+            " id TEXT PRIMARY KEY, items TEXT NOT NULL, state TEXT NOT NULL DEFAULT 'pending', worker TEXT,"
+            " token INTEGER NOT NULL DEFAULT 0, attempts INTEGER NOT NULL DEFAULT 0, expires REAL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS work_batches_state ON work_batches (state, expires)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS work_results (batch_id TEXT NOT NULL, result TEXT NOT NULL)")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Schrijftransactie (BEGIN IMMEDIATE): één proces tegelijk claimt of rondt af."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def add_batch(self, items: list[dict]) -> str:
+        batch_id = uuid.uuid4().hex
+        with self._transaction() as db:
+            db.execute("INSERT INTO work_batches (id, items) VALUES (?, ?)", (batch_id, json.dumps(items)))
+        return batch_id
+
+    def claim(self, worker: str, lease_seconds: float) -> Optional[Lease]:
+        now = time.time()
+        with self._transaction() as db:
+            while True:
+                row = db.execute(
+                    "SELECT id, items, token, attempts FROM work_batches WHERE state = 'leased' AND expires < ?"
+                    " ORDER BY expires LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None or row[3] < self.max_attempts:
+                    break
+                # Te vaak verlopen: als mislukt afronden zodat de rij niet vastloopt op één batch
+                self._store(db, row[0], failed_results(json.loads(row[1]), _exhausted_error(row[3])), "failed")
+            if row is None:
+                row = db.execute(
+                    "SELECT id, items, token, attempts FROM work_batches WHERE state = 'pending' ORDER BY rowid LIMIT 1"
+                ).fetchone()
+            if row is None:
+                return None
+            batch_id, items, token, attempts = row
+            db.execute(
+                "UPDATE work_batches SET state = 'leased', worker = ?, token = ?, attempts = ?, expires = ? WHERE id = ?",
+                (worker, token + 1, attempts + 1, now + lease_seconds, batch_id),
+            )
+        return Lease(batch_id, json.loads(items), token + 1, attempts + 1)
+
+    def heartbeat(self, lease: Lease, lease_seconds: float) -> bool:
+        with self._transaction() as db:
+            return db.execute(
+                "UPDATE work_batches SET expires = ? WHERE id = ? AND token = ? AND state = 'leased'",
+                (time.time() + lease_seconds, lease.batch_id, lease.token),
+            ).rowcount == 1
+
+    def complete(self, lease: Lease, results: list[dict]) -> bool:
+        with self._transaction() as db:
+            if db.execute(
+                "SELECT 1 FROM work_batches WHERE id = ? AND token = ? AND state = 'leased'", (lease.batch_id, lease.token)
+            ).fetchone() is None:
+                return False
+            self._store(db, lease.batch_id, results, "done")
+            return True
+
+    def release(self, lease: Lease) -> None:
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE work_batches SET state = 'pending', worker = NULL, expires = NULL, attempts = attempts - 1"
+                " WHERE id = ? AND token = ? AND state = 'leased'",
+                (lease.batch_id, lease.token),
+            )
+
+    @staticmethod
+    def _store(db: sqlite3.Connection, batch_id: str, results: list[dict], state: str) -> None:
+        db.execute("UPDATE work_batches SET state = ?, worker = NULL, expires = NULL WHERE id = ?", (state, batch_id))
+        db.executemany("INSERT INTO work_results (batch_id, result) VALUES (?, ?)",
+                       ((batch_id, json.dumps(r)) for r in results))
+
+    def results(self) -> Iterator[dict]:
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT rowid, result FROM work_results WHERE rowid > ? ORDER BY rowid LIMIT 1000", (last,)
+                ).fetchall()
+            if not rows:
+                return
+            for rowid, result in rows:
+                yield json.loads(result)
+            last = rows[-1][0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._db.execute("SELECT state, count(*) FROM work_batches GROUP BY state").fetchall())
+            results = self._db.execute("SELECT count(*) FROM work_results").fetchone()[0]
+        return {"pending": counts.get("pending", 0), "leased": counts.get("leased", 0),
+                "done": counts.get("done", 0), "failed": counts.get("failed", 0), "results": results}
+
+
+# Redis: elke bewerking is één Lua-script, dus atomair op de server; de tijd komt van de Redis-server
+# (TIME), zodat klokverschillen tussen machines de leases niet beïnvloeden.
+# Sleutels: <prefix>pending (lijst met batch-id's), <prefix>leases (sorted set id -> verloopt),
+# <prefix>batch:<id> (hash: items, state, token, attempts), <prefix>results (lijst), <prefix>counts (hash).
+_REDIS_NOW = "local t = redis.call('TIME') local now = tonumber(t[1]) + tonumber(t[2]) / 1e6\n"
+
+_REDIS_CLAIM = _REDIS_NOW + """
+local prefix, lease, worker, max_attempts = ARGV[1], tonumber(ARGV[2]), ARGV[3], tonumber(ARGV[4])
+local id
+while true do
+  local expired = redis.call('ZRANGEBYSCORE', prefix .. 'leases', '-inf', now, 'LIMIT', 0, 1)
+  if #expired == 0 then break end
+  local key = prefix .. 'batch:' .. expired[1]
+  local attempts = tonumber(redis.call('HGET', key, 'attempts'))
+  if attempts < max_attempts then id = expired[1] break end
+  redis.call('ZREM', prefix .. 'leases', expired[1])
+  redis.call('HSET', key, 'state', 'failed', 'worker', '')
+  redis.call('HINCRBY', prefix .. 'counts', 'failed', 1)
+  for _, item in ipairs(cjson.decode(redis.call('HGET', key, 'items'))) do
+    item['ok'] = false
+    item['error'] = ARGV[5]
+    redis.call('RPUSH', prefix .. 'results', cjson.encode(item))
+  end
+end
+if not id then id = redis.call('LPOP', prefix .. 'pending') end
+if not id then return false end
+local key = prefix .. 'batch:' .. id
+local token = redis.call('HINCRBY', key, 'token', 1)
+local attempts = redis.call('HINCRBY', key, 'attempts', 1)
+redis.call('HSET', key, 'state', 'leased', 'worker', worker)
+redis.call('ZADD', prefix .. 'leases', now + lease, id)
+return {id, token, attempts, redis.call('HGET', key, 'items')}
+"""
+
+_REDIS_HEARTBEAT = _REDIS_NOW + """
+local prefix, id, token, lease = ARGV[1], ARGV[2], ARGV[3], tonumber(ARGV[4])
+local key = prefix .. 'batch:' .. id
+if redis.call('HGET', key, 'token') ~= token or redis.call('HGET', key, 'state') ~= 'leased' then return 0 end
+redis.call('ZADD', prefix .. 'leases', now + lease, id)
+return 1
+"""
+
+_REDIS_COMPLETE = """
+local prefix, id, token = ARGV[1], ARGV[2], ARGV[3]
+local key = prefix .. 'batch:' .. id
+if redis.call('HGET', key, 'token') ~= token or redis.call('HGET', key, 'state') ~= 'leased' then return 0 end
+redis.call('ZREM', prefix .. 'leases', id)
+redis.call('HSET', key, 'state', 'done', 'worker', '')
+redis.call('HINCRBY', prefix .. 'counts', 'done', 1)
+for i = 4, #ARGV do redis.call('RPUSH', prefix .. 'results', ARGV[i]) end
+return 1
+"""
+
+_REDIS_RELEASE = """
+local prefix, id, token = ARGV[1], ARGV[2], ARGV[3]
+local key = prefix .. 'batch:' .. id
+if redis.call('HGET', key, 'token') ~= token or redis.call('HGET', key, 'state') ~= 'leased' then return 0 end
+redis.call('ZREM', prefix .. 'leases', id)
+redis.call('HSET', key, 'state', 'pending', 'worker', '')
+redis.call('HINCRBY', key, 'attempts', -1)
+redis.call('LPUSH', prefix .. 'pending', id)
+return 1
+"""
+
+
+class RedisWorkQueue(WorkQueue):
+    """Werkrij in Redis voor workers op meerdere machines."""
+
+    def __init__(self, url: str, prefix: str = "lqm:work:", max_attempts: int = WORK_MAX_ATTEMPTS):
+        if redis is None:
+            raise RuntimeError("Voor een redis://-werkrij is het pakket redis nodig (pip install redis).")
+        super().__init__(max_attempts)
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url, decode_responses=True)
+        self._claim = self._redis.register_script(_REDIS_CLAIM)
+        self._heartbeat = self._redis.register_script(_REDIS_HEARTBEAT)
+        self._complete = self._redis.register_script(_REDIS_COMPLETE)
+        self._release = self._redis.register_script(_REDIS_RELEASE)
+
+    def add_batch(self, items: list[dict]) -> str:
+        batch_id = uuid.uuid4().hex
+        pipe = self._redis.pipeline()
+        pipe.hset(f"{self.prefix}batch:{batch_id}",
+                  mapping={"items": json.dumps(items), "state": "pending", "token": 0, "attempts": 0})
+        pipe.rpush(f"{self.prefix}pending", batch_id)
+        pipe.execute()
+        return batch_id
+
+    def claim(self, worker: str, lease_seconds: float) -> Optional[Lease]:
+        row = self._claim(args=[self.prefix, lease_seconds, worker, self.max_attempts,
+                                _exhausted_error(self.max_attempts)])
+        if not row:
+            return None
+        batch_id, token, attempts, items = row
+        return Lease(batch_id, json.loads(items), int(token), int(attempts))
+
+    def heartbeat(self, lease: Lease, lease_seconds: float) -> bool:
+        return self._heartbeat(args=[self.prefix, lease.batch_id, lease.token, lease_seconds]) == 1
+
+    def complete(self, lease: Lease, results: list[dict]) -> bool:
+        return self._complete(args=[self.prefix, lease.batch_id, lease.token, *map(json.dumps, results)]) == 1
+
+    def release(self, lease: Lease) -> None:
+        self._release(args=[self.prefix, lease.batch_id, lease.token])
+
+    def results(self) -> Iterator[dict]:
+        start = 0
+        while True:
+            rows = self._redis.lrange(f"{self.prefix}results", start, start + 999)
+            if not rows:
+                return
+            for row in rows:
+                yield json.loads(row)
+            start += len(rows)
+
+    def stats(self) -> dict:
+        pipe = self._redis.pipeline()
+        pipe.llen(f"{self.prefix}pending")
+        pipe.zcard(f"{self.prefix}leases")
+        pipe.hgetall(f"{self.prefix}counts")
+        pipe.llen(f"{self.prefix}results")
+        pending, leased, counts, results = pipe.execute()
+        return {"pending": pending, "leased": leased, "done": int(counts.get("done", 0)),
+                "failed": int(counts.get("failed", 0)), "results": results}
+
+
+def open_queue(url: str = WORK_QUEUE) -> WorkQueue:
+    """redis://... of rediss://... -> RedisWorkQueue; sqlite:///pad of een bestandspad -> SqliteWorkQueue."""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisWorkQueue(url)
+    if url.startswith("sqlite:///"):
+        url = url[len("sqlite:///"):]  # sqlite:///relatief/pad of sqlite:////absoluut/pad
+    return SqliteWorkQueue(url)
+
+
+# ---------- Worker ----------
+
+def analyze_item(item: dict) -> dict:
+    """Eén URL: extract_from_url + score_all (via build_report). Het rapport krijgt "id" mee als het item dat heeft."""
+    from extractor import extract_from_url
+    from report import build_report
+    url = item["url"]
+    try:
+        data, err = extract_from_url(url)
+        result = build_report(url, data) if data is not None else {"ok": False, "url": url, "error": err}
+    except Exception as e:  # onverwachte fout in extractor/scorer: alleen deze URL faalt
+        result = {"ok": False, "url": url, "error": f"Analyse mislukt: {e}"}
+    if "id" in item:
+        result["id"] = item["id"]
+    return result
+
+
+def _heartbeat_loop(queue: WorkQueue, lease: Lease, lease_seconds: float, finished: threading.Event,
+                    lost: threading.Event) -> None:
+    """Lease verlengen elke derde van de leaseduur tot de batch klaar is of de lease weg is."""
+    while not finished.wait(lease_seconds / 3):
+        try:
+            ok = queue.heartbeat(lease, lease_seconds)
+        except Exception:
+            logger.exception("Heartbeat voor batch %s mislukt", lease.batch_id)
+            continue  # volgende poging; lukt het te lang niet, dan verloopt de lease vanzelf
+        if not ok:
+            lost.set()
+            return
+
+
+def run_worker(queue: WorkQueue, concurrency: int = WORK_CONCURRENCY, lease_seconds: float = WORK_LEASE_SECONDS,
+               poll_interval: float = WORK_POLL_INTERVAL, exit_when_empty: bool = False,
+               stop: Optional[threading.Event] = None) -> dict:
+    """
+    Batches claimen en analyseren (concurrency URL's tegelijk) tot stop gezet wordt, of met
+    exit_when_empty tot er niets meer wacht of in behandeling is. Retourneert tellers van deze worker.
+    """
+    stop = stop or threading.Event()
+    worker = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    counts = {"batches": 0, "urls": 0, "lost": 0}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="lqm-worker") as pool:
+        while not stop.is_set():
+            lease = queue.claim(worker, lease_seconds)
+            if lease is None:
+                if exit_when_empty:
+                    stats = queue.stats()
+                    if stats["pending"] == 0 and stats["leased"] == 0:
+                        break
+                stop.wait(poll_interval)
+                continue
+            finished, lost = threading.Event(), threading.Event()
+            beat = threading.Thread(target=_heartbeat_loop, args=(queue, lease, lease_seconds, finished, lost),
+                                    name="lqm-heartbeat", daemon=True)
+            beat.start()
+            completed = False
+            futures = []
+            try:
+                # Na een verloren lease de rest van de batch overslaan: een andere worker heeft hem nu
+                futures = [pool.submit(lambda i: None if lost.is_set() or stop.is_set() else analyze_item(i), item)
+                           for item in lease.items]
+                results = [f.result() for f in futures]
+                finished.set()
+                beat.join()
+                if lost.is_set() or any(r is None for r in results):
+                    pass
+                elif queue.complete(lease, results):
+                    completed = True
+                    counts["batches"] += 1
+                    counts["urls"] += len(results)
+                if not completed and not stop.is_set():
+                    counts["lost"] += 1
+                    logger.warning("Lease van batch %s verloren; uitkomst niet opgeslagen", lease.batch_id)
+            except KeyboardInterrupt:
+                # Ctrl-C: wachtende items niet meer analyseren (de batch gaat terug), alleen lopende afmaken
+                stop.set()
+                for f in futures:
+                    f.cancel()
+                raise
+            finally:
+                finished.set()
+                if not completed and not lost.is_set():
+                    queue.release(lease)
+    return counts